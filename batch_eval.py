@@ -0,0 +1,105 @@
+"""
+Full-corpus evaluation engine
+Encodes every document in batches across threads and reports exact
+compression over all bytes plus per-document distribution statistics
+"""
+import os
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+def hf_batch_encoder(tokenizer):
+    """Batch encode function for a nanochat HuggingFaceTokenizer"""
+    hf_tokenizer = tokenizer.tokenizer
+    def encode_batch(texts):
+        return [e.ids for e in hf_tokenizer.encode_batch(texts, add_special_tokens=False)]
+    return encode_batch
+
+def tiktoken_batch_encoder(encoding):
+    """Batch encode function for a tiktoken Encoding"""
+    def encode_batch(texts):
+        # Parallelism comes from the outer thread pool; tiktoken releases the GIL
+        return encoding.encode_ordinary_batch(texts, num_threads=1)
+    return encode_batch
+
+def _distribution(values):
+    """Summary statistics for a list of numbers"""
+    if not values:
+        return {}
+    if len(values) == 1:
+        p10 = p90 = values[0]
+    else:
+        deciles = statistics.quantiles(values, n=10, method='inclusive')
+        p10, p90 = deciles[0], deciles[-1]
+    return {
+        'min': min(values),
+        'p10': p10,
+        'median': statistics.median(values),
+        'mean': statistics.fmean(values),
+        'p90': p90,
+        'max': max(values)
+    }
+
+def evaluate_documents(encode_batch, documents, batch_size=32, num_threads=None, keep_tokens=False,
+                       sink=None):
+    """
+    Encode all documents and measure compression and throughput.
+
+    encode_batch maps a list of strings to a list of token id lists. Batches
+    are spread across num_threads threads (default: one per core). Returns
+    (stats, tokens) where tokens is the concatenated ids as a uint32 array
+    if keep_tokens is set, otherwise None. A sink (e.g. a TokenShardWriter)
+    gets add_document(ids) for every document, in document order, once
+    encoding has finished; its time is reported as sink_time.
+    """
+    num_threads = num_threads or os.cpu_count() or 1
+    # Small corpora of large documents still get one batch per thread
+    batch_size = max(1, min(batch_size, -(-len(documents) // num_threads)))
+    batches = [documents[i:i + batch_size] for i in range(0, len(documents), batch_size)]
+
+    doc_bytes = [len(doc.encode('utf-8')) for doc in documents]
+    doc_tokens = []
+    doc_ids = [] if keep_tokens or sink is not None else None
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_threads) as pool:
+        # map() keeps batch order, so token streams line up with documents
+        for batch_ids in pool.map(encode_batch, batches):
+            for ids in batch_ids:
+                doc_tokens.append(len(ids))
+                if doc_ids is not None:
+                    doc_ids.append(np.asarray(ids, dtype=np.uint32))
+    encode_time = time.perf_counter() - t0
+
+    # Shard writes happen after the timed region so disk I/O is not counted as encoding
+    sink_time = 0.0
+    if sink is not None:
+        t0 = time.perf_counter()
+        for ids in doc_ids:
+            sink.add_document(ids)
+        sink_time = time.perf_counter() - t0
+    if keep_tokens:
+        tokens = np.concatenate(doc_ids) if doc_ids else np.zeros(0, dtype=np.uint32)
+    else:
+        tokens = None
+
+    total_bytes = sum(doc_bytes)
+    total_tokens = sum(doc_tokens)
+    doc_ratios = [b / t for b, t in zip(doc_bytes, doc_tokens) if t > 0]
+
+    stats = {
+        'original_bytes': total_bytes,
+        'num_tokens': total_tokens,
+        'compression_ratio': total_bytes / total_tokens if total_tokens else 0.0,
+        'encode_time': encode_time,
+        'sink_time': sink_time,
+        'num_documents': len(documents),
+        'num_threads': num_threads,
+        'throughput_mb_s': total_bytes / 1024 / 1024 / encode_time if encode_time > 0 else 0.0,
+        'tokens_per_second': total_tokens / encode_time if encode_time > 0 else 0.0,
+        'doc_compression_ratio': _distribution(doc_ratios),
+        'doc_num_tokens': _distribution(doc_tokens)
+    }
+    return stats, tokens
@@ -0,0 +1,240 @@
+"""
+Tokenizer throughput benchmark suite
+Encode/decode throughput and p50/p95/p99 latency for the nanochat domain
+tokenizers and the tiktoken baselines, with warmup, repetitions and
+thread-count scaling; results are written as JSON for run-to-run comparison
+"""
+import os
+import json
+import time
+import platform
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from train_and_analyze_tokenizers import load_domain_jobs, OUTPUT_DIR, HuggingFaceTokenizer
+from corpus_reader import iter_corpus_chunks, iter_corpus_documents
+from reference_tokenizers import REFERENCE_ENCODINGS, get_reference_encoding
+from encode_cache import CachedEncoder
+from bpe_encoder import BPEEncoder
+
+def load_benchmark_tokenizers(domains):
+    """Return {name: (encode, decode)} for the domain tokenizers and tiktoken baselines"""
+    tokenizers = {}
+    for domain_name in domains:
+        tokenizer_dir = OUTPUT_DIR / f"{domain_name}_tokenizer"
+        if not (tokenizer_dir / "tokenizer.json").exists():
+            print(f"✗ No trained tokenizer for {domain_name}, skipping")
+            continue
+        tokenizer = HuggingFaceTokenizer.from_directory(str(tokenizer_dir))
+        tokenizers[f"nanochat/{domain_name}"] = (tokenizer.encode, tokenizer.decode)
+        # Same ids through the memoizing piece cache
+        tokenizers[f"nanochat-cached/{domain_name}"] = (CachedEncoder(tokenizer).encode, tokenizer.decode)
+        # Pure-Python merge loop built from the same tokenizer.json
+        encoder = BPEEncoder.from_directory(tokenizer_dir)
+        tokenizers[f"incremental/{domain_name}"] = (encoder.encode, encoder.decode)
+
+    for encoding_name in REFERENCE_ENCODINGS:
+        try:
+            enc = get_reference_encoding(encoding_name)
+            tokenizers[f"tiktoken/{encoding_name}"] = (enc.encode_ordinary, enc.decode)
+        except Exception as e:
+            print(f"✗ {encoding_name} failed to load: {e}")
+
+    return tokenizers
+
+def build_inputs(data_file, num_short=200, short_bytes=256, num_long=8, long_bytes=65536):
+    """Sample short (line-sized) and long (document-sized) inputs from a corpus"""
+    short_inputs = []
+    for chunk in iter_corpus_chunks(data_file, short_bytes):
+        if chunk.strip():
+            short_inputs.append(chunk)
+        if len(short_inputs) >= num_short:
+            break
+
+    long_inputs = []
+    for doc in iter_corpus_documents(data_file):
+        long_inputs.append(doc[:long_bytes])
+        if len(long_inputs) >= num_long:
+            break
+
+    return {'short': short_inputs, 'long': long_inputs}
+
+def _percentiles(samples_ns):
+    """p50/p95/p99/mean of a list of nanosecond timings, in microseconds"""
+    ordered = sorted(samples_ns)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1000
+    return {
+        'p50_us': pick(0.50),
+        'p95_us': pick(0.95),
+        'p99_us': pick(0.99),
+        'mean_us': sum(ordered) / len(ordered) / 1000
+    }
+
+def bench_latency(fn, inputs, warmup=3, repeats=10):
+    """Time fn on every input, repeats times, after warmup passes"""
+    for _ in range(warmup):
+        for item in inputs:
+            fn(item)
+
+    samples = []
+    for _ in range(repeats):
+        for item in inputs:
+            t0 = time.perf_counter_ns()
+            fn(item)
+            samples.append(time.perf_counter_ns() - t0)
+    return samples
+
+def bench_encode_decode(encode, decode, inputs, warmup=3, repeats=10):
+    """Encode/decode throughput and latency for one input set"""
+    input_bytes = sum(len(text.encode('utf-8')) for text in inputs)
+    # The first pass is timed on its own: memoizing encoders start cold here
+    t0 = time.perf_counter_ns()
+    encoded = [encode(text) for text in inputs]
+    cold_s = (time.perf_counter_ns() - t0) / 1e9
+    num_tokens = sum(len(ids) for ids in encoded)
+
+    encode_ns = bench_latency(encode, inputs, warmup, repeats)
+    decode_ns = bench_latency(decode, encoded, warmup, repeats)
+    encode_s = sum(encode_ns) / 1e9
+    decode_s = sum(decode_ns) / 1e9
+
+    return {
+        'num_inputs': len(inputs),
+        'input_bytes': input_bytes,
+        'num_tokens': num_tokens,
+        'encode': {
+            'mb_per_s': input_bytes * repeats / 1024 / 1024 / encode_s,
+            'tokens_per_s': num_tokens * repeats / encode_s,
+            'cold_mb_per_s': input_bytes / 1024 / 1024 / cold_s,
+            **_percentiles(encode_ns)
+        },
+        'decode': {
+            'mb_per_s': input_bytes * repeats / 1024 / 1024 / decode_s,
+            'tokens_per_s': num_tokens * repeats / decode_s,
+            **_percentiles(decode_ns)
+        }
+    }
+
+def bench_thread_scaling(encode, inputs, thread_counts, repeats=3):
+    """Aggregate encode throughput when inputs are spread across N threads"""
+    input_bytes = sum(len(text.encode('utf-8')) for text in inputs)
+    scaling = {}
+    for num_threads in thread_counts:
+        with ThreadPoolExecutor(max_workers=num_threads) as pool:
+            list(pool.map(encode, inputs))  # warmup
+            t0 = time.perf_counter_ns()
+            for _ in range(repeats):
+                list(pool.map(encode, inputs))
+            elapsed = (time.perf_counter_ns() - t0) / 1e9
+        scaling[str(num_threads)] = input_bytes * repeats / 1024 / 1024 / elapsed
+    return scaling
+
+def _clear_encode_cache(encode):
+    """Empty the piece cache behind a memoizing encode (CachedEncoder, BPEEncoder), if any"""
+    cache = getattr(getattr(encode, '__self__', None), 'cache', None)
+    if cache is not None:
+        cache.clear()
+
+def compare_runs(current, baseline, threshold=0.10):
+    """Return regressions where encode/decode MB/s dropped by more than threshold"""
+    regressions = []
+    for domain_name, domain_results in current['results'].items():
+        for tok_name, tok_results in domain_results.items():
+            for size, size_results in tok_results.items():
+                if size == 'thread_scaling':
+                    continue
+                for op in ('encode', 'decode'):
+                    try:
+                        before = baseline['results'][domain_name][tok_name][size][op]['mb_per_s']
+                    except KeyError:
+                        continue
+                    after = size_results[op]['mb_per_s']
+                    if after < before * (1 - threshold):
+                        regressions.append({
+                            'domain': domain_name,
+                            'tokenizer': tok_name,
+                            'inputs': size,
+                            'op': op,
+                            'baseline_mb_per_s': before,
+                            'current_mb_per_s': after,
+                            'change': after / before - 1
+                        })
+    return regressions
+
+def run_benchmarks(domains=None, warmup=3, repeats=10, thread_counts=(1, 2, 4, 8)):
+    """Benchmark every tokenizer on every domain's short and long inputs (all registered domains by default)"""
+    jobs = [job for job in load_domain_jobs() if domains is None or job[0] in domains]
+    tokenizers = load_benchmark_tokenizers([job[0] for job in jobs])
+
+    results = {}
+    for domain_name, data_file, _ in jobs:
+        print(f"\n{'='*60}")
+        print(f"Benchmarking on {domain_name}")
+        print(f"{'='*60}")
+        inputs = build_inputs(data_file)
+
+        results[domain_name] = {}
+        for tok_name, (encode, decode) in tokenizers.items():
+            tok_results = {}
+            for size, texts in inputs.items():
+                if not texts:
+                    continue
+                # Every measurement starts from an empty cache, so hits come from its own inputs
+                _clear_encode_cache(encode)
+                tok_results[size] = bench_encode_decode(encode, decode, texts, warmup, repeats)
+                enc = tok_results[size]['encode']
+                print(f"  {tok_name:28s} {size:5s} encode {enc['mb_per_s']:8.2f} MB/s "
+                      f"(cold {enc['cold_mb_per_s']:8.2f}) p50 {enc['p50_us']:9.1f}us p99 {enc['p99_us']:9.1f}us")
+            if inputs['long']:
+                _clear_encode_cache(encode)
+                tok_results['thread_scaling'] = bench_thread_scaling(encode, inputs['long'], thread_counts)
+            results[domain_name][tok_name] = tok_results
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {
+            'warmup': warmup,
+            'repeats': repeats,
+            'thread_counts': list(thread_counts)
+        },
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tokenizer throughput and latency")
+    parser.add_argument('--domains', nargs='+', help="Domains to benchmark (default: all)")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, 2, 4, 8])
+    parser.add_argument('--output', default=str(OUTPUT_DIR / "benchmark_results.json"))
+    parser.add_argument('--baseline', help="Earlier benchmark JSON to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative throughput drop that counts as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.domains, args.warmup, args.repeats, args.threads)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare_runs(report, baseline, args.threshold)
+        if report['regressions']:
+            print(f"\n✗ {len(report['regressions'])} regression(s) vs {args.baseline}:")
+            for r in report['regressions']:
+                print(f"    {r['domain']} {r['tokenizer']} {r['inputs']} {r['op']}: "
+                      f"{r['baseline_mb_per_s']:.2f} -> {r['current_mb_per_s']:.2f} MB/s ({r['change']:+.1%})")
+        else:
+            print(f"\n✓ No regressions vs {args.baseline}")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Benchmark results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Reference BPE trainer benchmark
+Times HuggingFace training, the incremental heap trainer and the naive
+rescanning trainer as vocab size and corpus size grow, checking the merges match
+"""
+import json
+import time
+import argparse
+
+from train_and_analyze_tokenizers import (
+    load_domain_jobs, OUTPUT_DIR, TRAINING_CHUNK_SIZE, SPLIT_PATTERN, HuggingFaceTokenizer,
+    train_tokenizer_from_counts,
+)
+from pretokenize import training_spans, iter_span_texts
+from bpe_trainer import count_pre_split, train_bpe_naive
+
+DEFAULT_VOCAB_SIZES = [512, 1024, 2048, 4096]
+DEFAULT_FRACTIONS = [0.25, 0.5, 1.0]
+
+def _merges(tokenizer):
+    return json.loads(tokenizer.tokenizer.to_str())['model']['merges']
+
+def run_bpe_benchmark(domain_name, data_file, vocab_sizes, fractions, naive_max_vocab):
+    """Train every (corpus fraction, vocab size) with each trainer and compare times and merges"""
+    spans = training_spans(data_file, TRAINING_CHUNK_SIZE)
+
+    print(f"\nBPE trainers on {domain_name}:")
+    results = []
+    for fraction in fractions:
+        subset = spans[:max(1, round(len(spans) * fraction))]
+        texts = list(iter_span_texts(data_file, subset))
+        corpus_bytes = sum(len(text.encode('utf-8')) for text in texts)
+
+        t0 = time.time()
+        word_counts = count_pre_split(texts, SPLIT_PATTERN)
+        count_time = time.time() - t0
+
+        for vocab_size in vocab_sizes:
+            t0 = time.time()
+            hf_tokenizer = HuggingFaceTokenizer.train_from_iterator(iter(texts), vocab_size)
+            hf_time = time.time() - t0
+
+            t0 = time.time()
+            reference = train_tokenizer_from_counts(word_counts, vocab_size)
+            reference_time = time.time() - t0
+
+            result = {
+                'fraction': fraction,
+                'corpus_bytes': corpus_bytes,
+                'unique_words': len(word_counts),
+                'vocab_size': vocab_size,
+                'num_merges': len(_merges(reference)),
+                'count_time': count_time,
+                'hf_time': hf_time,
+                'reference_time': reference_time,
+                'matches_hf': _merges(reference) == _merges(hf_tokenizer)
+            }
+
+            # The rescanning trainer is only timed where it finishes in reasonable time
+            if vocab_size <= naive_max_vocab:
+                t0 = time.time()
+                naive = train_tokenizer_from_counts(word_counts, vocab_size, trainer=train_bpe_naive)
+                result['naive_time'] = time.time() - t0
+                result['naive_matches'] = _merges(naive) == _merges(reference)
+            results.append(result)
+
+            naive = f", naive {result['naive_time']:.2f}s" if 'naive_time' in result else ""
+            status = "✓" if result['matches_hf'] and result.get('naive_matches', True) else "✗"
+            print(f"  {status} {corpus_bytes / 1024 / 1024:6.2f} MB, vocab {vocab_size:>6,}: "
+                  f"hf {hf_time:.2f}s, reference {count_time + reference_time:.2f}s "
+                  f"(count {count_time:.2f}s){naive}")
+    return results
+
+def main(domains=None, vocab_sizes=DEFAULT_VOCAB_SIZES, fractions=DEFAULT_FRACTIONS, naive_max_vocab=1024):
+    jobs = [job for job in load_domain_jobs() if domains is None or job[0] in domains]
+
+    results = {}
+    for domain_name, data_file, _ in jobs:
+        results[domain_name] = run_bpe_benchmark(domain_name, data_file, vocab_sizes, fractions, naive_max_vocab)
+
+    output_file = OUTPUT_DIR / "bpe_benchmark_results.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n✓ BPE benchmark saved to: {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training time of the reference BPE trainers vs HuggingFace")
+    parser.add_argument('--domains', nargs='+', help="Domains to benchmark (default: all)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_VOCAB_SIZES,
+                        help="Vocab sizes to train")
+    parser.add_argument('--fractions', nargs='+', type=float, default=DEFAULT_FRACTIONS,
+                        help="Corpus prefixes (fraction of training chunks) to train on")
+    parser.add_argument('--naive-max-vocab', type=int, default=1024,
+                        help="Largest vocab size the rescanning trainer is run for")
+    args = parser.parse_args()
+    main(domains=args.domains, vocab_sizes=args.sizes, fractions=args.fractions,
+         naive_max_vocab=args.naive_max_vocab)
@@ -0,0 +1,150 @@
+"""
+Inspectable in-process BPE encoder built from a saved tokenizer.json
+Merges each pre-token with a rank heap over a linked list of symbols, and
+memoizes pre-token ids in a bounded cache; ids match the saved tokenizer
+"""
+import json
+import heapq
+from pathlib import Path
+
+import regex
+
+from encode_cache import ByteLRUCache
+from vocab_table import bytes_to_unicode, to_byte_level, split_pattern
+
+class BPEEncoder:
+    """
+    encode()/decode() for a ByteLevel BPE tokenizer.json.
+
+    Merges live in one table keyed by left_id * vocab_size + right_id,
+    giving (rank, merged id). A pre-token of n symbols costs O(n log n):
+    candidate pairs sit in a heap ordered by (rank, position), stale entries
+    are skipped when popped, and merged symbols are unlinked from a
+    prev/next list instead of rebuilding the word.
+    """
+
+    def __init__(self, tokenizer_data, cache_bytes=16 * 1024 * 1024):
+        model = tokenizer_data['model']
+        if model.get('type') != 'BPE':
+            raise ValueError(f"Expected a BPE model, got {model.get('type')!r}")
+        pattern = split_pattern(tokenizer_data)
+        if pattern is None:
+            raise ValueError("Only Split + ByteLevel pre-tokenizers without a normalizer are supported")
+        self.split = regex.compile(pattern)
+
+        self.vocab = model['vocab']
+        self.id_to_token = {token_id: token for token, token_id in self.vocab.items()}
+        self.vocab_size = max(self.id_to_token) + 1
+        self._char_ids = {char: self.vocab[char] for char in bytes_to_unicode().values()}
+
+        # Later duplicates win, as in the HuggingFace model
+        self.merges = {}
+        for rank, merge in enumerate(model['merges']):
+            left, right = merge.split(' ') if isinstance(merge, str) else merge
+            key = self.vocab[left] * self.vocab_size + self.vocab[right]
+            self.merges[key] = (rank, self.vocab[left + right])
+
+        self.special_tokens = {token['content']: token['id'] for token in tokenizer_data.get('added_tokens', [])}
+        self.special_split = None
+        if self.special_tokens:
+            # Longest first, so a special token that contains another one wins
+            alternatives = sorted(self.special_tokens, key=len, reverse=True)
+            self.special_split = regex.compile("(" + "|".join(regex.escape(s) for s in alternatives) + ")")
+        self.id_to_token.update({token_id: content for content, token_id in self.special_tokens.items()})
+
+        self._byte_decoder = {char: byte for byte, char in bytes_to_unicode().items()}
+        self.cache = ByteLRUCache(cache_bytes)
+
+    @classmethod
+    def from_file(cls, tokenizer_file, **kwargs):
+        with open(tokenizer_file, encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    @classmethod
+    def from_directory(cls, tokenizer_dir, **kwargs):
+        return cls.from_file(Path(tokenizer_dir) / "tokenizer.json", **kwargs)
+
+    def bpe(self, symbols):
+        """Apply the merges to one pre-token's symbol ids, lowest rank (then leftmost) first"""
+        n = len(symbols)
+        if n < 2:
+            return list(symbols)
+
+        merges = self.merges
+        vocab_size = self.vocab_size
+        symbols = list(symbols)
+        nxt = list(range(1, n + 1))
+        nxt[-1] = -1
+        prev = list(range(-1, n - 1))
+
+        heap = []
+        for i in range(n - 1):
+            merge = merges.get(symbols[i] * vocab_size + symbols[i + 1])
+            if merge is not None:
+                heap.append((merge[0], i, merge[1]))
+        heapq.heapify(heap)
+
+        while heap:
+            rank, i, new_id = heapq.heappop(heap)
+            j = nxt[i]
+            # Skip entries whose left symbol was absorbed or whose pair has changed since
+            if symbols[i] < 0 or j < 0:
+                continue
+            if merges.get(symbols[i] * vocab_size + symbols[j]) != (rank, new_id):
+                continue
+
+            symbols[i] = new_id
+            symbols[j] = -1
+            nxt[i] = nxt[j]
+            if nxt[i] >= 0:
+                prev[nxt[i]] = i
+                merge = merges.get(new_id * vocab_size + symbols[nxt[i]])
+                if merge is not None:
+                    heapq.heappush(heap, (merge[0], i, merge[1]))
+            if prev[i] >= 0:
+                merge = merges.get(symbols[prev[i]] * vocab_size + new_id)
+                if merge is not None:
+                    heapq.heappush(heap, (merge[0], prev[i], merge[1]))
+
+        return [symbol for symbol in symbols if symbol >= 0]
+
+    def encode_piece(self, piece):
+        """Token ids of one pre-token, through the cache"""
+        ids = self.cache.get(piece)
+        if ids is None:
+            char_ids = self._char_ids
+            ids = tuple(self.bpe([char_ids[char] for char in to_byte_level(piece)]))
+            self.cache.put(piece, ids)
+        return ids
+
+    def _encode_ordinary(self, text, ids):
+        for piece in self.split.findall(text):
+            ids.extend(self.encode_piece(piece))
+
+    def encode(self, text):
+        """Token ids of text; special-token strings map to their ids like the saved tokenizer"""
+        ids = []
+        if self.special_split is None or not any(s in text for s in self.special_tokens):
+            self._encode_ordinary(text, ids)
+            return ids
+        for index, part in enumerate(self.special_split.split(text)):
+            if index % 2:
+                ids.append(self.special_tokens[part])
+            elif part:
+                self._encode_ordinary(part, ids)
+        return ids
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+    def decode(self, ids):
+        """Text of ids; invalid UTF-8 from partial tokens becomes U+FFFD"""
+        out = bytearray()
+        byte_decoder = self._byte_decoder
+        for token_id in ids:
+            token = self.id_to_token[token_id]
+            if token in self.special_tokens:
+                out += token.encode('utf-8')
+            else:
+                out += bytes(byte_decoder[char] for char in token)
+        return out.decode('utf-8', errors='replace')
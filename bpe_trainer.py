@@ -0,0 +1,177 @@
+"""
+Reference BPE training on a word -> count table
+Reproduces the merges of the HuggingFace BpeTrainer with a lazily updated
+pair-count heap and a pair -> word index, so each merge only touches the
+words that contain the merged pair
+"""
+import json
+import heapq
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+import regex
+from tokenizers import Tokenizer
+
+from vocab_table import to_byte_level
+
+def _merge_word(symbols, a, b, new_id):
+    """Merge every (a, b) in symbols left to right; returns (new symbols, pair count changes)"""
+    out = []
+    changes = []
+    i = 0
+    n = len(symbols)
+    while i < n:
+        if i + 1 < n and symbols[i] == a and symbols[i + 1] == b:
+            if out:
+                changes.append(((out[-1], a), -1))
+                changes.append(((out[-1], new_id), 1))
+            out.append(new_id)
+            i += 2
+            if i < n:
+                changes.append(((b, symbols[i]), -1))
+                changes.append(((new_id, symbols[i]), 1))
+        else:
+            out.append(symbols[i])
+            i += 1
+    return out, changes
+
+def count_pre_split(texts, split_pattern):
+    """ByteLevel word -> count table of texts split with split_pattern"""
+    split = regex.compile(split_pattern)
+    counts = Counter()
+    for text in texts:
+        counts.update(split.findall(text))
+    return {to_byte_level(word): count for word, count in counts.items()}
+
+def _initial_vocab(word_counts, special_tokens, initial_alphabet):
+    """(vocab, tokens) before any merge: special tokens, then the alphabet by code point"""
+    vocab = {}
+    tokens = []
+    for token in special_tokens:
+        if token not in vocab:
+            vocab[token] = len(tokens)
+            tokens.append(token)
+    alphabet = set(initial_alphabet)
+    for word in word_counts:
+        alphabet.update(word)
+    for char in sorted(alphabet):
+        if char not in vocab:
+            vocab[char] = len(tokens)
+            tokens.append(char)
+    return vocab, tokens
+
+def _add_token(vocab, tokens, a, b):
+    """Id of the merged token a+b; an existing token with the same string is reused"""
+    new_token = tokens[a] + tokens[b]
+    new_id = vocab.get(new_token)
+    if new_id is None:
+        new_id = len(tokens)
+        vocab[new_token] = new_id
+        tokens.append(new_token)
+    return new_id
+
+def train_bpe_from_counts(word_counts, vocab_size, special_tokens=(), initial_alphabet=()):
+    """
+    Learn BPE merges from ByteLevel word counts.
+
+    Ids follow the HuggingFace trainer: special tokens first, then the
+    alphabet sorted by code point, then one token per merge. The most
+    frequent pair is merged first, ties going to the smallest (left, right)
+    id pair. Returns (vocab: token -> id, merges: list of (left, right)).
+    """
+    vocab, tokens = _initial_vocab(word_counts, special_tokens, initial_alphabet)
+    words = [[vocab[char] for char in word] for word in word_counts]
+    counts = list(word_counts.values())
+
+    pair_counts = {}
+    pair_words = {}
+    for index, (symbols, count) in enumerate(zip(words, counts)):
+        for pair in zip(symbols, symbols[1:]):
+            pair_counts[pair] = pair_counts.get(pair, 0) + count
+            pair_words.setdefault(pair, set()).add(index)
+
+    # Max-heap on (count, smallest pair first); stale counts are refreshed when popped
+    heap = [(-count, pair, order, pair_words[pair]) for order, (pair, count) in enumerate(pair_counts.items())]
+    heapq.heapify(heap)
+    order = len(heap)
+
+    merges = []
+    while len(vocab) < vocab_size and heap:
+        neg_count, pair, _, positions = heapq.heappop(heap)
+        current = pair_counts[pair]
+        if -neg_count != current:
+            heapq.heappush(heap, (-current, pair, order, positions))
+            order += 1
+            continue
+        if current < 1:
+            break
+
+        a, b = pair
+        new_id = _add_token(vocab, tokens, a, b)
+        merges.append((tokens[a], tokens[b]))
+
+        # Only words holding the pair change; new pairs get one heap entry with their words
+        updated = {}
+        for index in positions:
+            words[index], changes = _merge_word(words[index], a, b, new_id)
+            count = counts[index]
+            for changed_pair, change in changes:
+                pair_counts[changed_pair] = pair_counts.get(changed_pair, 0) + change * count
+                if change > 0:
+                    updated.setdefault(changed_pair, set()).add(index)
+        for changed_pair, changed_words in updated.items():
+            if pair_counts[changed_pair] > 0:
+                heapq.heappush(heap, (-pair_counts[changed_pair], changed_pair, order, changed_words))
+                order += 1
+
+    return vocab, merges
+
+def train_bpe_naive(word_counts, vocab_size, special_tokens=(), initial_alphabet=()):
+    """
+    Same result as train_bpe_from_counts, recounting every pair before each merge.
+
+    The recount is vectorized with NumPy but still costs O(corpus symbols)
+    per merge; kept as a baseline for bpe_benchmark.py.
+    """
+    vocab, tokens = _initial_vocab(word_counts, special_tokens, initial_alphabet)
+    words = [[vocab[char] for char in word] for word in word_counts]
+    counts = np.fromiter(word_counts.values(), dtype=np.int64, count=len(words))
+
+    merges = []
+    while len(vocab) < vocab_size:
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        flat = np.fromiter(chain.from_iterable(words), dtype=np.int64, count=int(lengths.sum()))
+        word_of = np.repeat(np.arange(len(words)), lengths)
+        inside = word_of[1:] == word_of[:-1]
+        if not inside.any():
+            break
+
+        # Pair (a, b) as a*N + b, so the smallest key is also the smallest pair
+        num_tokens = len(tokens)
+        keys = flat[:-1][inside] * num_tokens + flat[1:][inside]
+        pairs, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=counts[word_of[:-1][inside]])
+        best = totals.max()
+        if best < 1:
+            break
+        key = int(pairs[totals == best].min())
+        a, b = divmod(key, num_tokens)
+
+        new_id = _add_token(vocab, tokens, a, b)
+        merges.append((tokens[a], tokens[b]))
+        for index in np.unique(word_of[:-1][inside][keys == key]):
+            words[index], _ = _merge_word(words[index], a, b, new_id)
+
+    return vocab, merges
+
+def build_tokenizer_json(template_json, vocab, merges):
+    """A tokenizer.json string: template's pre-tokenizer/decoder/special tokens with the given model"""
+    data = json.loads(template_json)
+    data['model']['vocab'] = vocab
+    data['model']['merges'] = [list(merge) for merge in merges]
+    return json.dumps(data, ensure_ascii=False)
+
+def build_tokenizer(template_json, vocab, merges):
+    """HuggingFace Tokenizer from build_tokenizer_json"""
+    return Tokenizer.from_str(build_tokenizer_json(template_json, vocab, merges))
@@ -0,0 +1,66 @@
+"""
+Chunking-strategy benchmark
+Trains every domain tokenizer once per chunker (fixed, line, document,
+adaptive) and reports training time and full-corpus compression ratio
+"""
+import json
+import time
+import argparse
+
+from train_and_analyze_tokenizers import load_domain_jobs, OUTPUT_DIR, train_domain_tokenizer
+from chunkers import CHUNKERS, iter_chunks
+from corpus_reader import iter_corpus_documents
+from batch_eval import evaluate_documents, hf_batch_encoder
+
+def run_chunker_benchmark(domain_name, data_file, vocab_size, chunkers):
+    """Train one tokenizer per chunker and compare training time and compression"""
+    documents = list(iter_corpus_documents(data_file))
+
+    print(f"\nChunker comparison for {domain_name}:")
+    results = []
+    for chunker in chunkers:
+        chunk_bytes = [len(chunk.encode('utf-8')) for chunk in iter_chunks(data_file, chunker)]
+
+        # Always retrain: the point is to time training
+        output_dir = OUTPUT_DIR / f"{domain_name}_chunkers" / chunker
+        t0 = time.time()
+        tokenizer = train_domain_tokenizer(domain_name, data_file, vocab_size=vocab_size, output_dir=output_dir,
+                                           use_cache=False, chunker=chunker)
+        train_time = time.time() - t0
+
+        stats, _ = evaluate_documents(hf_batch_encoder(tokenizer), documents)
+        results.append({
+            'chunker': chunker,
+            'num_chunks': len(chunk_bytes),
+            'mean_chunk_bytes': sum(chunk_bytes) / len(chunk_bytes) if chunk_bytes else 0.0,
+            'train_time': train_time,
+            'compression_ratio': stats['compression_ratio'],
+            'num_tokens': stats['num_tokens']
+        })
+
+    for r in results:
+        print(f"  {r['chunker']:9s}: {r['num_chunks']:5,} chunks, train {r['train_time']:.2f}s, "
+              f"{r['compression_ratio']:.3f} bytes/token")
+    return results
+
+def main(domains=None, chunkers=tuple(CHUNKERS)):
+    jobs = [job for job in load_domain_jobs() if domains is None or job[0] in domains]
+
+    results = {}
+    for domain_name, data_file, vocab_size in jobs:
+        results[domain_name] = run_chunker_benchmark(domain_name, data_file, vocab_size, chunkers)
+
+    output_file = OUTPUT_DIR / "chunker_benchmark_results.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n✓ Chunker benchmark saved to: {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training time and compression for each chunking strategy")
+    parser.add_argument('--domains', nargs='+', help="Domains to benchmark (default: all)")
+    parser.add_argument('--chunkers', nargs='+', choices=list(CHUNKERS), default=list(CHUNKERS),
+                        help="Chunking strategies to compare")
+    args = parser.parse_args()
+    main(domains=args.domains, chunkers=args.chunkers)
@@ -0,0 +1,100 @@
+"""
+Pluggable chunking strategies for the tokenizer training iterator
+Every strategy is a generator of byte spans over the memory-mapped corpus,
+so chunks are cut where the text allows and nothing is fully materialized
+"""
+import mmap
+import os
+
+from corpus_reader import _utf8_boundary, _iter_span_chunks, iter_document_offsets
+
+# Cut points tried in order by the aligned strategies, strongest boundary first
+PARAGRAPH_SEPARATORS = (b"\n\n", b"\r\n\r\n", b"\n")
+LINE_SEPARATORS = (b"\n",)
+
+def _aligned_cut(mm, pos, end, chunk_size, separators):
+    """End of the chunk starting at pos: just after the last separator in its second half"""
+    limit = pos + chunk_size
+    if limit >= end:
+        return end
+    for separator in separators:
+        cut = mm.rfind(separator, pos + chunk_size // 2, limit)
+        if cut != -1:
+            return cut + len(separator)
+    # No boundary nearby (e.g. one huge line): fall back to a UTF-8-safe cut
+    cut = _utf8_boundary(mm, limit, pos)
+    return cut if cut > pos else limit
+
+def _iter_aligned_spans(mm, start, end, chunk_size, separators):
+    pos = start
+    while pos < end:
+        cut = _aligned_cut(mm, pos, end, chunk_size, separators)
+        yield pos, cut
+        pos = cut
+
+def fixed_spans(mm, chunk_size):
+    """Every chunk_size bytes, only adjusted to stay UTF-8 safe"""
+    yield from _iter_span_chunks(mm, 0, len(mm), chunk_size)
+
+def line_spans(mm, chunk_size):
+    """Up to chunk_size bytes, ending after a newline whenever possible"""
+    yield from _iter_aligned_spans(mm, 0, len(mm), chunk_size, LINE_SEPARATORS)
+
+def document_spans(mm, chunk_size):
+    """One chunk per `====` document; long documents are split on lines"""
+    for doc_start, doc_end in iter_document_offsets(mm):
+        yield from _iter_aligned_spans(mm, doc_start, doc_end, chunk_size, LINE_SEPARATORS)
+
+def adaptive_spans(mm, chunk_size):
+    """
+    Chunks close to a byte budget of chunk_size.
+
+    Adjacent short documents are packed together until the budget is
+    reached; documents larger than it are split at blank lines (paragraphs,
+    screenplay beats, top-level code blocks) before falling back to lines.
+    """
+    pack_start = pack_end = None
+    for doc_start, doc_end in iter_document_offsets(mm):
+        if pack_start is not None and doc_end - pack_start > chunk_size:
+            yield pack_start, pack_end
+            pack_start = None
+
+        if doc_end - doc_start > chunk_size:
+            yield from _iter_aligned_spans(mm, doc_start, doc_end, chunk_size, PARAGRAPH_SEPARATORS)
+            continue
+
+        if pack_start is None:
+            pack_start = doc_start
+        pack_end = doc_end
+
+    if pack_start is not None:
+        yield pack_start, pack_end
+
+CHUNKERS = {
+    'fixed': fixed_spans,
+    'line': line_spans,
+    'document': document_spans,
+    'adaptive': adaptive_spans,
+}
+
+def _open_spans(data_file, chunker, chunk_size):
+    """Yield (mm, span) pairs for a named strategy over a corpus file"""
+    if chunker not in CHUNKERS:
+        raise ValueError(f"Unknown chunker {chunker!r}; choose from {', '.join(CHUNKERS)}")
+    if os.path.getsize(data_file) == 0:
+        return
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for span in CHUNKERS[chunker](mm, chunk_size):
+                yield mm, span
+
+def iter_chunks(data_file, chunker='fixed', chunk_size=10000):
+    """Yield the text chunks of a corpus file cut by the named strategy"""
+    for mm, (start, end) in _open_spans(data_file, chunker, chunk_size):
+        chunk = mm[start:end].decode('utf-8', errors='replace')
+        yield chunk.replace('\r\n', '\n').replace('\r', '\n')
+
+def count_chunks(data_file, chunker='fixed', chunk_size=10000):
+    """Number of chunks iter_chunks would yield, without decoding them"""
+    return sum(1 for _ in _open_spans(data_file, chunker, chunk_size))
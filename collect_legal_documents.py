@@ -2,10 +2,12 @@
 Collect real legal documents from public APIs and sources
 Using U.S. Supreme Court opinions and case law
 """
-import requests
 from pathlib import Path
-import time
 import json
+import re
+
+from fetch_utils import Fetcher, CollectionManifest
+from corpus_writer import CorpusWriter
 
 def collect_legal_documents():
     """Collect legal documents from public sources"""
@@ -13,7 +15,6 @@ def collect_legal_documents():
     output_dir = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/legal_documents")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    all_documents = []
     metadata = []
     
     print("Collecting U.S. Supreme Court opinions from Case.law API...")
@@ -32,9 +33,16 @@ def collect_legal_documents():
         'User-Agent': 'Educational Research Project',
     }
     
+    manifest = CollectionManifest(output_dir / "manifest.json")
+    fetcher = Fetcher(headers=headers, rate=2.0, timeout=30, cache_dir=output_dir / "http_cache")
+    
+    # Each document is appended to disk as soon as it arrives
+    output_file = output_dir / "legal_documents_corpus.txt"
+    writer = CorpusWriter(output_file)
+    
     try:
         print("  Fetching from Case.law API...")
-        response = requests.get(base_url, params=params, headers=headers, timeout=30)
+        response = fetcher.get(base_url, params=params)
         
         if response.status_code == 200:
             data = response.json()
@@ -49,7 +57,7 @@ def collect_legal_documents():
                 # Extract opinions text
                 opinions = case_text.get('opinions', [])
                 
-                for opinion in opinions:
+                for j, opinion in enumerate(opinions):
                     opinion_text = opinion.get('text', '')
                     if opinion_text:
                         doc = f"\n{'='*80}\n"
@@ -60,7 +68,9 @@ def collect_legal_documents():
                         doc += f"{'='*80}\n\n"
                         doc += opinion_text + "\n"
                         
-                        all_documents.append(doc)
+                        doc_id = f"caselaw/{case.get('id', case_name)}/{j}"
+                        writer.write(doc_id, doc)
+                        manifest.record(doc_id, base_url, doc)
                         
                         metadata.append({
                             'case_name': case_name,
@@ -72,7 +82,7 @@ def collect_legal_documents():
                 if i % 10 == 0:
                     print(f"    Processed {i}/{len(cases)} cases...")
             
-            print(f"  ✓ Collected {len(all_documents)} opinions from Case.law")
+            print(f"  ✓ Collected {writer.num_documents} opinions from Case.law")
             
         else:
             print(f"  ✗ Case.law API returned status {response.status_code}")
@@ -81,7 +91,7 @@ def collect_legal_documents():
         print(f"  ✗ Error with Case.law API: {e}")
     
     # If we didn't get enough, try CourtListener API
-    if len(all_documents) < 50:
+    if writer.num_documents < 50:
         print("\n  Fetching from CourtListener...")
         try:
             courtlistener_url = "https://www.courtlistener.com/api/rest/v3/opinions/"
@@ -90,7 +100,7 @@ def collect_legal_documents():
                 'page_size': 50,
             }
             
-            response = requests.get(courtlistener_url, params=params, headers=headers, timeout=30)
+            response = fetcher.get(courtlistener_url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -106,7 +116,9 @@ def collect_legal_documents():
                         doc += f"{'='*80}\n\n"
                         doc += opinion_text + "\n"
                         
-                        all_documents.append(doc)
+                        doc_id = f"courtlistener/{opinion.get('id', 'N/A')}"
+                        writer.write(doc_id, doc)
+                        manifest.record(doc_id, courtlistener_url, doc)
                 
                 print(f"  ✓ Collected {len(opinions)} additional opinions from CourtListener")
                 
@@ -124,38 +136,35 @@ def collect_legal_documents():
         "https://www.law.cornell.edu/constitution/billofrights",
     ]
     
-    for url in constitution_sections:
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                # Simple text extraction (would need beautifulsoup for better parsing)
-                content = response.text
-                # Extract text between body tags as rough approximation
-                if '<body' in content and '</body>' in content:
-                    body_start = content.find('<body')
-                    body_end = content.find('</body>')
-                    body_content = content[body_start:body_end]
-                    # Remove HTML tags (simple approach)
-                    import re
-                    text = re.sub('<[^<]+?>', '', body_content)
-                    text = text.replace('&nbsp;', ' ').replace('&amp;', '&')
-                    
-                    if len(text) > 1000:
-                        all_documents.append(f"\n{'='*80}\n")
-                        all_documents.append(f"SOURCE: {url}\n")
-                        all_documents.append(f"{'='*80}\n\n")
-                        all_documents.append(text + "\n")
-            
-            time.sleep(1)
-        except Exception as e:
-            print(f"    ✗ Error fetching {url}: {e}")
-    
-    # Save all documents
-    output_file = output_dir / "legal_documents_corpus.txt"
-    full_corpus = "\n".join(all_documents)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_corpus)
+    for url, response, error in fetcher.get_all(constitution_sections, timeout=10):
+        if error is not None:
+            print(f"    ✗ Error fetching {url}: {error}")
+            continue
+        if response.status_code == 200:
+            # Simple text extraction (would need beautifulsoup for better parsing)
+            content = response.text
+            # Extract text between body tags as rough approximation
+            if '<body' in content and '</body>' in content:
+                body_start = content.find('<body')
+                body_end = content.find('</body>')
+                body_content = content[body_start:body_end]
+                # Remove HTML tags (simple approach)
+                text = re.sub('<[^<]+?>', '', body_content)
+                text = text.replace('&nbsp;', ' ').replace('&amp;', '&')
+                
+                if len(text) > 1000:
+                    doc = "\n".join([
+                        f"\n{'='*80}\n",
+                        f"SOURCE: {url}\n",
+                        f"{'='*80}\n\n",
+                        text + "\n",
+                    ])
+                    writer.write(url, doc)
+                    manifest.record(url, url, doc)
+    
+    fetcher.close()
+    writer.close()
+    manifest.close()
     
     # Save metadata
     metadata_file = output_dir / "metadata.json"
@@ -163,9 +172,9 @@ def collect_legal_documents():
         json.dump(metadata, f, indent=2)
     
     # Calculate statistics
-    total_chars = len(full_corpus)
-    total_lines = full_corpus.count('\n')
-    num_documents = len(all_documents)
+    total_chars = writer.total_chars
+    total_lines = writer.total_lines
+    num_documents = writer.num_documents
     
     stats = {
         'num_documents': num_documents,
@@ -190,7 +199,7 @@ def collect_legal_documents():
     
     print(f"\n✓ Legal documents collection complete!")
     print(f"  - Saved to: {output_file}")
-    print(f"  - Number of documents: {num_documents}")
+    print(f"  - Number of documents: {num_documents} ({manifest.summary()})")
     print(f"  - Total size: {stats['total_size_mb']:.2f} MB")
     print(f"  - Statistics saved to: {stats_file}")
     
@@ -2,18 +2,19 @@
 Collect real movie scripts from IMSDB (Internet Movie Script Database)
 All scripts are publicly available
 """
-import requests
 from pathlib import Path
-import time
 import re
 
+from fetch_utils import Fetcher, CollectionManifest
+from corpus_writer import CorpusWriter
+from corpus_stats import PatternCounter, MOVIE_PATTERNS
+
 def collect_movie_scripts():
     """Collect movie scripts from IMSDB"""
     
     output_dir = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/movie_scripts")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    all_scripts = []
     metadata = []
     
     print("Collecting movie scripts from IMSDB...")
@@ -41,12 +42,24 @@ def collect_movie_scripts():
         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
     }
     
-    for title, url_name in scripts:
-        try:
-            url = f'https://imsdb.com/scripts/{url_name}.html'
-            print(f"  Fetching: {title}...")
-            
-            response = requests.get(url, headers=headers, timeout=15)
+    manifest = CollectionManifest(output_dir / "manifest.json")
+    
+    # Screenplay elements, counted in one scan per script as it is written
+    pattern_counter = PatternCounter(MOVIE_PATTERNS, flags=re.IGNORECASE)
+    
+    # Each script is appended to disk as soon as it arrives
+    output_file = output_dir / "movie_scripts_corpus.txt"
+    
+    with Fetcher(headers=headers, rate=2.0, cache_dir=output_dir / "http_cache") as fetcher, \
+         CorpusWriter(output_file) as writer, manifest:
+        urls = [f'https://imsdb.com/scripts/{url_name}.html' for _, url_name in scripts]
+        print(f"  Fetching {len(urls)} scripts...")
+        
+        for (title, _), (url, response, error) in zip(scripts, fetcher.get_all(urls)):
+            print(f"  {title}:")
+            if error is not None:
+                print(f"    ✗ Error: {error}")
+                continue
             
             if response.status_code == 200:
                 content = response.text
@@ -75,7 +88,9 @@ def collect_movie_scripts():
                             script_block += f"{'='*80}\n\n"
                             script_block += script_text
                             
-                            all_scripts.append(script_block)
+                            writer.write(title, script_block)
+                            manifest.record(title, url, script_block)
+                            pattern_counter.count(script_block)
                             
                             metadata.append({
                                 'title': title,
@@ -92,29 +107,18 @@ def collect_movie_scripts():
                     print(f"    ✗ No <pre> tags found")
             else:
                 print(f"    ✗ Status {response.status_code}")
-            
-            time.sleep(2)  # Be respectful
-            
-        except Exception as e:
-            print(f"    ✗ Error: {e}")
-    
-    # Save all scripts
-    output_file = output_dir / "movie_scripts_corpus.txt"
-    full_corpus = "\n".join(all_scripts)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_corpus)
     
     # Calculate statistics
-    total_chars = len(full_corpus)
-    total_lines = full_corpus.count('\n')
-    num_scripts = len(all_scripts)
+    total_chars = writer.total_chars
+    total_lines = writer.total_lines
+    num_scripts = writer.num_documents
     
     # Analyze screenplay elements
-    num_int = len(re.findall(r'\bINT\.', full_corpus, re.IGNORECASE))
-    num_ext = len(re.findall(r'\bEXT\.', full_corpus, re.IGNORECASE))
-    num_fade = len(re.findall(r'FADE', full_corpus, re.IGNORECASE))
-    num_cut = len(re.findall(r'CUT TO', full_corpus, re.IGNORECASE))
+    pattern_counts = pattern_counter.counts
+    num_int = pattern_counts['int']
+    num_ext = pattern_counts['ext']
+    num_fade = pattern_counts['fade']
+    num_cut = pattern_counts['cut']
     
     stats = {
         'num_scripts': num_scripts,
@@ -154,7 +158,7 @@ def collect_movie_scripts():
     
     print(f"\n✓ Movie scripts collection complete!")
     print(f"  - Saved to: {output_file}")
-    print(f"  - Number of scripts: {num_scripts}")
+    print(f"  - Number of scripts: {num_scripts} ({manifest.summary()})")
     print(f"  - Total size: {stats['total_size_mb']:.2f} MB")
     print(f"  - Statistics saved to: {stats_file}")
     
@@ -2,18 +2,19 @@
 Collect real Python code from popular open-source projects
 Using direct file access (no API auth needed)
 """
-import requests
 from pathlib import Path
-import time
 import json
 
+from fetch_utils import Fetcher, CollectionManifest
+from corpus_writer import CorpusWriter
+from corpus_stats import PatternCounter, PYTHON_PATTERNS
+
 def collect_python_code():
     """Collect Python code from open-source projects"""
     
     output_dir = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/python_code")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    all_code = []
     metadata = []
     
     print("Collecting Python code from open-source projects...")
@@ -64,10 +65,24 @@ def collect_python_code():
         'User-Agent': 'Educational-Research-Project'
     }
     
-    for file_name, url in files:
-        try:
-            print(f"  Fetching: {file_name}...")
-            response = requests.get(url, headers=headers, timeout=15)
+    manifest = CollectionManifest(output_dir / "manifest.json")
+    
+    # Python-specific patterns, counted in one scan per file as it is written
+    pattern_counter = PatternCounter(PYTHON_PATTERNS)
+    
+    # Each file is appended to disk as soon as it arrives
+    output_file = output_dir / "python_code_corpus.txt"
+    
+    with Fetcher(headers=headers, rate=10.0, cache_dir=output_dir / "http_cache") as fetcher, \
+         CorpusWriter(output_file) as writer, manifest:
+        print(f"  Fetching {len(files)} files...")
+        responses = fetcher.get_all([url for _, url in files])
+        
+        for (file_name, url), (_, response, error) in zip(files, responses):
+            print(f"  {file_name}:")
+            if error is not None:
+                print(f"    ✗ Error: {error}")
+                continue
             
             if response.status_code == 200:
                 content = response.text
@@ -79,7 +94,9 @@ def collect_python_code():
                     code_block += f"{'='*80}\n\n"
                     code_block += content + "\n"
                     
-                    all_code.append(code_block)
+                    writer.write(file_name, code_block)
+                    manifest.record(file_name, url, code_block)
+                    pattern_counter.count(code_block)
                     
                     metadata.append({
                         'file': file_name,
@@ -92,33 +109,22 @@ def collect_python_code():
                     print(f"    ✗ File too short")
             else:
                 print(f"    ✗ Status {response.status_code}")
-            
-            time.sleep(1)  # Rate limiting
-            
-        except Exception as e:
-            print(f"    ✗ Error: {e}")
-    
-    # Save all code
-    output_file = output_dir / "python_code_corpus.txt"
-    full_corpus = "\n".join(all_code)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_corpus)
     
     # Calculate statistics
-    total_chars = len(full_corpus)
-    total_lines = full_corpus.count('\n')
-    num_files = len(all_code)
+    total_chars = writer.total_chars
+    total_lines = writer.total_lines
+    num_files = writer.num_documents
     
     # Count Python-specific patterns
-    num_def = full_corpus.count('def ')
-    num_class = full_corpus.count('class ')
-    num_import = full_corpus.count('import ')
-    num_if = full_corpus.count('if ')
-    num_for = full_corpus.count('for ')
-    num_try = full_corpus.count('try:')
-    num_async = full_corpus.count('async ')
-    num_lambda = full_corpus.count('lambda ')
+    pattern_counts = pattern_counter.counts
+    num_def = pattern_counts['def ']
+    num_class = pattern_counts['class ']
+    num_import = pattern_counts['import ']
+    num_if = pattern_counts['if ']
+    num_for = pattern_counts['for ']
+    num_try = pattern_counts['try:']
+    num_async = pattern_counts['async ']
+    num_lambda = pattern_counts['lambda ']
     
     stats = {
         'num_files': num_files,
@@ -165,7 +171,7 @@ def collect_python_code():
     
     print(f"\n✓ Python code collection complete!")
     print(f"  - Saved to: {output_file}")
-    print(f"  - Number of files: {num_files}")
+    print(f"  - Number of files: {num_files} ({manifest.summary()})")
     print(f"  - Total size: {stats['total_size_mb']:.2f} MB")
     print(f"  - Statistics saved to: {stats_file}")
     
@@ -2,19 +2,21 @@
 Collect real Rust code from popular GitHub repositories
 Using GitHub API to fetch actual Rust source files
 """
-import requests
 from pathlib import Path
-import time
 import base64
 import json
+import re
 
-def collect_rust_code():
+from fetch_utils import Fetcher, CollectionManifest
+from corpus_writer import CorpusWriter
+from corpus_stats import PatternCounter, RUST_PATTERNS
+
+def collect_rust_code(output_dir="/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/rust_code"):
     """Collect Rust code from real GitHub repositories"""
     
-    output_dir = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/rust_code")
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    all_code = []
     metadata = []
     
     print("Collecting Rust code from GitHub repositories...")
@@ -35,121 +37,130 @@ def collect_rust_code():
     
     total_files = 0
     
-    for repo in repos:
-        print(f"\n  Fetching from {repo}...")
+    manifest = CollectionManifest(output_dir / "manifest.json")
+    
+    # Rust-specific patterns, counted in one scan per file as it is written
+    pattern_counter = PatternCounter(RUST_PATTERNS)
+    
+    # Each file is appended to disk as soon as it arrives
+    output_file = output_dir / "rust_code_corpus.txt"
+    writer = CorpusWriter(output_file)
+    
+    def add_document(doc_id, url, code_block):
+        writer.write(doc_id, code_block)
+        manifest.record(doc_id, url, code_block)
+        pattern_counter.count(code_block)
+    
+    with Fetcher(headers=headers, rate=5.0, cache_dir=output_dir / "http_cache") as fetcher, writer, manifest:
+        # Get repository contents (src directory typically), all repos at once
+        listing_urls = [f"https://api.github.com/repos/{repo}/contents/src" for repo in repos]
         
-        try:
-            # Get repository contents (src directory typically)
-            url = f"https://api.github.com/repos/{repo}/contents/src"
-            response = requests.get(url, headers=headers, timeout=15)
+        for repo, (url, response, error) in zip(repos, fetcher.get_all(listing_urls, timeout=15)):
+            print(f"\n  Fetching from {repo}...")
+            if error is not None:
+                print(f"    ✗ Error with repo {repo}: {error}")
+                continue
             
-            if response.status_code == 200:
-                contents = response.json()
-                
-                # Filter for .rs files
-                rs_files = [item for item in contents if item['name'].endswith('.rs')][:10]  # Limit to 10 per repo
-                
-                print(f"    Found {len(rs_files)} .rs files, fetching...")
-                
-                for file_info in rs_files:
-                    try:
-                        # Fetch the actual file content
-                        file_url = file_info['url']
-                        file_response = requests.get(file_url, headers=headers, timeout=10)
+            try:
+                if response.status_code == 200:
+                    contents = response.json()
+                    
+                    # Filter for .rs files
+                    rs_files = [item for item in contents if item['name'].endswith('.rs')][:10]  # Limit to 10 per repo
+                    
+                    print(f"    Found {len(rs_files)} .rs files, fetching...")
+                    
+                    # Fetch the actual file contents concurrently
+                    file_urls = [file_info['url'] for file_info in rs_files]
+                    file_results = fetcher.get_all(file_urls, timeout=10)
+                    
+                    for file_info, (_, file_response, file_error) in zip(rs_files, file_results):
+                        if file_error is not None:
+                            print(f"      ✗ Error fetching {file_info['name']}: {file_error}")
+                            continue
                         
-                        if file_response.status_code == 200:
-                            file_data = file_response.json()
-                            
-                            # Decode base64 content
-                            if 'content' in file_data:
-                                content_b64 = file_data['content']
-                                content = base64.b64decode(content_b64).decode('utf-8', errors='ignore')
+                        try:
+                            if file_response.status_code == 200:
+                                file_data = file_response.json()
                                 
-                                if len(content) > 100:  # Only include substantial files
-                                    code_block = f"\n{'='*80}\n"
-                                    code_block += f"// FILE: {file_info['name']}\n"
-                                    code_block += f"// REPO: {repo}\n"
-                                    code_block += f"// PATH: {file_info['path']}\n"
-                                    code_block += f"{'='*80}\n\n"
-                                    code_block += content + "\n"
+                                # Decode base64 content
+                                if 'content' in file_data:
+                                    content_b64 = file_data['content']
+                                    content = base64.b64decode(content_b64).decode('utf-8', errors='ignore')
                                     
-                                    all_code.append(code_block)
-                                    total_files += 1
-                                    
-                                    metadata.append({
-                                        'repo': repo,
-                                        'file': file_info['name'],
-                                        'path': file_info['path'],
-                                        'size': len(content)
-                                    })
-                                    
-                                    print(f"      ✓ {file_info['name']} ({len(content)} chars)")
-                        
-                        time.sleep(1)  # Rate limiting
-                        
-                    except Exception as e:
-                        print(f"      ✗ Error fetching {file_info['name']}: {e}")
-                        continue
+                                    if len(content) > 100:  # Only include substantial files
+                                        code_block = f"\n{'='*80}\n"
+                                        code_block += f"// FILE: {file_info['name']}\n"
+                                        code_block += f"// REPO: {repo}\n"
+                                        code_block += f"// PATH: {file_info['path']}\n"
+                                        code_block += f"{'='*80}\n\n"
+                                        code_block += content + "\n"
+                                        
+                                        add_document(f"{repo}/{file_info['path']}", file_info['url'], code_block)
+                                        total_files += 1
+                                        
+                                        metadata.append({
+                                            'repo': repo,
+                                            'file': file_info['name'],
+                                            'path': file_info['path'],
+                                            'size': len(content)
+                                        })
+                                        
+                                        print(f"      ✓ {file_info['name']} ({len(content)} chars)")
+                            
+                        except Exception as e:
+                            print(f"      ✗ Error fetching {file_info['name']}: {e}")
+                            continue
+                    
+                elif response.status_code == 403:
+                    print(f"    ✗ Rate limited by GitHub API")
+                    break
+                else:
+                    print(f"    ✗ Status {response.status_code}")
                 
-            elif response.status_code == 403:
-                print(f"    ✗ Rate limited by GitHub API")
-                break
-            else:
-                print(f"    ✗ Status {response.status_code}")
-            
-            time.sleep(2)  # Be nice to GitHub
-            
-        except Exception as e:
-            print(f"    ✗ Error with repo {repo}: {e}")
-            continue
-    
-    # Also fetch from Rust by Example (public educational resource)
-    print("\n  Fetching from Rust By Example...")
-    try:
-        # Rust by Example has code examples in their GitHub repo
-        rbe_url = "https://api.github.com/repos/rust-lang/rust-by-example/contents/src"
-        response = requests.get(rbe_url, headers=headers, timeout=15)
+            except Exception as e:
+                print(f"    ✗ Error with repo {repo}: {e}")
+                continue
         
-        if response.status_code == 200:
-            contents = response.json()
-            
-            # Get .md files which contain code examples
-            md_files = [item for item in contents if item['name'].endswith('.md')][:5]
+        # Also fetch from Rust by Example (public educational resource)
+        print("\n  Fetching from Rust By Example...")
+        try:
+            # Rust by Example has code examples in their GitHub repo
+            rbe_url = "https://api.github.com/repos/rust-lang/rust-by-example/contents/src"
+            response = fetcher.get(rbe_url, timeout=15)
             
-            for file_info in md_files:
-                try:
-                    file_response = requests.get(file_info['url'], headers=headers, timeout=10)
-                    if file_response.status_code == 200:
+            if response.status_code == 200:
+                contents = response.json()
+                
+                # Get .md files which contain code examples
+                md_files = [item for item in contents if item['name'].endswith('.md')][:5]
+                md_results = fetcher.get_all([file_info['url'] for file_info in md_files], timeout=10)
+                
+                for file_info, (_, file_response, file_error) in zip(md_files, md_results):
+                    if file_error is not None or file_response.status_code != 200:
+                        continue
+                    try:
                         file_data = file_response.json()
                         if 'content' in file_data:
                             content = base64.b64decode(file_data['content']).decode('utf-8', errors='ignore')
-                            
+                        
                             # Extract Rust code blocks from markdown
-                            import re
                             rust_blocks = re.findall(r'```rust\n(.*?)```', content, re.DOTALL)
-                            
+                        
                             for i, block in enumerate(rust_blocks):
                                 if len(block) > 50:
                                     code_block = f"\n{'='*80}\n"
                                     code_block += f"// SOURCE: Rust By Example - {file_info['name']} (block {i+1})\n"
                                     code_block += f"{'='*80}\n\n"
                                     code_block += block + "\n"
-                                    all_code.append(code_block)
+                                    add_document(f"rust-by-example/{file_info['name']}#{i+1}", file_info['url'], code_block)
                                     total_files += 1
-                    
-                    time.sleep(1)
-                except:
-                    continue
-                    
-    except Exception as e:
-        print(f"    ✗ Error with Rust By Example: {e}")
-    
-    # Save all code
-    output_file = output_dir / "rust_code_corpus.txt"
-    full_corpus = "\n".join(all_code)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(full_corpus)
+                    except Exception as e:
+                        print(f"    ✗ Error with {file_info['name']}: {e}")
+                        continue
+                        
+        except Exception as e:
+            print(f"    ✗ Error with Rust By Example: {e}")
     
     # Save metadata
     metadata_file = output_dir / "metadata.json"
@@ -157,17 +168,18 @@ def collect_rust_code():
         json.dump(metadata, f, indent=2)
     
     # Calculate statistics
-    total_chars = len(full_corpus)
-    total_lines = full_corpus.count('\n')
-    num_files = len(all_code)
+    total_chars = writer.total_chars
+    total_lines = writer.total_lines
+    num_files = writer.num_documents
     
     # Count Rust-specific patterns
-    num_fn = full_corpus.count('fn ')
-    num_impl = full_corpus.count('impl ')
-    num_struct = full_corpus.count('struct ')
-    num_enum = full_corpus.count('enum ')
-    num_match = full_corpus.count('match ')
-    num_unwrap = full_corpus.count('.unwrap()')
+    pattern_counts = pattern_counter.counts
+    num_fn = pattern_counts['fn ']
+    num_impl = pattern_counts['impl ']
+    num_struct = pattern_counts['struct ']
+    num_enum = pattern_counts['enum ']
+    num_match = pattern_counts['match ']
+    num_unwrap = pattern_counts['.unwrap()']
     
     stats = {
         'num_files': num_files,
@@ -205,7 +217,7 @@ def collect_rust_code():
     
     print(f"\n✓ Rust code collection complete!")
     print(f"  - Saved to: {output_file}")
-    print(f"  - Number of files: {num_files}")
+    print(f"  - Number of files: {num_files} ({manifest.summary()})")
     print(f"  - Total size: {stats['total_size_mb']:.2f} MB")
     print(f"  - Statistics saved to: {stats_file}")
     
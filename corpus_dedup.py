@@ -0,0 +1,189 @@
+"""
+Deduplication and sampling of tokenizer training chunks
+Exact hashes and MinHash/LSH drop repeated documents and chunks, then chunks
+are sampled per document down to a byte budget before training
+"""
+import re
+import zlib
+import random
+import hashlib
+
+import numpy as np
+
+from corpus_reader import iter_corpus_document_chunks, iter_corpus_documents
+
+_WORD = re.compile(r"\S+")
+
+# Shingles hashed per block in MinHasher.signature
+SHINGLE_BLOCK = 4096
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Shingle hashes are CRC32 so signatures are identical across runs; the
+    num_perm permutations are multiply-shift hashes ((a*x + b) mod 2**64,
+    top 32 bits) evaluated with NumPy.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=5, seed=0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """CRC32 of every shingle_size-word window (the whole text if shorter)"""
+        words = _WORD.findall(text)
+        k = self.shingle_size
+        windows = [" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))]
+        return np.unique(np.fromiter((zlib.crc32(w.encode('utf-8')) for w in windows),
+                                     dtype=np.uint64, count=len(windows)))
+
+    def signature(self, text, block_size=SHINGLE_BLOCK):
+        """num_perm minimum hash values of a text"""
+        x = self.shingles(text)
+        # Hash block_size shingles at a time, so memory stays at num_perm x block_size
+        # however long the document is
+        minima = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(x), block_size):
+            block = x[start:start + block_size]
+            # uint64 arithmetic wraps, which is exactly the mod 2**64 we want
+            hashed = (self.a[:, None] * block[None, :] + self.b[:, None]) >> np.uint64(32)
+            np.minimum(minima, hashed.min(axis=1), out=minima)
+        return minima
+
+class NearDuplicateIndex:
+    """LSH index answering "is this text a near duplicate of one already kept?" """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, seed=0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm {num_perm} must be a multiple of bands {bands}")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, seed=seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = []
+
+    def add_if_new(self, text):
+        """Index text and return True, or return False if it is a near duplicate"""
+        signature = self.hasher.signature(text)
+        keys = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+        candidates = set()
+        for band, key in zip(self.buckets, keys):
+            candidates.update(band.get(key, ()))
+        for other in candidates:
+            # Fraction of equal minima estimates the Jaccard similarity
+            if np.mean(self.signatures[other] == signature) >= self.threshold:
+                return False
+
+        idx = len(self.signatures)
+        self.signatures.append(signature)
+        for band, key in zip(self.buckets, keys):
+            band.setdefault(key, []).append(idx)
+        return True
+
+def _digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def select_training_chunks(data_file, chunk_size=10000, near_dup_threshold=0.8, byte_budget=None,
+                           fraction=None, seed=0):
+    """
+    Pick the chunks a tokenizer should train on.
+
+    Chunks come from iter_corpus_document_chunks, so no chunk mixes two
+    documents. Whole documents are dropped first (exact hash, then MinHash
+    similarity >= near_dup_threshold; None disables the MinHash pass), then
+    individual chunks the same way. With byte_budget set, every remaining
+    document keeps a random share of its chunks proportional to its size
+    (stratified by document), so small documents are not crowded out;
+    fraction instead sets the budget relative to the raw corpus bytes.
+    Returns (sorted kept chunk indices, report dict).
+    """
+    report = {'documents': 0, 'exact_duplicate_documents': 0, 'near_duplicate_documents': 0,
+              'chunks': 0, 'exact_duplicate_chunks': 0, 'near_duplicate_chunks': 0,
+              'input_bytes': 0, 'deduplicated_bytes': 0}
+
+    # Document-level pass
+    dropped_docs = set()
+    seen = set()
+    near_docs = NearDuplicateIndex(near_dup_threshold, seed=seed) if near_dup_threshold else None
+    for doc_index, doc in enumerate(iter_corpus_documents(data_file)):
+        report['documents'] += 1
+        digest = _digest(doc)
+        if digest in seen:
+            dropped_docs.add(doc_index)
+            report['exact_duplicate_documents'] += 1
+        elif near_docs is not None and not near_docs.add_if_new(doc):
+            dropped_docs.add(doc_index)
+            report['near_duplicate_documents'] += 1
+        seen.add(digest)
+
+    # Chunk-level pass over the surviving documents
+    strata = {}
+    seen = set()
+    near_chunks = NearDuplicateIndex(near_dup_threshold, seed=seed) if near_dup_threshold else None
+    for chunk_index, (doc_index, chunk) in enumerate(iter_corpus_document_chunks(data_file, chunk_size)):
+        report['chunks'] += 1
+        num_bytes = len(chunk.encode('utf-8'))
+        report['input_bytes'] += num_bytes
+        if doc_index in dropped_docs:
+            continue
+        digest = _digest(chunk)
+        if digest in seen:
+            report['exact_duplicate_chunks'] += 1
+            continue
+        seen.add(digest)
+        if near_chunks is not None and not near_chunks.add_if_new(chunk):
+            report['near_duplicate_chunks'] += 1
+            continue
+        strata.setdefault(doc_index, []).append((chunk_index, num_bytes))
+        report['deduplicated_bytes'] += num_bytes
+
+    if fraction is not None:
+        byte_budget = int(report['input_bytes'] * fraction)
+
+    kept = []
+    leftover = []
+    rng = random.Random(seed)
+    total = report['deduplicated_bytes']
+    for chunks in strata.values():
+        if byte_budget is None or byte_budget >= total:
+            kept.extend(chunks)
+            continue
+        quota = byte_budget * sum(n for _, n in chunks) / total
+        order = chunks[:]
+        rng.shuffle(order)
+        taken = 0
+        for chunk_index, num_bytes in order:
+            # Round to the nearest chunk so many small documents do not overshoot the budget
+            if taken + num_bytes / 2 <= quota:
+                kept.append((chunk_index, num_bytes))
+                taken += num_bytes
+            else:
+                leftover.append((chunk_index, num_bytes))
+
+    if byte_budget is not None and leftover:
+        # Spend what rounding left of the budget, and never train on nothing
+        selected = sum(n for _, n in kept)
+        rng.shuffle(leftover)
+        for chunk_index, num_bytes in leftover:
+            if not kept or selected + num_bytes / 2 <= byte_budget:
+                kept.append((chunk_index, num_bytes))
+                selected += num_bytes
+
+    kept.sort()
+    report['selected_bytes'] = sum(n for _, n in kept)
+    report['selected_chunks'] = len(kept)
+    report['selected_fraction'] = report['selected_bytes'] / report['input_bytes'] if report['input_bytes'] else 0.0
+    return [chunk_index for chunk_index, _ in kept], report
+
+def iter_selected_chunks(data_file, chunk_indices, chunk_size=10000):
+    """Stream only the chosen chunks, in corpus order"""
+    wanted = set(chunk_indices)
+    for chunk_index, (_, chunk) in enumerate(iter_corpus_document_chunks(data_file, chunk_size)):
+        if chunk_index in wanted:
+            yield chunk
@@ -0,0 +1,109 @@
+"""
+Streaming, memory-mapped reader for the domain corpora
+Yields UTF-8-safe text chunks without loading the whole file into memory
+"""
+import mmap
+import os
+
+# Header/footer line the collectors write around every document
+DOC_DELIMITER = b"\n" + b"=" * 80 + b"\n"
+
+def _utf8_boundary(mm, pos, start):
+    """Move pos back so it does not land inside a multibyte UTF-8 character"""
+    # Continuation bytes look like 0b10xxxxxx; a character is at most 4 bytes
+    while pos > start and (mm[pos] & 0xC0) == 0x80:
+        pos -= 1
+    # Keep \r\n pairs together so newline translation matches open(..., 'r')
+    if pos > start + 1 and mm[pos - 1] == 0x0D and mm[pos] == 0x0A:
+        pos -= 1
+    return pos
+
+def iter_document_offsets(mm):
+    """Yield (start, end) byte offsets of each `====`-delimited document"""
+    # Delimiters come in pairs (header open/close); documents start at the opening one
+    prev = 0
+    count = 0
+    pos = mm.find(DOC_DELIMITER, 0)
+    while pos != -1:
+        if count % 2 == 0 and pos > prev:
+            yield prev, pos
+            prev = pos
+        count += 1
+        pos = mm.find(DOC_DELIMITER, pos + len(DOC_DELIMITER))
+    if len(mm) > prev:
+        yield prev, len(mm)
+
+def _iter_span_chunks(mm, start, end, chunk_size):
+    """Split mm[start:end] into chunks of about chunk_size bytes"""
+    pos = start
+    while pos < end:
+        cut = min(pos + chunk_size, end)
+        if cut < end:
+            cut = _utf8_boundary(mm, cut, pos)
+            if cut == pos:
+                cut = min(pos + chunk_size, end)
+        yield pos, cut
+        pos = cut
+
+def iter_corpus_chunks(data_file, chunk_size=10000, split_documents=False):
+    """
+    Yield text chunks of roughly chunk_size bytes from a corpus file.
+
+    The file is memory-mapped, so peak memory stays around one chunk no
+    matter how large the corpus is. Chunks never split a multibyte UTF-8
+    character, and newlines are translated the same way open(..., 'r') does.
+    With split_documents=True, every `====` document boundary is also a
+    chunk boundary, so no chunk mixes text from two documents.
+    """
+    if os.path.getsize(data_file) == 0:
+        return
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if split_documents:
+                spans = iter_document_offsets(mm)
+            else:
+                spans = [(0, len(mm))]
+
+            for doc_start, doc_end in spans:
+                for start, end in _iter_span_chunks(mm, doc_start, doc_end, chunk_size):
+                    chunk = mm[start:end].decode('utf-8', errors='replace')
+                    yield chunk.replace('\r\n', '\n').replace('\r', '\n')
+
+def iter_corpus_document_chunks(data_file, chunk_size=10000):
+    """Yield (document index, chunk) pairs, chunked like split_documents=True"""
+    if os.path.getsize(data_file) == 0:
+        return
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for doc_index, (doc_start, doc_end) in enumerate(iter_document_offsets(mm)):
+                for start, end in _iter_span_chunks(mm, doc_start, doc_end, chunk_size):
+                    chunk = mm[start:end].decode('utf-8', errors='replace')
+                    yield doc_index, chunk.replace('\r\n', '\n').replace('\r', '\n')
+
+def count_corpus_chunks(data_file, chunk_size=10000, split_documents=False):
+    """Count the chunks iter_corpus_chunks would yield without decoding them"""
+    if os.path.getsize(data_file) == 0:
+        return 0
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            spans = iter_document_offsets(mm) if split_documents else [(0, len(mm))]
+            return sum(1 for span in spans for _ in _iter_span_chunks(mm, span[0], span[1], chunk_size))
+
+def read_corpus_text(data_file):
+    """Read a whole corpus as a string (for analysis steps that need it)"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def iter_corpus_documents(data_file):
+    """Yield each `====`-delimited document of a corpus as a string"""
+    if os.path.getsize(data_file) == 0:
+        return
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in iter_document_offsets(mm):
+                doc = mm[start:end].decode('utf-8', errors='replace')
+                yield doc.replace('\r\n', '\n').replace('\r', '\n')
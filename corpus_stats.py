@@ -0,0 +1,141 @@
+"""
+Single-pass pattern statistics for the domain corpora
+All of a domain's patterns are combined into one alternation regex, so a
+document (or a streamed corpus) is scanned once instead of once per pattern
+"""
+import re
+import argparse
+from pathlib import Path
+
+from corpus_reader import iter_corpus_chunks
+
+# Patterns reported in each collector's statistics.txt
+PYTHON_PATTERNS = ['def ', 'class ', 'import ', 'if ', 'for ', 'try:', 'async ', 'lambda ']
+RUST_PATTERNS = ['fn ', 'impl ', 'struct ', 'enum ', 'match ', '.unwrap()']
+MOVIE_PATTERNS = {
+    'int': r'\bINT\.',
+    'ext': r'\bEXT\.',
+    'fade': r'FADE',
+    'cut': r'CUT TO',
+}
+
+class PatternCounter:
+    """
+    Count several patterns in one scan of the text.
+
+    patterns maps a name to a regex (a plain list is taken as literal
+    strings, named after themselves). Matching is leftmost-first over the
+    combined alternation, so counts equal separate non-overlapping scans as
+    long as no two patterns can match overlapping text. Complete documents
+    go through count(); arbitrarily split text goes through feed() and
+    finish(), which carry the last max_match_len characters between chunks
+    so no match is lost or counted twice at a chunk boundary.
+    """
+
+    def __init__(self, patterns, flags=0, max_match_len=256):
+        if isinstance(patterns, dict):
+            self.patterns = dict(patterns)
+        else:
+            self.patterns = {p: re.escape(p) for p in patterns}
+            max_match_len = max(len(p) for p in patterns)
+        self.flags = flags
+        self.max_match_len = max_match_len
+
+        self.regex = re.compile("|".join(f"(?:{p})" for p in self.patterns.values()), flags)
+        if self.regex.groups:
+            raise ValueError("Patterns must not contain capturing groups; use (?:...)")
+        self._by_name = [(name, re.compile(p, flags)) for name, p in self.patterns.items()]
+        self._names = {}
+
+        self.counts = dict.fromkeys(self.patterns, 0)
+        self._carry = ""
+        self._resume = 0
+
+    def _name_of(self, matched):
+        """Pattern name a matched string belongs to (first alternative that matches it)"""
+        name = self._names.get(matched)
+        if name is None:
+            name = next(n for n, regex in self._by_name if regex.fullmatch(matched))
+            self._names[matched] = name
+        return name
+
+    def _add(self, matches):
+        # Few distinct strings match, so tally them first and map names once
+        tally = {}
+        for matched in matches:
+            tally[matched] = tally.get(matched, 0) + 1
+        for matched, n in tally.items():
+            self.counts[self._name_of(matched)] += n
+
+    def count(self, text):
+        """Add the pattern counts of one complete document"""
+        self._add(self.regex.findall(text))
+        return self
+
+    def feed(self, chunk):
+        """Add the next piece of a stream of text"""
+        buffer = self._carry + chunk
+        # Matches starting before limit fit entirely inside the buffer
+        limit = len(buffer) - (self.max_match_len - 1)
+        pos = self._resume
+        matches = []
+        for match in self.regex.finditer(buffer, pos):
+            if match.start() >= limit:
+                break
+            matches.append(match.group())
+            pos = match.end()
+        self._add(matches)
+
+        # Keep one character of context before the resume point for \b and lookbehinds
+        resume = max(pos, limit)
+        keep_from = max(0, resume - 1)
+        self._carry = buffer[keep_from:]
+        self._resume = resume - keep_from
+        return self
+
+    def finish(self):
+        """Count whatever is still buffered and reset the stream"""
+        self._add(self.regex.findall(self._carry, self._resume))
+        self._carry = ""
+        self._resume = 0
+        return self
+
+    def merge(self, other):
+        """Add the counts of another counter over the same patterns"""
+        for name, n in other.counts.items():
+            self.counts[name] += n
+        return self
+
+def count_corpus_file(data_file, counter, chunk_size=1024 * 1024):
+    """Stream a corpus file through a counter in one pass"""
+    for chunk in iter_corpus_chunks(data_file, chunk_size=chunk_size):
+        counter.feed(chunk)
+    return counter.finish().counts
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+def main():
+    parser = argparse.ArgumentParser(description="Count domain patterns in the collected corpora")
+    parser.add_argument('--data-dir', default=str(DATA_DIR), help="Directory holding the <domain>/ corpora")
+    args = parser.parse_args()
+
+    base_dir = Path(args.data_dir)
+    corpora = [
+        ('python_code', base_dir / "python_code/python_code_corpus.txt", PatternCounter(PYTHON_PATTERNS)),
+        ('rust_code', base_dir / "rust_code/rust_code_corpus.txt", PatternCounter(RUST_PATTERNS)),
+        ('movie_scripts', base_dir / "movie_scripts/movie_scripts_corpus.txt",
+         PatternCounter(MOVIE_PATTERNS, flags=re.IGNORECASE)),
+    ]
+
+    results = {}
+    for domain, data_file, counter in corpora:
+        if not data_file.exists():
+            print(f"✗ {domain}: {data_file} not found")
+            continue
+        results[domain] = count_corpus_file(data_file, counter)
+        print(f"✓ {domain}: " + ", ".join(f"{name.strip()}={n:,}" for name, n in results[domain].items()))
+
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Streaming corpus writer for the collectors
+Appends each document to disk as soon as it is fetched, keeps a
+document id -> byte offset/length index, and renames into place on completion
+"""
+import os
+import json
+from pathlib import Path
+
+class CorpusWriter:
+    """
+    Buffered, atomic writer producing the same layout as "\\n".join(documents).
+
+    Documents go to <corpus>.partial while collecting; close() fsyncs it,
+    renames it over the corpus file and writes <corpus stem>.index.json with
+    the byte offset and length of every document. If the collector dies, the
+    partial file keeps everything written so far and the old corpus is
+    left untouched.
+    """
+
+    def __init__(self, output_file, buffer_size=1024 * 1024):
+        self.output_file = Path(output_file)
+        self.partial_file = self.output_file.with_name(self.output_file.name + ".partial")
+        self.index_file = self.output_file.with_name(self.output_file.stem + ".index.json")
+        self.file = open(self.partial_file, 'wb', buffering=buffer_size)
+
+        self.index = []
+        self.offset = 0
+        self.total_chars = 0
+        self.total_lines = 0
+
+    @property
+    def num_documents(self):
+        return len(self.index)
+
+    def write(self, doc_id, text):
+        """Append one document"""
+        if self.index:
+            # Separator between documents, as "\n".join would insert
+            self.file.write(b"\n")
+            self.offset += 1
+            self.total_chars += 1
+            self.total_lines += 1
+
+        data = text.encode('utf-8')
+        self.file.write(data)
+        self.index.append({'id': doc_id, 'offset': self.offset, 'length': len(data)})
+        self.offset += len(data)
+        self.total_chars += len(text)
+        self.total_lines += text.count('\n')
+
+    def close(self):
+        """Flush, move the finished corpus into place and write the index"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.partial_file, self.output_file)
+
+        tmp_index = self.index_file.with_name(self.index_file.name + ".tmp")
+        with open(tmp_index, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_index, self.index_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Keep the partial corpus for inspection; never replace the old one
+            self.file.close()
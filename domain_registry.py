@@ -0,0 +1,69 @@
+"""
+Declarative registry of the corpora the pipeline trains and analyzes
+Each domain is one entry of domains.json (corpus, vocab size, training and
+analysis options); adding a domain means adding an entry, not code
+"""
+import json
+from pathlib import Path
+
+# Options every domain gets unless its entry (or the config "defaults") says otherwise
+DOMAIN_DEFAULTS = {
+    'vocab_size': 4096,
+    'chunker': 'fixed',
+    'split_documents': False,
+    'sampling': None,
+    'export_shards': True,
+    'pretokenize_workers': 0,
+    'top_n_tokens': 30,
+    'top_n_patterns': 50,
+}
+
+def load_domain_registry(config_file, base_dir=None):
+    """
+    Read a domains.json config into a list of domain dicts, in file order.
+
+    Corpus paths are resolved against data_dir, which is itself relative to
+    base_dir (default: the config file's directory). Entries with
+    "enabled": false are dropped.
+    """
+    config_file = Path(config_file)
+    with open(config_file) as f:
+        config = json.load(f)
+
+    base_dir = Path(base_dir) if base_dir else config_file.parent
+    data_dir = base_dir / config.get('data_dir', 'data')
+    defaults = {**DOMAIN_DEFAULTS, **config.get('defaults', {})}
+
+    domains = []
+    seen = set()
+    for entry in config['domains']:
+        name = entry['name']
+        if name in seen:
+            raise ValueError(f"Duplicate domain {name!r} in {config_file}")
+        seen.add(name)
+        unknown = set(entry) - set(DOMAIN_DEFAULTS) - {'name', 'corpus', 'display_name', 'enabled'}
+        if unknown:
+            raise ValueError(f"Unknown option(s) for domain {name!r}: {', '.join(sorted(unknown))}")
+        if not entry.get('enabled', True):
+            continue
+
+        domain = {**defaults, **entry}
+        domain.pop('enabled', None)
+        domain['corpus'] = data_dir / entry.get('corpus', f"{name}/{name}_corpus.txt")
+        domain.setdefault('display_name', name.replace('_', ' ').title())
+        domains.append(domain)
+    return domains
+
+def select_domains(domains, names=None):
+    """The registry entries named in names (all of them if names is None)"""
+    if names is None:
+        return list(domains)
+    known = {domain['name'] for domain in domains}
+    missing = [name for name in names if name not in known]
+    if missing:
+        raise ValueError(f"Unknown domain(s) {', '.join(missing)}; choose from {', '.join(sorted(known))}")
+    return [domain for domain in domains if domain['name'] in names]
+
+def domain_jobs(domains):
+    """(domain, corpus path, vocab size) tuples, as used by the benchmark scripts"""
+    return [(domain['name'], domain['corpus'], domain['vocab_size']) for domain in domains]
@@ -0,0 +1,124 @@
+"""
+Memoizing encode layer for the domain tokenizers
+Pre-tokenizes with the tokenizer's own split pattern and caches the BPE ids
+of every piece in a byte-bounded LRU, so hot strings skip BPE entirely
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import regex
+
+from vocab_table import to_byte_level, split_pattern
+
+class ByteLRUCache:
+    """LRU mapping bounded by the approximate bytes of its entries, with hit/miss counters"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def entry_size(key, ids):
+        # Text plus 4 bytes per id; Python object overhead is ignored
+        return len(key) + 4 * len(ids)
+
+    def get(self, key):
+        ids = self.entries.get(key)
+        if ids is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return ids
+
+    def put(self, key, ids):
+        size = self.entry_size(key, ids)
+        if size > self.max_bytes:
+            return
+        # Two threads can miss on the same key and both store it
+        old_ids = self.entries.pop(key, None)
+        if old_ids is not None:
+            self.current_bytes -= self.entry_size(key, old_ids)
+        self.entries[key] = ids
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            old_key, old_ids = self.entries.popitem(last=False)
+            self.current_bytes -= self.entry_size(old_key, old_ids)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        self.entries.clear()
+        self.current_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+class CachedEncoder:
+    """
+    encode()/encode_batch() for a nanochat HuggingFaceTokenizer with a piece cache.
+
+    BPE never merges across pre-token boundaries, so encoding piece by piece
+    with cached results gives exactly the ids of tokenizer.encode(). Texts
+    containing a special-token string, and tokenizers whose pre-tokenizer is
+    not the plain Split + ByteLevel layout, go through the uncached path.
+    """
+
+    def __init__(self, tokenizer, max_bytes=32 * 1024 * 1024):
+        self.tokenizer = tokenizer
+        self.model = tokenizer.tokenizer.model
+        self.cache = ByteLRUCache(max_bytes)
+        self.lock = threading.Lock()
+
+        tokenizer_data = json.loads(tokenizer.tokenizer.to_str())
+        pattern = split_pattern(tokenizer_data)
+        self.split = regex.compile(pattern) if pattern is not None else None
+        self.special_strings = [t['content'] for t in tokenizer_data.get('added_tokens', [])]
+
+    def _encode_piece(self, piece):
+        return tuple(token.id for token in self.model.tokenize(to_byte_level(piece)))
+
+    def encode(self, text):
+        """Token ids of text, identical to tokenizer.encode(text)"""
+        if self.split is None or any(s in text for s in self.special_strings):
+            return self.tokenizer.encode(text)
+
+        # The lock only covers cache lookups and stores; BPE on misses runs unlocked
+        pieces = self.split.findall(text)
+        with self.lock:
+            found = [self.cache.get(piece) for piece in pieces]
+        missing = {}
+        for piece, piece_ids in zip(pieces, found):
+            if piece_ids is None and piece not in missing:
+                missing[piece] = self._encode_piece(piece)
+        if missing:
+            with self.lock:
+                for piece, piece_ids in missing.items():
+                    self.cache.put(piece, piece_ids)
+
+        ids = []
+        for piece, piece_ids in zip(pieces, found):
+            ids.extend(missing[piece] if piece_ids is None else piece_ids)
+        return ids
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+    def stats(self):
+        with self.lock:
+            return self.cache.stats()
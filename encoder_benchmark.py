@@ -0,0 +1,96 @@
+"""
+Incremental encoder benchmark
+Checks that BPEEncoder gives the saved tokenizer's ids on every document and
+compares its corpus encode throughput with the saved tokenizer and tiktoken
+"""
+import json
+import time
+import argparse
+
+from train_and_analyze_tokenizers import load_domain_jobs, OUTPUT_DIR, HuggingFaceTokenizer
+from corpus_reader import iter_corpus_documents
+from reference_tokenizers import REFERENCE_ENCODINGS, get_reference_encoding
+from bpe_encoder import BPEEncoder
+
+def _time_encode(encode, documents, repeats):
+    """Best-of-repeats wall time to encode every document, and the token count"""
+    best = float('inf')
+    num_tokens = 0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        num_tokens = sum(len(encode(doc)) for doc in documents)
+        best = min(best, time.perf_counter() - t0)
+    return best, num_tokens
+
+def run_encoder_benchmark(domain_name, data_file, repeats=3):
+    """Parity and encode throughput of BPEEncoder vs the saved tokenizer and tiktoken"""
+    tokenizer_dir = OUTPUT_DIR / f"{domain_name}_tokenizer"
+    if not (tokenizer_dir / "tokenizer.json").exists():
+        print(f"✗ No trained tokenizer for {domain_name}, skipping")
+        return None
+
+    documents = list(iter_corpus_documents(data_file))
+    corpus_mb = sum(len(doc.encode('utf-8')) for doc in documents) / 1024 / 1024
+    tokenizer = HuggingFaceTokenizer.from_directory(str(tokenizer_dir))
+
+    # Time a cold cache first, then reuse the same encoder for the warm numbers
+    encoder = BPEEncoder.from_directory(tokenizer_dir)
+    cold_time, _ = _time_encode(encoder.encode, documents, 1)
+    mismatches = sum(encoder.encode(doc) != tokenizer.encode(doc) for doc in documents)
+
+    encoders = {
+        f"nanochat/{domain_name}": tokenizer.encode,
+        f"incremental/{domain_name}": encoder.encode,
+    }
+    for encoding_name in REFERENCE_ENCODINGS:
+        try:
+            encoders[f"tiktoken/{encoding_name}"] = get_reference_encoding(encoding_name).encode_ordinary
+        except Exception as e:
+            print(f"✗ {encoding_name} failed to load: {e}")
+
+    print(f"\nEncoders on {domain_name} ({len(documents)} documents, {corpus_mb:.2f} MB):")
+    print(f"  {'✓' if mismatches == 0 else '✗'} incremental ids match the saved tokenizer on "
+          f"{len(documents) - mismatches}/{len(documents)} documents")
+    print(f"  {'incremental (cold cache)':28s} {corpus_mb / cold_time:8.2f} MB/s")
+
+    timings = {}
+    for name, encode in encoders.items():
+        encode_time, num_tokens = _time_encode(encode, documents, repeats)
+        timings[name] = {
+            'encode_time': encode_time,
+            'mb_per_s': corpus_mb / encode_time if encode_time else 0.0,
+            'num_tokens': num_tokens
+        }
+        print(f"  {name:28s} {timings[name]['mb_per_s']:8.2f} MB/s ({num_tokens:,} tokens)")
+
+    return {
+        'documents': len(documents),
+        'corpus_mb': corpus_mb,
+        'mismatched_documents': mismatches,
+        'cold_cache_mb_per_s': corpus_mb / cold_time if cold_time else 0.0,
+        'cache': encoder.cache.stats(),
+        'encoders': timings
+    }
+
+def main(domains=None, repeats=3):
+    jobs = [job for job in load_domain_jobs() if domains is None or job[0] in domains]
+
+    results = {}
+    for domain_name, data_file, _ in jobs:
+        result = run_encoder_benchmark(domain_name, data_file, repeats)
+        if result is not None:
+            results[domain_name] = result
+
+    output_file = OUTPUT_DIR / "encoder_benchmark_results.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n✓ Encoder benchmark saved to: {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity and throughput of the incremental BPE encoder")
+    parser.add_argument('--domains', nargs='+', help="Domains to benchmark (default: all)")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed passes per encoder (best is kept)")
+    args = parser.parse_args()
+    main(domains=args.domains, repeats=args.repeats)
@@ -0,0 +1,335 @@
+"""
+Shared HTTP fetch layer for the corpus collectors
+Pooled requests.Session with bounded per-host concurrency, token-bucket
+rate limiting, retry with exponential backoff and an on-disk response cache
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, urlencode
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Status codes worth retrying; everything else is returned to the caller
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests/second with bursts of `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def _atomic_write(path, data):
+    """Write bytes to path via a temp file and rename"""
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class ResponseCache:
+    """
+    On-disk cache of successful GET responses.
+
+    Entries keep the body plus the ETag/Last-Modified validators, so stale
+    entries are revalidated with a conditional request and a 304 reuses the
+    stored body. Entries younger than max_age seconds are used as-is.
+    """
+
+    def __init__(self, cache_dir, max_age=24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+
+    def key(self, url, params=None):
+        """Cache key of a request"""
+        full_url = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        return hashlib.sha256(full_url.encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        """(meta, body) of a cached entry, or None"""
+        meta_file = self.cache_dir / f"{key}.json"
+        body_file = self.cache_dir / f"{key}.body"
+        if not meta_file.exists() or not body_file.exists():
+            return None
+        with open(meta_file) as f:
+            meta = json.load(f)
+        return meta, body_file.read_bytes()
+
+    def store(self, key, response):
+        """Save a 200 response; the body is written before its metadata"""
+        _atomic_write(self.cache_dir / f"{key}.body", response.content)
+        meta = {
+            'url': response.url,
+            'status_code': response.status_code,
+            'encoding': response.encoding,
+            'headers': {k: v for k, v in response.headers.items()
+                        if k.lower() in ('etag', 'last-modified', 'content-type')},
+            'fetched_at': time.time()
+        }
+        _atomic_write(self.cache_dir / f"{key}.json", json.dumps(meta).encode('utf-8'))
+
+    def touch(self, key, meta):
+        """Mark an entry as freshly revalidated"""
+        meta['fetched_at'] = time.time()
+        _atomic_write(self.cache_dir / f"{key}.json", json.dumps(meta).encode('utf-8'))
+
+    def is_fresh(self, meta):
+        return time.time() - meta['fetched_at'] < self.max_age
+
+    @staticmethod
+    def to_response(meta, body):
+        """Rebuild a requests.Response from a cached entry"""
+        response = requests.Response()
+        response.status_code = meta['status_code']
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.url = meta['url']
+        response.encoding = meta['encoding']
+        response.from_cache = True
+        return response
+
+class CollectionManifest:
+    """
+    Per-document record of a collection run.
+
+    Maps a document id to its source URL, content hash and size, so a rerun
+    can report which documents are new, changed or unchanged. Each record
+    is appended as one JSON line to <manifest>.log; close() compacts the
+    log into the manifest file. A run that dies before close() leaves the
+    log behind, and the next run replays it (a torn last line is ignored).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.name + ".log")
+        self.documents = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.documents = json.load(f)
+        if self.log_path.exists():
+            with open(self.log_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self.documents[entry.pop('id')] = entry
+        self.log = open(self.log_path, 'a', encoding='utf-8')
+        self.run_states = {'new': 0, 'changed': 0, 'unchanged': 0}
+        self.lock = threading.Lock()
+
+    def record(self, doc_id, url, content):
+        """Store a document; returns 'new', 'changed' or 'unchanged'"""
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        with self.lock:
+            previous = self.documents.get(doc_id)
+            if previous is None:
+                state = 'new'
+            elif previous['sha256'] != digest:
+                state = 'changed'
+            else:
+                state = 'unchanged'
+            entry = {
+                'url': url,
+                'sha256': digest,
+                'size': len(content),
+                'updated': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            self.documents[doc_id] = entry
+            self.log.write(json.dumps({'id': doc_id, **entry}) + "\n")
+            self.log.flush()
+            self.run_states[state] += 1
+        return state
+
+    def summary(self):
+        """One-line count of new/changed/unchanged documents this run"""
+        return ", ".join(f"{count} {state}" for state, count in self.run_states.items())
+
+    def close(self):
+        """Write the compacted manifest and drop the log"""
+        with self.lock:
+            if self.log.closed:
+                return
+            self.log.close()
+            _atomic_write(self.path, json.dumps(self.documents, indent=2).encode('utf-8'))
+            os.remove(self.log_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Records made before a crash are still compacted
+        self.close()
+
+class Fetcher:
+    """
+    Concurrent GET client shared by all collectors.
+
+    Requests to the same host share one rate limiter and a semaphore capping
+    in-flight requests; connections are reused through a pooled Session.
+    host_overrides maps an origin (e.g. "https://imsdb.com") to another one
+    such as a local stand-in server; it defaults to the JSON object in the
+    FETCH_HOST_OVERRIDES environment variable.
+
+    With cache_dir set, responses go through a ResponseCache; with offline
+    (default: the FETCH_OFFLINE environment variable) only cached responses
+    are served and nothing touches the network.
+    """
+
+    def __init__(self, headers=None, max_workers=8, per_host=4, rate=5.0, burst=None,
+                 retries=3, backoff=0.5, timeout=15, host_overrides=None,
+                 cache_dir=None, max_age=24 * 3600, offline=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(max_workers, per_host))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        if host_overrides is None:
+            host_overrides = json.loads(os.environ.get('FETCH_HOST_OVERRIDES', '{}'))
+        self.host_overrides = host_overrides
+
+        self.cache = ResponseCache(cache_dir, max_age) if cache_dir else None
+        if offline is None:
+            offline = os.environ.get('FETCH_OFFLINE', '') not in ('', '0')
+        self.offline = offline
+
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_limits(self, host):
+        """(semaphore, bucket) for one host, created on first use"""
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = (threading.BoundedSemaphore(self.per_host),
+                                     TokenBucket(self.rate, self.burst))
+            return self._hosts[host]
+
+    def _rewrite(self, url):
+        """Apply host_overrides to url"""
+        for origin, replacement in self.host_overrides.items():
+            if url.startswith(origin):
+                return replacement + url[len(origin):]
+        return url
+
+    def get(self, url, **kwargs):
+        """GET through the cache (if any) with rate limiting and retries"""
+        if self.cache is None:
+            if self.offline:
+                raise ConnectionError(f"Offline and no cache configured for {url}")
+            return self._get(url, **kwargs)
+
+        key = self.cache.key(url, kwargs.get('params'))
+        cached = self.cache.load(key)
+        if cached is not None:
+            meta, body = cached
+            if self.offline or self.cache.is_fresh(meta):
+                return ResponseCache.to_response(meta, body)
+        elif self.offline:
+            raise ConnectionError(f"Offline and {url} is not cached")
+
+        # Revalidate a stale entry with a conditional request
+        if cached is not None:
+            validators = CaseInsensitiveDict(meta['headers'])
+            headers = dict(kwargs.pop('headers', None) or {})
+            if 'ETag' in validators:
+                headers['If-None-Match'] = validators['ETag']
+            if 'Last-Modified' in validators:
+                headers['If-Modified-Since'] = validators['Last-Modified']
+            kwargs['headers'] = headers
+
+        response = self._get(url, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(key, meta)
+            return ResponseCache.to_response(meta, body)
+        if response.status_code == 200:
+            self.cache.store(key, response)
+        return response
+
+    def _get(self, url, **kwargs):
+        """GET with rate limiting and retries; returns the final Response"""
+        url = self._rewrite(url)
+        semaphore, bucket = self._host_limits(urlsplit(url).netloc)
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            try:
+                with semaphore:
+                    response = self.session.get(url, **kwargs)
+            except requests.RequestException:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self._delay(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            time.sleep(self._delay(attempt, response.headers.get('Retry-After')))
+
+    def _delay(self, attempt, retry_after=None):
+        """Backoff before the next attempt, honoring Retry-After when given"""
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+
+    def get_all(self, urls, **kwargs):
+        """
+        Fetch urls concurrently, yielding (url, response, error) in input order.
+
+        Results are yielded as soon as each one (and all before it) is done,
+        so callers can process documents while later ones are in flight.
+        Exactly one of response and error is None for each url.
+        """
+        def fetch_one(url):
+            try:
+                return url, self.get(url, **kwargs), None
+            except Exception as e:
+                return url, None, e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            yield from pool.map(fetch_one, urls)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,95 @@
+"""
+Sharded, multi-process pre-tokenization of a training corpus
+Workers split their share of the training chunks with the tokenizer's regex
+and return word -> count tables, which are merged into one table for BPE
+"""
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import regex
+
+from corpus_reader import _iter_span_chunks, iter_document_offsets
+from chunkers import CHUNKERS
+from vocab_table import to_byte_level
+
+def training_spans(data_file, chunk_size=10000, split_documents=False, chunker="fixed", chunk_indices=None):
+    """
+    Byte spans of the chunks the training iterator would yield, in order.
+
+    chunk_indices selects document-aligned chunks (as chosen by
+    corpus_dedup.select_training_chunks); otherwise spans follow
+    split_documents for the fixed chunker, or the named chunkers strategy.
+    """
+    if os.path.getsize(data_file) == 0:
+        return []
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if chunk_indices is not None:
+                wanted = set(chunk_indices)
+                spans = (span for doc_start, doc_end in iter_document_offsets(mm)
+                         for span in _iter_span_chunks(mm, doc_start, doc_end, chunk_size))
+                return [span for index, span in enumerate(spans) if index in wanted]
+            if chunker != "fixed":
+                return list(CHUNKERS[chunker](mm, chunk_size))
+            documents = iter_document_offsets(mm) if split_documents else [(0, len(mm))]
+            return [span for doc_start, doc_end in documents
+                    for span in _iter_span_chunks(mm, doc_start, doc_end, chunk_size)]
+
+def shard_spans(spans, num_shards):
+    """Cut spans into at most num_shards contiguous runs of about equal bytes"""
+    total = sum(end - start for start, end in spans)
+    shards = []
+    current = []
+    current_bytes = 0
+    for span in spans:
+        current.append(span)
+        current_bytes += span[1] - span[0]
+        if current_bytes >= total / num_shards and len(shards) < num_shards - 1:
+            shards.append(current)
+            current = []
+            current_bytes = 0
+    if current:
+        shards.append(current)
+    return shards
+
+def iter_span_texts(data_file, spans):
+    """Decoded chunk text of each span, newline-translated like the training iterators"""
+    if not spans:
+        return
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in spans:
+                chunk = mm[start:end].decode('utf-8', errors='replace')
+                yield chunk.replace('\r\n', '\n').replace('\r', '\n')
+
+def count_span_words(data_file, spans, split_pattern):
+    """Word -> count over the given spans, split the way the training pre-tokenizer splits"""
+    split = regex.compile(split_pattern)
+    counts = Counter()
+    for chunk in iter_span_texts(data_file, spans):
+        counts.update(split.findall(chunk))
+    return counts
+
+def count_words(data_file, spans, split_pattern, workers=None):
+    """
+    Merged ByteLevel word -> count table of the corpus spans.
+
+    The spans are split into one contiguous shard per worker; each worker
+    maps the corpus itself, so only the per-shard tables cross processes.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shard_spans(spans, workers)
+
+    if len(shards) <= 1:
+        counts = count_span_words(data_file, spans, split_pattern)
+    else:
+        counts = Counter()
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [pool.submit(count_span_words, data_file, shard, split_pattern) for shard in shards]
+            for future in futures:
+                counts.update(future.result())
+
+    return {to_byte_level(word): count for word, count in counts.items()}
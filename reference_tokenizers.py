@@ -0,0 +1,150 @@
+"""
+Registry of reference (baseline) tiktoken encodings
+Each encoding is loaded once per process, optionally warm-loaded in a
+background thread, and can be read from local BPE rank files when offline
+"""
+import os
+import json
+import threading
+from pathlib import Path
+
+import tiktoken
+from tiktoken.load import load_tiktoken_bpe, data_gym_to_mergeable_bpe_ranks
+import tiktoken_ext.openai_public as openai_public
+
+# Split patterns of the built-in baselines, as in tiktoken_ext.openai_public
+# (only r50k's is exposed there); only needed when building the encodings from
+# local rank files in offline mode. tests/test_reference_tokenizers.py checks
+# them against the installed tiktoken.
+R50K_PAT_STR = openai_public.r50k_pat_str
+CL100K_PAT_STR = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+O200K_PAT_STR = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+
+# name -> spec; extra encodings can be added with register_reference_encoding
+# or a JSON config (see load_reference_config)
+REFERENCE_ENCODINGS = {
+    'gpt2': {
+        'display_name': 'GPT-2 (tiktoken)',
+        'pat_str': R50K_PAT_STR,
+        'special_tokens': {openai_public.ENDOFTEXT: 50256},
+    },
+    'cl100k_base': {
+        'display_name': 'cl100k_base (GPT-3.5/4)',
+        'pat_str': CL100K_PAT_STR,
+        'special_tokens': {
+            openai_public.ENDOFTEXT: 100257,
+            openai_public.FIM_PREFIX: 100258,
+            openai_public.FIM_MIDDLE: 100259,
+            openai_public.FIM_SUFFIX: 100260,
+            openai_public.ENDOFPROMPT: 100276,
+        },
+    },
+    'o200k_base': {
+        'display_name': 'o200k_base (GPT-4o)',
+        'pat_str': O200K_PAT_STR,
+        'special_tokens': {openai_public.ENDOFTEXT: 199999, openai_public.ENDOFPROMPT: 200018},
+    },
+}
+
+# Directory of local rank files (<name>.tiktoken, or vocab.bpe + encoder.json for gpt2)
+_offline_bpe_dir = os.environ.get('TIKTOKEN_BPE_DIR')
+
+_encodings = {}
+_load_lock = threading.Lock()
+
+def register_reference_encoding(name, display_name=None, pat_str=None, special_tokens=None, bpe_file=None):
+    """Add (or override) a reference encoding"""
+    spec = dict(REFERENCE_ENCODINGS.get(name, {}))
+    spec['display_name'] = display_name or spec.get('display_name') or f"{name} (tiktoken)"
+    if pat_str is not None:
+        spec['pat_str'] = pat_str
+    if special_tokens is not None:
+        spec['special_tokens'] = special_tokens
+    if bpe_file is not None:
+        spec['bpe_file'] = str(bpe_file)
+    REFERENCE_ENCODINGS[name] = spec
+    _encodings.pop(name, None)
+
+def load_reference_config(config_file):
+    """Register encodings from a JSON list of {name, display_name, pat_str, special_tokens, bpe_file}"""
+    with open(config_file) as f:
+        entries = json.load(f)
+    for entry in entries:
+        register_reference_encoding(**entry)
+
+def set_offline_bpe_dir(bpe_dir):
+    """Build encodings from local rank files in bpe_dir instead of downloading them"""
+    global _offline_bpe_dir
+    _offline_bpe_dir = str(bpe_dir) if bpe_dir else None
+    _encodings.clear()
+
+def configure_reference_tokenizers(config_file=None, offline_bpe_dir=None):
+    """Apply config and offline settings (also used as a process pool initializer)"""
+    if config_file:
+        load_reference_config(config_file)
+    if offline_bpe_dir:
+        set_offline_bpe_dir(offline_bpe_dir)
+
+def _load_local_ranks(name, spec):
+    """Read mergeable ranks for name from its bpe_file or the offline directory"""
+    if spec.get('bpe_file'):
+        return load_tiktoken_bpe(spec['bpe_file'])
+
+    bpe_dir = Path(_offline_bpe_dir)
+    tiktoken_file = bpe_dir / f"{name}.tiktoken"
+    if tiktoken_file.exists():
+        return load_tiktoken_bpe(str(tiktoken_file))
+    if name == 'gpt2' and (bpe_dir / "vocab.bpe").exists():
+        return data_gym_to_mergeable_bpe_ranks(
+            vocab_bpe_file=str(bpe_dir / "vocab.bpe"),
+            encoder_json_file=str(bpe_dir / "encoder.json"),
+        )
+    raise FileNotFoundError(f"No rank file for {name} in {bpe_dir}")
+
+def _load_encoding(name):
+    """Construct a tiktoken Encoding for name"""
+    spec = REFERENCE_ENCODINGS[name]
+    if not spec.get('bpe_file') and not _offline_bpe_dir:
+        return tiktoken.get_encoding(name)
+    if 'pat_str' not in spec:
+        raise ValueError(f"Encoding {name} needs a pat_str to be built from local ranks")
+    return tiktoken.Encoding(
+        name=name,
+        pat_str=spec['pat_str'],
+        mergeable_ranks=_load_local_ranks(name, spec),
+        special_tokens=spec.get('special_tokens', {}),
+    )
+
+def get_reference_encoding(name):
+    """Return the cached Encoding for name, loading it on first use"""
+    encoding = _encodings.get(name)
+    if encoding is not None:
+        return encoding
+    with _load_lock:
+        # A warm-load thread may have finished while we waited
+        if name not in _encodings:
+            _encodings[name] = _load_encoding(name)
+        return _encodings[name]
+
+def warm_load_reference_encodings(names=None):
+    """Start loading encodings in a daemon thread; returns the thread"""
+    names = list(names or REFERENCE_ENCODINGS)
+
+    def load_all():
+        for name in names:
+            try:
+                get_reference_encoding(name)
+            except Exception as e:
+                print(f"✗ Warm load of {name} failed: {e}")
+
+    thread = threading.Thread(target=load_all, name="reference-tokenizer-warmup", daemon=True)
+    thread.start()
+    return thread
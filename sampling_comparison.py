@@ -0,0 +1,77 @@
+"""
+Full-corpus vs deduplicated-sample tokenizer training
+Trains each domain twice and scores both tokenizers on the full corpus, to
+show how much compression is lost by training on a fraction of the bytes
+"""
+import json
+import time
+import argparse
+
+from train_and_analyze_tokenizers import load_domain_jobs, OUTPUT_DIR, train_domain_tokenizer
+from corpus_reader import iter_corpus_documents
+from batch_eval import evaluate_documents, hf_batch_encoder
+
+def run_sampling_comparison(domain_name, data_file, vocab_size, sampling, use_cache=True):
+    """Train full and sampled tokenizers for one domain and compare their compression"""
+    t0 = time.time()
+    full = train_domain_tokenizer(domain_name, data_file, vocab_size=vocab_size, use_cache=use_cache)
+    full_time = time.time() - t0
+
+    sampled_dir = OUTPUT_DIR / f"{domain_name}_sampled_tokenizer"
+    t0 = time.time()
+    sampled = train_domain_tokenizer(domain_name, data_file, vocab_size=vocab_size, output_dir=sampled_dir,
+                                     use_cache=use_cache, sampling=sampling)
+    sampled_time = time.time() - t0
+    with open(sampled_dir / "selection_report.json") as f:
+        selection = json.load(f)
+
+    # Both tokenizers are scored on every document of the full corpus
+    documents = list(iter_corpus_documents(data_file))
+    full_stats, _ = evaluate_documents(hf_batch_encoder(full), documents)
+    sampled_stats, _ = evaluate_documents(hf_batch_encoder(sampled), documents)
+    full_ratio = full_stats['compression_ratio']
+    sampled_ratio = sampled_stats['compression_ratio']
+
+    print(f"\n{domain_name}: trained on {selection['selected_fraction']:.1%} of the bytes")
+    print(f"  full:    {full_ratio:.3f} bytes/token")
+    print(f"  sampled: {sampled_ratio:.3f} bytes/token ({sampled_ratio / full_ratio:.1%} of full)")
+
+    return {
+        'sampling': sampling,
+        'selection': selection,
+        'full_compression_ratio': full_ratio,
+        'sampled_compression_ratio': sampled_ratio,
+        'relative_compression': sampled_ratio / full_ratio if full_ratio else 0.0,
+        'full_train_time': full_time,
+        'sampled_train_time': sampled_time
+    }
+
+def main(domains=None, fraction=0.25, near_dup_threshold=0.8, seed=0, use_cache=True):
+    jobs = [job for job in load_domain_jobs() if domains is None or job[0] in domains]
+    sampling = {'near_dup_threshold': near_dup_threshold, 'fraction': fraction, 'seed': seed}
+
+    results = {}
+    for domain_name, data_file, vocab_size in jobs:
+        results[domain_name] = run_sampling_comparison(domain_name, data_file, vocab_size, sampling,
+                                                       use_cache=use_cache)
+
+    output_file = OUTPUT_DIR / "sampling_comparison_results.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n✓ Sampling comparison saved to: {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare tokenizers trained on a deduplicated sample with full-corpus ones")
+    parser.add_argument('--domains', nargs='+', help="Domains to compare (default: all)")
+    parser.add_argument('--fraction', type=float, default=0.25,
+                        help="Byte budget as a fraction of the raw corpus size")
+    parser.add_argument('--near-dup-threshold', type=float, default=0.8,
+                        help="Estimated Jaccard similarity at which documents/chunks count as duplicates")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for MinHash and sampling")
+    parser.add_argument('--retrain', action='store_true',
+                        help="Ignore the training cache and retrain both tokenizers")
+    args = parser.parse_args()
+    main(domains=args.domains, fraction=args.fraction, near_dup_threshold=args.near_dup_threshold,
+         seed=args.seed, use_cache=not args.retrain)
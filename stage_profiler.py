@@ -0,0 +1,117 @@
+"""
+Per-stage timing and memory instrumentation for the pipeline
+Each stage records wall/CPU time and, optionally, its tracemalloc peak;
+selected stages can also run under cProfile with the stats saved to disk
+"""
+import io
+import time
+import pstats
+import cProfile
+import tracemalloc
+from pathlib import Path
+from contextlib import contextmanager
+
+class StageProfiler:
+    """
+    Collect timing records for nested, named pipeline stages.
+
+    Nested stages are recorded as "outer/inner". With trace_memory, each
+    record carries the peak traced allocation while the stage ran (an outer
+    stage's peak includes its inner stages). Stages whose name (or full
+    path) is in cprofile_stages are profiled into profile_dir as
+    <prefix><path>.prof plus a text summary of the top functions.
+    """
+
+    def __init__(self, trace_memory=False, cprofile_stages=(), profile_dir=None, prefix=""):
+        self.trace_memory = trace_memory
+        self.cprofile_stages = set(cprofile_stages)
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.prefix = prefix
+        self.records = []
+        self._order = {}
+        self._stack = []
+        self._child_peaks = []
+        self._profiling = False
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one stage"""
+        if self.trace_memory and self._child_peaks:
+            # reset_peak() below would lose the enclosing stage's peak so far
+            self._child_peaks[-1] = max(self._child_peaks[-1], tracemalloc.get_traced_memory()[1])
+        self._stack.append(name)
+        path = "/".join(self._stack)
+        self._order.setdefault(path, len(self._order))
+        self._child_peaks.append(0)
+
+        profiler = None
+        if not self._profiling and (name in self.cprofile_stages or path in self.cprofile_stages):
+            profiler = cProfile.Profile()
+            self._profiling = True
+
+        if self.trace_memory:
+            start_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            record = {
+                'stage': path,
+                'wall_s': time.perf_counter() - wall0,
+                'cpu_s': time.process_time() - cpu0
+            }
+            child_peak = self._child_peaks.pop()
+            if self.trace_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+                record['peak_mb'] = (peak - start_memory) / 1024 / 1024
+                if self._child_peaks:
+                    self._child_peaks[-1] = max(self._child_peaks[-1], peak)
+            if profiler is not None:
+                record['profile'] = self._save_profile(profiler, path)
+            self.records.append(record)
+            self._stack.pop()
+
+    def _save_profile(self, profiler, path):
+        """Write .prof stats and a cumulative-time summary; returns the .prof path"""
+        profile_dir = self.profile_dir or Path(".")
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = (self.prefix + path).replace("/", ".")
+        prof_file = profile_dir / f"{stem}.prof"
+        profiler.dump_stats(str(prof_file))
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(25)
+        with open(profile_dir / f"{stem}.txt", 'w') as f:
+            f.write(summary.getvalue())
+        return str(prof_file)
+
+    def summary(self):
+        """Records in completion order plus per-stage totals in start order"""
+        totals = {}
+        for record in sorted(self.records, key=lambda r: self._order[r['stage']]):
+            total = totals.setdefault(record['stage'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            total['calls'] += 1
+            total['wall_s'] += record['wall_s']
+            total['cpu_s'] += record['cpu_s']
+            if 'peak_mb' in record:
+                total['peak_mb'] = max(total.get('peak_mb', 0.0), record['peak_mb'])
+        return {'stages': self.records, 'totals': totals}
+
+def print_stage_report(name, summary):
+    """Print one profiler summary as an aligned table"""
+    print(f"\n{name}:")
+    for stage, total in summary['totals'].items():
+        line = f"  {stage:40s} {total['wall_s']:9.3f}s wall {total['cpu_s']:9.3f}s cpu"
+        if 'peak_mb' in total:
+            line += f" {total['peak_mb']:9.1f} MB peak"
+        print(line)
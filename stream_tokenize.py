@@ -0,0 +1,155 @@
+"""
+Streaming encode/decode for files of any size
+Reads text in blocks and carries the unfinished pre-token into the next one,
+so ids match a one-shot encode while memory stays constant
+"""
+import os
+import sys
+import codecs
+import argparse
+
+import numpy as np
+import regex
+
+from token_stats import token_dtype
+from bpe_encoder import BPEEncoder
+
+DEFAULT_BLOCK_CHARS = 1 << 20
+DEFAULT_CHUNK_TOKENS = 1 << 16
+
+# Searches backwards for the last non-whitespace character
+_LAST_NON_SPACE = regex.compile(r"(?r)\S")
+
+def _partial_special_start(text, special_tokens):
+    """Start of a suffix of text that could still grow into a special token, else len(text)"""
+    longest = max((len(s) for s in special_tokens), default=0)
+    for start in range(max(0, len(text) - longest + 1), len(text)):
+        tail = text[start:]
+        if any(s.startswith(tail) for s in special_tokens):
+            return start
+    return len(text)
+
+def _encode_buffer(encoder, text, final, emit):
+    """
+    Encode the settled part of text through emit(ids); returns the unsettled tail.
+
+    A pre-token is settled once a non-whitespace character follows it: every
+    alternative of the split pattern stops at or before that character, so
+    more text cannot change it. The pre-tokens from the last non-whitespace
+    character on (whitespace runs like "\n   \n" can still merge), and any
+    suffix that may be the start of a special token, wait for more text
+    unless final.
+    """
+    end = len(text) if final else _partial_special_start(text, encoder.special_tokens)
+
+    pos = 0
+    if encoder.special_split is not None:
+        for match in encoder.special_split.finditer(text, 0, end):
+            for piece in encoder.split.findall(text, pos, match.start()):
+                emit(encoder.encode_piece(piece))
+            emit((encoder.special_tokens[match.group()],))
+            pos = match.end()
+
+    settled_end = end
+    if not final:
+        last_non_space = _LAST_NON_SPACE.search(text, pos, end)
+        settled_end = last_non_space.start() if last_non_space else pos
+    for match in encoder.split.finditer(text, pos, end):
+        if match.end() > settled_end:
+            return text[match.start():]
+        emit(encoder.encode_piece(match.group()))
+    return text[end:]
+
+def stream_encode(encoder, blocks, chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    Yield the token ids of a stream of text blocks as NumPy arrays.
+
+    The concatenated arrays equal encoder.encode(''.join(blocks)); each
+    array holds chunk_tokens ids except possibly the last.
+    """
+    dtype = token_dtype(encoder.vocab_size)
+    # At most one block's worth of ids is pending before full chunks are handed out
+    pending = []
+    carry = ""
+    for block in blocks:
+        carry = _encode_buffer(encoder, carry + block, False, pending.extend)
+        while len(pending) >= chunk_tokens:
+            yield np.array(pending[:chunk_tokens], dtype=dtype)
+            del pending[:chunk_tokens]
+    _encode_buffer(encoder, carry, True, pending.extend)
+    for start in range(0, len(pending), chunk_tokens):
+        yield np.array(pending[start:start + chunk_tokens], dtype=dtype)
+
+def iter_text_blocks(path, block_chars=DEFAULT_BLOCK_CHARS):
+    """Text of a file in blocks of block_chars, decoded and newline-translated like open(..., 'r')"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                break
+            yield block
+
+def stream_encode_file(encoder, path, block_chars=DEFAULT_BLOCK_CHARS, chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    """Token id arrays of a whole file, read block by block"""
+    return stream_encode(encoder, iter_text_blocks(path, block_chars), chunk_tokens)
+
+def stream_decode(encoder, id_chunks):
+    """
+    Yield the text of a stream of id arrays.
+
+    Token bytes go through an incremental UTF-8 decoder, so a character whose
+    bytes are split across tokens (or chunks) comes out whole.
+    """
+    token_bytes = {token_id: token.encode('utf-8') if token in encoder.special_tokens
+                   else bytes(encoder._byte_decoder[char] for char in token)
+                   for token_id, token in encoder.id_to_token.items()}
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for ids in id_chunks:
+        text = decoder.decode(b"".join(token_bytes[int(token_id)] for token_id in ids))
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+def main(tokenizer_dir, input_path, output_path, decode=False, block_chars=DEFAULT_BLOCK_CHARS,
+         chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    encoder = BPEEncoder.from_directory(tokenizer_dir)
+    dtype = np.dtype(token_dtype(encoder.vocab_size))
+
+    if decode:
+        # Ids are read back in chunk_tokens slices of the raw id file
+        ids = np.memmap(input_path, dtype=dtype, mode='r')
+        chunks = (ids[i:i + chunk_tokens] for i in range(0, len(ids), chunk_tokens))
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            for text in stream_decode(encoder, chunks):
+                f.write(text)
+        print(f"✓ Decoded {len(ids):,} tokens -> {output_path}")
+        return
+
+    num_tokens = 0
+    with open(output_path, 'wb') as f:
+        for chunk in stream_encode_file(encoder, input_path, block_chars, chunk_tokens):
+            chunk.tofile(f)
+            num_tokens += len(chunk)
+    input_bytes = os.path.getsize(input_path)
+    print(f"✓ Encoded {input_bytes:,} bytes into {num_tokens:,} {dtype.name} tokens -> {output_path} "
+          f"({input_bytes / max(num_tokens, 1):.2f} bytes/token)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode a file to raw token ids (or decode ids back) in constant memory")
+    parser.add_argument('tokenizer_dir', help="Directory holding tokenizer.json (e.g. outputs/movie_scripts_tokenizer)")
+    parser.add_argument('input', help="Text file to encode, or raw id file with --decode")
+    parser.add_argument('output', help="Raw id file to write, or text file with --decode")
+    parser.add_argument('--decode', action='store_true', help="Decode a raw id file back to text")
+    parser.add_argument('--block-chars', type=int, default=DEFAULT_BLOCK_CHARS,
+                        help="Characters read per block")
+    parser.add_argument('--chunk-tokens', type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help="Token ids per NumPy chunk")
+    args = parser.parse_args()
+    try:
+        main(args.tokenizer_dir, args.input, args.output, decode=args.decode,
+             block_chars=args.block_chars, chunk_tokens=args.chunk_tokens)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
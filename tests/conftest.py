@@ -0,0 +1,65 @@
+"""
+Shared fixtures: the repo root on sys.path and a local stand-in HTTP server
+"""
+import sys
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+class StandInServer:
+    """
+    Localhost HTTP server whose responses come from a route table.
+
+    routes maps a path to a function(handler) returning (status, headers, body);
+    every request is logged as (path, request headers) in `requests`.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                with server.lock:
+                    server.requests.append((path, dict(self.headers)))
+                route = server.routes.get(path)
+                status, headers, body = route(self) if route else (404, {}, b"not found")
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def hits(self, path):
+        """Number of requests made to path"""
+        with self.lock:
+            return sum(1 for request_path, _ in self.requests if request_path == path)
+
+@pytest.fixture
+def stand_in_server():
+    server = StandInServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
@@ -0,0 +1,55 @@
+"""
+evaluate_documents with a TokenShardWriter sink: shard writes are timed
+apart from encoding, and a failed encode leaves no .tmp shards behind
+"""
+import time
+
+import pytest
+
+from batch_eval import evaluate_documents
+from token_shards import TokenShardWriter, TokenShards
+
+def encode_bytes(texts):
+    return [list(text.encode('utf-8')) for text in texts]
+
+class SlowSink:
+    def __init__(self):
+        self.documents = []
+
+    def add_document(self, ids):
+        time.sleep(0.01)
+        self.documents.append(list(ids))
+
+def test_sink_writes_are_not_timed_as_encoding():
+    documents = [f"document {i}" for i in range(20)]
+    sink = SlowSink()
+
+    stats, _ = evaluate_documents(encode_bytes, documents, num_threads=2, sink=sink)
+
+    assert sink.documents == encode_bytes(documents)
+    assert stats['sink_time'] >= 0.2
+    assert stats['encode_time'] < stats['sink_time']
+
+def test_failed_encode_discards_the_shards(tmp_path):
+    documents = [f"document {i}" for i in range(20)]
+    with TokenShardWriter(tmp_path, vocab_size=256, shard_tokens=16) as writer:
+        evaluate_documents(encode_bytes, documents, num_threads=2, sink=writer)
+    exported = TokenShards(tmp_path).num_tokens
+
+    def failing(texts):
+        if "document 15" in texts:
+            raise RuntimeError("encoder crashed")
+        return encode_bytes(texts)
+    def out_of_vocab(texts):
+        return [[999] if text == "document 15" else ids for text, ids in zip(texts, encode_bytes(texts))]
+    # Encoding fails before any write, or the writes fail part way through the export
+    with pytest.raises(RuntimeError):
+        with TokenShardWriter(tmp_path, vocab_size=256, shard_tokens=16) as writer:
+            evaluate_documents(failing, documents, batch_size=4, num_threads=2, sink=writer)
+    with pytest.raises(ValueError):
+        with TokenShardWriter(tmp_path, vocab_size=256, shard_tokens=16) as writer:
+            evaluate_documents(out_of_vocab, documents, batch_size=4, num_threads=2, sink=writer)
+
+    assert not list(tmp_path.glob("*.tmp"))
+    # The earlier export is still intact
+    assert TokenShards(tmp_path).num_tokens == exported
@@ -0,0 +1,109 @@
+"""
+collect_rust_code against a stand-in GitHub contents API: malformed items,
+offline reruns from the response cache and resuming after a crash
+"""
+import json
+import base64
+
+from collect_rust_code import collect_rust_code
+
+API = "https://api.github.com"
+RUST_SOURCE = "pub fn add(a: i32, b: i32) -> i32 {\n    a + b\n}\n" * 5
+
+def _file_item(repo, name):
+    return {'name': name, 'path': f"src/{name}", 'url': f"{API}/repos/{repo}/contents/src/{name}"}
+
+def _json(payload, headers=None):
+    return lambda handler: (200, {'Content-Type': 'application/json', **(headers or {})}, json.dumps(payload))
+
+def serve_github(server, files):
+    """Route tokio-rs/tokio's src listing and {name: route} file routes on the stand-in server"""
+    repo = "tokio-rs/tokio"
+    server.routes[f"/repos/{repo}/contents/src"] = _json([_file_item(repo, name) for name in files])
+    for name, route in files.items():
+        server.routes[f"/repos/{repo}/contents/src/{name}"] = route
+
+def rust_file(source=RUST_SOURCE, headers=None):
+    return _json({'content': base64.b64encode(source.encode('utf-8')).decode('ascii')}, headers)
+
+def test_malformed_items_are_skipped(stand_in_server, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('FETCH_HOST_OVERRIDES', json.dumps({API: stand_in_server.url}))
+    serve_github(stand_in_server, {
+        'lib.rs': rust_file(),
+        'broken.rs': lambda handler: (200, {'Content-Type': 'text/html'}, "<html>rate limited</html>"),
+        'message.rs': _json({'message': "API rate limit exceeded"}),
+        'after.rs': rust_file(RUST_SOURCE.replace("add", "sub")),
+    })
+    # A repo whose listing is not JSON is skipped as a whole
+    stand_in_server.routes["/repos/serde-rs/serde/contents/src"] = lambda handler: (200, {}, "not json")
+
+    stats = collect_rust_code(tmp_path)
+
+    assert stats['num_files'] == 2
+    corpus = (tmp_path / "rust_code_corpus.txt").read_text()
+    assert "// FILE: lib.rs" in corpus and "// FILE: after.rs" in corpus
+    output = capsys.readouterr().out
+    assert "Error fetching broken.rs" in output
+    assert "Error with repo serde-rs/serde" in output
+
+def _versioned_file(name, etag='"v1"'):
+    """A file route that answers If-None-Match with 304"""
+    route = rust_file(RUST_SOURCE.replace("add", name), headers={'ETag': etag})
+    def versioned(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b""
+        return route(handler)
+    return versioned
+
+def test_offline_rerun_replays_the_cache(stand_in_server, tmp_path, monkeypatch):
+    monkeypatch.setenv('FETCH_HOST_OVERRIDES', json.dumps({API: stand_in_server.url}))
+    serve_github(stand_in_server, {f"{name}.rs": _versioned_file(name) for name in ("lib", "io", "net")})
+
+    online = collect_rust_code(tmp_path)
+    corpus = (tmp_path / "rust_code_corpus.txt").read_text()
+    requests_made = len(stand_in_server.requests)
+    assert online['num_files'] == 3
+
+    # Take the server away entirely; the rerun must come from http_cache
+    stand_in_server.httpd.shutdown()
+    monkeypatch.setenv('FETCH_OFFLINE', '1')
+    offline = collect_rust_code(tmp_path)
+
+    assert len(stand_in_server.requests) == requests_made
+    assert offline == online
+    assert (tmp_path / "rust_code_corpus.txt").read_text() == corpus
+
+def test_rerun_after_interruption_resumes_from_cache_and_manifest(stand_in_server, tmp_path, monkeypatch, capsys):
+    import collect_rust_code as collector
+
+    monkeypatch.setenv('FETCH_HOST_OVERRIDES', json.dumps({API: stand_in_server.url}))
+    names = ("lib", "io", "net")
+    serve_github(stand_in_server, {f"{name}.rs": _versioned_file(name) for name in names})
+
+    # Die (like Ctrl-C) while writing the second document
+    write = collector.CorpusWriter.write
+    def crashing_write(self, doc_id, text):
+        if self.num_documents == 1:
+            raise KeyboardInterrupt
+        write(self, doc_id, text)
+    monkeypatch.setattr(collector.CorpusWriter, 'write', crashing_write)
+    try:
+        collect_rust_code(tmp_path)
+    except KeyboardInterrupt:
+        pass
+    assert not (tmp_path / "rust_code_corpus.txt").exists()
+    with open(tmp_path / "manifest.json") as f:
+        assert list(json.load(f)) == ["tokio-rs/tokio/src/lib.rs"]
+
+    monkeypatch.setattr(collector.CorpusWriter, 'write', write)
+    capsys.readouterr()
+    stats = collect_rust_code(tmp_path)
+
+    assert stats['num_files'] == 3
+    # Responses fetched before the crash come from the cache, not the server
+    for name in names:
+        assert stand_in_server.hits(f"/repos/tokio-rs/tokio/contents/src/{name}.rs") == 1
+    # The document recorded before the crash is unchanged, the rest are new
+    assert "2 new, 0 changed, 1 unchanged" in capsys.readouterr().out
+    with open(tmp_path / "manifest.json") as f:
+        assert len(json.load(f)) == 3
@@ -0,0 +1,16 @@
+"""
+MinHasher: blockwise signatures match the one-shot minimum over all shingles
+"""
+import numpy as np
+
+from corpus_dedup import MinHasher
+
+def test_blockwise_signature_matches_full_minimum():
+    hasher = MinHasher(num_perm=32, shingle_size=3)
+    text = " ".join(f"word{i % 97}" for i in range(2000))
+    x = hasher.shingles(text)
+    full = ((hasher.a[:, None] * x[None, :] + hasher.b[:, None]) >> np.uint64(32)).min(axis=1)
+
+    for block_size in (1, 7, 100, len(x), 10 * len(x)):
+        assert np.array_equal(hasher.signature(text, block_size=block_size), full)
+    assert np.array_equal(hasher.signature("short"), hasher.signature("short", block_size=1))
@@ -0,0 +1,94 @@
+"""
+BPEEncoder, CachedEncoder, TokenCounter and stream_encode/stream_decode
+against HuggingFace encode() on a small fixture tokenizer: special tokens,
+\r\n, whitespace-only and 1-char blocks, multibyte characters
+"""
+import random
+
+import numpy as np
+import pytest
+
+from train_and_analyze_tokenizers import HuggingFaceTokenizer
+from bpe_encoder import BPEEncoder
+from encode_cache import CachedEncoder
+from token_counter import TokenCounter
+from stream_tokenize import stream_encode, stream_decode
+
+TRAINING_TEXT = [
+    "def add(a, b):\r\n    return a + b\r\n\r\n",
+    "class Parser:\n    def __init__(self):\n        self.items = []\n",
+    "INT. CAFÉ - NIGHT\n\n        JOSÉ\n    Ça va? Naïve façade.\n",
+    "日本語のテキスト。 Ünïcödé\t\ttabs   and   spaces\n",
+]
+
+TEXTS = [
+    "",
+    "def add(a, b):\r\n    return a + b\r\n",
+    "<|bos|>def f():\n    pass<|bos|><|user_start|>hi<|user_end|>",
+    "   \n\n   \t  \r\n",
+    "x<|bos|>",
+    "<|bos|",
+    "INT. CAFÉ - NIGHT\n\n  JOSÉ\n  Ça va? 🙂 日本語\n",
+    "trailing spaces   ",
+]
+
+@pytest.fixture(scope='module')
+def tokenizer():
+    return HuggingFaceTokenizer.train_from_iterator(TRAINING_TEXT * 20, 400)
+
+@pytest.fixture(scope='module')
+def encoder(tokenizer, tmp_path_factory):
+    tokenizer_dir = tmp_path_factory.mktemp("fixture_tokenizer")
+    tokenizer.save(str(tokenizer_dir))
+    return BPEEncoder.from_directory(tokenizer_dir)
+
+def hf_encode(tokenizer, text):
+    return tokenizer.tokenizer.encode(text, add_special_tokens=False).ids
+
+def streamed(encoder, blocks, chunk_tokens=3):
+    chunks = list(stream_encode(encoder, blocks, chunk_tokens=chunk_tokens))
+    return np.concatenate(chunks).tolist() if chunks else []
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_encoders_match_hf(tokenizer, encoder, text):
+    expected = hf_encode(tokenizer, text)
+    cached = CachedEncoder(tokenizer)
+    counter = TokenCounter.from_encoder(encoder)
+
+    assert encoder.encode(text) == expected
+    # Cold, then served from the piece cache
+    assert cached.encode(text) == expected
+    assert cached.encode(text) == expected
+    assert counter.count(text) == len(expected)
+    assert TokenCounter.from_tokenizer(tokenizer).count(text) == len(expected)
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_stream_encode_matches_hf(tokenizer, encoder, text):
+    expected = hf_encode(tokenizer, text)
+    rng = random.Random(0)
+
+    # 1-char blocks split every special token and every \r\n
+    assert streamed(encoder, list(text)) == expected
+    for block_chars in (2, 3, 7):
+        blocks = [text[i:i + block_chars] for i in range(0, len(text), block_chars)]
+        assert streamed(encoder, blocks) == expected
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 4)))
+        blocks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        assert streamed(encoder, blocks) == expected
+
+def test_whitespace_only_and_split_special_blocks(tokenizer, encoder):
+    blocks = ["def f():", "\r", "\n", "    ", "    ", "\n\n", "return 1", "<|b", "os", "|>", "  ", "\t",
+              "", "<|user", "_start|><|bo", "s|", ">\r\n"]
+    assert streamed(encoder, blocks) == hf_encode(tokenizer, "".join(blocks))
+
+def test_stream_decode_joins_multibyte_characters(tokenizer, encoder):
+    text = "Ça va? 🙂 日本語 naïve\r\n"
+    ids = hf_encode(tokenizer, text)
+    pieces = [tokenizer.tokenizer.decode([token_id]) for token_id in ids]
+    # The fixture vocab has no merges for the emoji, so its bytes land in separate tokens
+    assert any("�" in piece for piece in pieces)
+
+    # One id per chunk: every multibyte character is split across chunks
+    assert "".join(stream_decode(encoder, [[token_id] for token_id in ids])) == text
+    assert "".join(stream_decode(encoder, stream_encode(encoder, list(text), chunk_tokens=1))) == text
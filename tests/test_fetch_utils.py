@@ -0,0 +1,211 @@
+"""
+Fetcher against a local stand-in server: retry/backoff, per-host
+concurrency limit, token bucket, host overrides and the response cache
+"""
+import json
+import time
+import threading
+
+import pytest
+import requests
+
+from fetch_utils import Fetcher, TokenBucket, CollectionManifest
+
+def test_retries_5xx_with_backoff(stand_in_server):
+    attempts = []
+    def flaky(handler):
+        attempts.append(time.monotonic())
+        return (503, {}, "busy") if len(attempts) < 3 else (200, {}, "ok")
+    stand_in_server.routes['/flaky'] = flaky
+
+    with Fetcher(retries=3, backoff=0.1, rate=1000) as fetcher:
+        response = fetcher.get(stand_in_server.url + "/flaky")
+
+    assert response.status_code == 200 and response.text == "ok"
+    assert len(attempts) == 3
+    # Exponential backoff: ~0.1 s then ~0.2 s between attempts
+    assert attempts[1] - attempts[0] >= 0.1
+    assert attempts[2] - attempts[1] >= 0.2
+
+def test_gives_up_after_retries(stand_in_server):
+    stand_in_server.routes['/down'] = lambda handler: (500, {}, "error")
+
+    with Fetcher(retries=2, backoff=0.01, rate=1000) as fetcher:
+        response = fetcher.get(stand_in_server.url + "/down")
+
+    assert response.status_code == 500
+    assert stand_in_server.hits('/down') == 3
+
+def test_client_errors_are_not_retried(stand_in_server):
+    with Fetcher(retries=3, backoff=0.01, rate=1000) as fetcher:
+        response = fetcher.get(stand_in_server.url + "/missing")
+
+    assert response.status_code == 404
+    assert stand_in_server.hits('/missing') == 1
+
+def test_honors_retry_after(stand_in_server):
+    attempts = []
+    def limited(handler):
+        attempts.append(time.monotonic())
+        return (429, {'Retry-After': '0.3'}, "slow down") if len(attempts) == 1 else (200, {}, "ok")
+    stand_in_server.routes['/limited'] = limited
+
+    with Fetcher(retries=3, backoff=0.01, rate=1000) as fetcher:
+        assert fetcher.get(stand_in_server.url + "/limited").status_code == 200
+    assert attempts[1] - attempts[0] >= 0.3
+
+def test_connection_errors_raise_after_retries():
+    with Fetcher(retries=1, backoff=0.01, rate=1000, timeout=1) as fetcher:
+        # Port 9 (discard) is not listening on localhost
+        with pytest.raises(requests.ConnectionError):
+            fetcher.get("http://127.0.0.1:9/")
+
+def test_per_host_concurrency_limit(stand_in_server):
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+    def slow(handler):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.1)
+        with lock:
+            in_flight[0] -= 1
+        return 200, {}, "done"
+    stand_in_server.routes['/slow'] = slow
+
+    with Fetcher(max_workers=8, per_host=2, rate=1000, burst=1000) as fetcher:
+        results = list(fetcher.get_all([stand_in_server.url + f"/slow?i={i}" for i in range(8)]))
+
+    assert all(error is None and response.status_code == 200 for _, response, error in results)
+    assert peak[0] == 2
+
+def test_get_all_keeps_input_order(stand_in_server):
+    def echo(handler):
+        index = int(handler.path.split('=')[1])
+        # Later urls answer first
+        time.sleep(0.02 * (5 - index))
+        return 200, {}, str(index)
+    stand_in_server.routes['/echo'] = echo
+
+    urls = [stand_in_server.url + f"/echo?i={i}" for i in range(5)]
+    with Fetcher(rate=1000, burst=1000) as fetcher:
+        results = list(fetcher.get_all(urls))
+
+    assert [url for url, _, _ in results] == urls
+    assert [response.text for _, response, _ in results] == [str(i) for i in range(5)]
+
+def test_token_bucket_rate(stand_in_server):
+    stand_in_server.routes['/ping'] = lambda handler: (200, {}, "pong")
+
+    # 20 requests/second with no burst: 6 requests need 5 refills of 50 ms
+    with Fetcher(max_workers=6, per_host=6, rate=20, burst=1) as fetcher:
+        t0 = time.monotonic()
+        results = list(fetcher.get_all([stand_in_server.url + "/ping"] * 6))
+        elapsed = time.monotonic() - t0
+
+    assert all(error is None for _, _, error in results)
+    assert elapsed >= 0.24
+
+def test_token_bucket_allows_burst():
+    bucket = TokenBucket(rate=10, capacity=5)
+    t0 = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - t0 < 0.05
+    bucket.acquire()
+    assert time.monotonic() - t0 >= 0.09
+
+def test_host_overrides_redirect_to_stand_in(stand_in_server):
+    stand_in_server.routes['/scripts/Se7en.html'] = lambda handler: (200, {}, "<pre>script</pre>")
+
+    with Fetcher(rate=1000, host_overrides={"https://imsdb.com": stand_in_server.url}) as fetcher:
+        response = fetcher.get("https://imsdb.com/scripts/Se7en.html")
+
+    assert response.text == "<pre>script</pre>"
+
+def _etag_route(body, etag='"v1"'):
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, b""
+        return 200, {'ETag': etag, 'Content-Type': 'text/plain'}, body
+    return route
+
+def test_fresh_cache_entries_skip_the_network(stand_in_server, tmp_path):
+    stand_in_server.routes['/doc'] = _etag_route("cached body")
+    url = stand_in_server.url + "/doc"
+
+    with Fetcher(rate=1000, cache_dir=tmp_path) as fetcher:
+        assert fetcher.get(url).text == "cached body"
+        response = fetcher.get(url)
+
+    assert response.text == "cached body" and response.from_cache
+    assert stand_in_server.hits('/doc') == 1
+
+def test_stale_entries_revalidate_with_304(stand_in_server, tmp_path):
+    stand_in_server.routes['/doc'] = _etag_route("cached body")
+    url = stand_in_server.url + "/doc"
+
+    with Fetcher(rate=1000, cache_dir=tmp_path, max_age=0) as fetcher:
+        fetcher.get(url)
+        response = fetcher.get(url)
+
+    # The second request is conditional and the 304 reuses the stored body
+    assert response.status_code == 200 and response.text == "cached body" and response.from_cache
+    assert stand_in_server.hits('/doc') == 2
+    assert stand_in_server.requests[1][1].get('If-None-Match') == '"v1"'
+
+def test_changed_source_replaces_the_cache_entry(stand_in_server, tmp_path):
+    url = stand_in_server.url + "/doc"
+    stand_in_server.routes['/doc'] = _etag_route("old", etag='"v1"')
+    with Fetcher(rate=1000, cache_dir=tmp_path, max_age=0) as fetcher:
+        fetcher.get(url)
+        stand_in_server.routes['/doc'] = _etag_route("new", etag='"v2"')
+        assert fetcher.get(url).text == "new"
+
+    with Fetcher(rate=1000, cache_dir=tmp_path, offline=True) as fetcher:
+        assert fetcher.get(url).text == "new"
+
+def test_offline_serves_only_the_cache(stand_in_server, tmp_path):
+    stand_in_server.routes['/doc'] = _etag_route("cached body")
+    with Fetcher(rate=1000, cache_dir=tmp_path) as fetcher:
+        fetcher.get(stand_in_server.url + "/doc")
+
+    with Fetcher(rate=1000, cache_dir=tmp_path, max_age=0, offline=True) as fetcher:
+        assert fetcher.get(stand_in_server.url + "/doc").text == "cached body"
+        with pytest.raises(ConnectionError):
+            fetcher.get(stand_in_server.url + "/other")
+    assert stand_in_server.hits('/doc') == 1 and stand_in_server.hits('/other') == 0
+
+def test_manifest_appends_records_and_compacts_on_close(tmp_path):
+    path = tmp_path / "manifest.json"
+    with CollectionManifest(path) as manifest:
+        assert manifest.record("a", "http://x/a", "alpha") == 'new'
+        assert manifest.record("b", "http://x/b", "beta") == 'new'
+        # Records go to the append-only log, not the manifest file
+        assert not path.exists()
+        assert len(manifest.log_path.read_text().splitlines()) == 2
+
+    assert not manifest.log_path.exists()
+    assert set(json.loads(path.read_text())) == {"a", "b"}
+
+    with CollectionManifest(path) as manifest:
+        assert manifest.record("a", "http://x/a", "alpha") == 'unchanged'
+        assert manifest.record("b", "http://x/b", "beta v2") == 'changed'
+        assert manifest.summary() == "0 new, 1 changed, 1 unchanged"
+
+def test_manifest_replays_the_log_of_a_crashed_run(tmp_path):
+    path = tmp_path / "manifest.json"
+    crashed = CollectionManifest(path)
+    crashed.record("a", "http://x/a", "alpha")
+    crashed.record("b", "http://x/b", "beta")
+    crashed.log.close()
+    # A write torn by the crash
+    with open(crashed.log_path, 'a') as f:
+        f.write('{"id": "c", "url"')
+
+    with CollectionManifest(path) as manifest:
+        assert set(manifest.documents) == {"a", "b"}
+        assert manifest.record("a", "http://x/a", "alpha") == 'unchanged'
+        assert manifest.record("c", "http://x/c", "gamma") == 'new'
+    assert set(json.loads(path.read_text())) == {"a", "b", "c"}
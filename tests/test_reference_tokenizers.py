@@ -0,0 +1,17 @@
+"""
+The offline specs of the built-in baselines match the installed tiktoken
+"""
+import pytest
+import tiktoken_ext.openai_public as openai_public
+
+from reference_tokenizers import REFERENCE_ENCODINGS
+
+@pytest.mark.parametrize('name', ['gpt2', 'cl100k_base', 'o200k_base'])
+def test_builtin_specs_match_tiktoken(name, monkeypatch):
+    # The constructors fetch their ranks first; only pat_str and special tokens are compared
+    monkeypatch.setattr(openai_public, 'load_tiktoken_bpe', lambda *args, **kwargs: {})
+    monkeypatch.setattr(openai_public, 'data_gym_to_mergeable_bpe_ranks', lambda *args, **kwargs: {})
+    constructed = openai_public.ENCODING_CONSTRUCTORS[name]()
+
+    assert REFERENCE_ENCODINGS[name]['pat_str'] == constructed['pat_str']
+    assert REFERENCE_ENCODINGS[name]['special_tokens'] == constructed['special_tokens']
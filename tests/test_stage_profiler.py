@@ -0,0 +1,35 @@
+"""
+StageProfiler peak memory across nested stages
+"""
+from stage_profiler import StageProfiler
+
+def _peaks(profiler):
+    return {record['stage']: record['peak_mb'] for record in profiler.records}
+
+def test_outer_peak_before_inner_stage_is_kept():
+    profiler = StageProfiler(trace_memory=True)
+    with profiler.stage('outer'):
+        block = bytearray(50 * 1024 * 1024)
+        del block
+        with profiler.stage('inner'):
+            pass
+
+    peaks = _peaks(profiler)
+    assert peaks['outer'] >= 49
+    assert peaks['outer/inner'] < 1
+
+def test_outer_peak_includes_inner_and_sibling_gaps():
+    profiler = StageProfiler(trace_memory=True)
+    with profiler.stage('outer'):
+        with profiler.stage('first'):
+            block = bytearray(20 * 1024 * 1024)
+            del block
+        block = bytearray(30 * 1024 * 1024)
+        del block
+        with profiler.stage('second'):
+            pass
+
+    peaks = _peaks(profiler)
+    assert 19 <= peaks['outer/first'] < 21
+    assert peaks['outer'] >= 29
+    assert peaks['outer/second'] < 1
@@ -0,0 +1,35 @@
+"""
+TokenCounter over a tiktoken baseline: the split pattern comes from the
+public REFERENCE_ENCODINGS spec and counts match encode_ordinary()
+"""
+import pytest
+import tiktoken
+
+from reference_tokenizers import REFERENCE_ENCODINGS
+from token_counter import TokenCounter
+
+def small_encoding(name):
+    """A baseline-named encoding over byte ranks plus a few merges, built offline"""
+    ranks = {bytes([b]): b for b in range(256)}
+    for merge in (b"th", b"the", b" the", b"  ", b"    ", b"in", b"ing", "é".encode('utf-8')):
+        ranks.setdefault(merge, len(ranks))
+    return tiktoken.Encoding(name, pat_str=REFERENCE_ENCODINGS[name]['pat_str'],
+                             mergeable_ranks=ranks, special_tokens={})
+
+@pytest.mark.parametrize('name', ['gpt2', 'cl100k_base', 'o200k_base'])
+def test_tiktoken_counts_match_encode_ordinary(name):
+    encoding = small_encoding(name)
+    counter = TokenCounter.from_tiktoken(encoding)
+    texts = ["", "the thing", "    indented\r\n\tline", "café — naïve 12345 ", "EXT. THE HOUSE - NIGHT\n\n"]
+
+    for text in texts:
+        assert counter.count(text) == len(encoding.encode_ordinary(text))
+    assert counter.count_batch(texts) == [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+
+def test_unknown_tiktoken_encoding_needs_a_pattern():
+    ranks = {bytes([b]): b for b in range(256)}
+    encoding = tiktoken.Encoding("custom", pat_str=r"\S+|\s+", mergeable_ranks=ranks, special_tokens={})
+
+    with pytest.raises(ValueError):
+        TokenCounter.from_tiktoken(encoding)
+    assert TokenCounter.from_tiktoken(encoding, pat_str=r"\S+|\s+").count("a bc") == 4
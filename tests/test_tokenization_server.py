@@ -0,0 +1,103 @@
+"""
+Tokenization server connection handling: more keep-alive clients than
+pool workers, and clients reconnecting after an idle timeout; micro-batches
+where one request is bad
+"""
+import time
+import threading
+
+import pytest
+
+import tokenization_server
+from tokenization_server import (TokenizerClient, MicroBatcher, TokenizationService,
+                                  HuggingFaceTokenizer, make_server)
+
+class CountingService:
+    """Stand-in for TokenizationService that counts characters"""
+
+    def handle(self, method, path, request):
+        if (method, path) != ('POST', '/count_tokens'):
+            return 404, {'error': f"No endpoint {method} {path}"}
+        return 200, {'count': len(request['text'])}
+
+@pytest.fixture
+def server():
+    server = make_server(CountingService(), port=0, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_more_keep_alive_clients_than_workers(server):
+    port = server.server_address[1]
+    clients = [TokenizerClient(port=port, timeout=3) for _ in range(6)]
+    try:
+        # Every client holds its connection open between calls
+        for round_number in range(2):
+            for i, client in enumerate(clients):
+                assert client.count_tokens('test', "x" * (i + round_number)) == i + round_number
+    finally:
+        for client in clients:
+            client.close()
+
+def test_concurrent_keep_alive_clients(server):
+    port = server.server_address[1]
+    results = {}
+    def run(i):
+        client = TokenizerClient(port=port, timeout=3)
+        try:
+            results[i] = [client.count_tokens('test', "x" * n) for n in range(i, i + 20)]
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: list(range(i, i + 20)) for i in range(8)}
+
+def test_client_reconnects_after_idle_timeout(server, monkeypatch):
+    monkeypatch.setattr(tokenization_server.TokenizationRequestHandler, 'timeout', 0.2)
+    client = TokenizerClient(port=server.server_address[1], timeout=3)
+    try:
+        assert client.count_tokens('test', "abc") == 3
+        # The server drops the idle connection; the next call opens a new one
+        time.sleep(0.5)
+        assert client.count_tokens('test', "abcd") == 4
+    finally:
+        client.close()
+
+def test_bad_request_fails_only_itself_in_a_batch():
+    release = threading.Event()
+    batches = []
+    def encode_batch(texts):
+        batches.append(list(texts))
+        if texts == ["first"]:
+            # Hold the batcher so the next requests queue up into one batch
+            release.wait(3)
+        return [[len(text.encode('utf-8'))] for text in texts]
+
+    batcher = MicroBatcher(encode_batch)
+    first = batcher.submit("first")
+    while not batches:
+        time.sleep(0.01)
+    good, bad = batcher.submit("good"), batcher.submit(None)
+    release.set()
+
+    assert first.result(3) == [5]
+    assert good.result(3) == [4]
+    with pytest.raises(AttributeError):
+        bad.result(3)
+    # The shared batch failed and was retried one text at a time
+    assert batches == [["first"], ["good", None], ["good"], [None]]
+
+def test_encode_rejects_non_string_text():
+    tokenizer = HuggingFaceTokenizer.train_from_iterator(["def add(a, b): return a + b\n"] * 20, 300)
+    service = TokenizationService({'code': tokenizer})
+
+    status, response = service.handle('POST', '/encode', {'domain': 'code', 'text': 123})
+    assert status == 400 and "must be a string" in response['error']
+    status, response = service.handle('POST', '/encode', {'domain': 'code', 'text': "def add"})
+    assert status == 200 and response['ids'] == tokenizer.encode("def add")
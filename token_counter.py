@@ -0,0 +1,101 @@
+"""
+Token counting without materializing token ids
+Walks the pre-tokens lazily, sums cached per-piece counts and stops as soon
+as a budget is exceeded; works for the domain tokenizers and tiktoken
+"""
+import json
+
+import regex
+
+from bpe_encoder import BPEEncoder
+from vocab_table import to_byte_level
+from reference_tokenizers import REFERENCE_ENCODINGS
+
+class TokenCounter:
+    """
+    count()/count_batch() for one tokenizer.
+
+    BPE never merges across pre-tokens, so the total is the sum of the
+    per-piece token counts; pieces are found with finditer (no list of
+    pieces) and their counts memoized in a dict of at most cache_entries
+    pieces. With a limit, counting stops at the first piece that takes the
+    total past it and that partial total (> limit) is returned.
+    """
+
+    def __init__(self, split_pattern, count_piece, special_tokens=(), cache_entries=65536):
+        self.split = regex.compile(split_pattern)
+        self.count_piece = count_piece
+        self.special_tokens = list(special_tokens)
+        self.special_split = None
+        if self.special_tokens:
+            alternatives = sorted(self.special_tokens, key=len, reverse=True)
+            self.special_split = regex.compile("|".join(regex.escape(s) for s in alternatives))
+        self.cache = {}
+        self.cache_entries = cache_entries
+
+    @classmethod
+    def from_encoder(cls, encoder, **kwargs):
+        """Counter for a BPEEncoder; special-token strings count as one token, as in encode()"""
+        char_ids = encoder._char_ids
+        def count_piece(piece):
+            return len(encoder.bpe([char_ids[char] for char in to_byte_level(piece)]))
+        return cls(encoder.split.pattern, count_piece, encoder.special_tokens, **kwargs)
+
+    @classmethod
+    def from_tokenizer_dir(cls, tokenizer_dir, **kwargs):
+        return cls.from_encoder(BPEEncoder.from_directory(tokenizer_dir, cache_bytes=0), **kwargs)
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer, **kwargs):
+        """Counter for a loaded nanochat HuggingFaceTokenizer"""
+        tokenizer_data = json.loads(tokenizer.tokenizer.to_str())
+        return cls.from_encoder(BPEEncoder(tokenizer_data, cache_bytes=0), **kwargs)
+
+    @classmethod
+    def from_tiktoken(cls, encoding, pat_str=None, **kwargs):
+        """
+        Counter matching len(encoding.encode_ordinary(text)).
+
+        The split pattern comes from the encoding's REFERENCE_ENCODINGS spec
+        unless pat_str is given; pieces are counted with the public
+        encode_ordinary(), which leaves a pre-token piece whole.
+        """
+        pat_str = pat_str or REFERENCE_ENCODINGS.get(encoding.name, {}).get('pat_str')
+        if pat_str is None:
+            raise ValueError(f"No split pattern known for tiktoken encoding {encoding.name!r}; pass pat_str")
+        return cls(pat_str, lambda piece: len(encoding.encode_ordinary(piece)), **kwargs)
+
+    def _count_ordinary(self, text, start, end, total, limit):
+        cache = self.cache
+        for match in self.split.finditer(text, start, end):
+            piece = match.group()
+            n = cache.get(piece)
+            if n is None:
+                n = self.count_piece(piece)
+                if len(cache) < self.cache_entries:
+                    cache[piece] = n
+            total += n
+            if limit is not None and total > limit:
+                break
+        return total
+
+    def count(self, text, limit=None):
+        """Number of tokens in text, or a partial count above limit once it is exceeded"""
+        if self.special_split is None or not any(s in text for s in self.special_tokens):
+            return self._count_ordinary(text, 0, len(text), 0, limit)
+
+        total = 0
+        pos = 0
+        for match in self.special_split.finditer(text):
+            total = self._count_ordinary(text, pos, match.start(), total, limit) + 1
+            if limit is not None and total > limit:
+                return total
+            pos = match.end()
+        return self._count_ordinary(text, pos, len(text), total, limit)
+
+    def count_batch(self, texts, limit=None):
+        return [self.count(text, limit) for text in texts]
+
+    def within(self, text, limit):
+        """True if text fits in limit tokens"""
+        return self.count(text, limit) <= limit
@@ -0,0 +1,173 @@
+"""
+Binary token-id shards for downstream training
+Each domain corpus is written as fixed-dtype, memory-mappable .bin shards
+plus a document-boundary index, so training can mmap ready-made token streams
+"""
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+from token_stats import token_dtype
+
+INDEX_FILENAME = "index.json"
+OFFSETS_FILENAME = "doc_offsets.npy"
+
+# 64M tokens per shard: 128 MB for uint16 vocabs
+DEFAULT_SHARD_TOKENS = 64 * 1024 * 1024
+
+class TokenShardWriter:
+    """
+    Append documents' token ids to numbered shards in output_dir.
+
+    Every shard holds up to shard_tokens ids as raw little-endian
+    uint16/uint32 (shard_00000.bin, ...); documents may continue across a
+    shard boundary. doc_offsets.npy holds the global token offset of every
+    document start plus the final total, and index.json describes the
+    layout. With bos_id set, it is written in front of each document. Files
+    are written under .tmp names and renamed by close(), so readers never
+    see a half-written export.
+    """
+
+    def __init__(self, output_dir, vocab_size, shard_tokens=DEFAULT_SHARD_TOKENS, bos_id=None):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.vocab_size = vocab_size
+        self.dtype = np.dtype(token_dtype(vocab_size)).newbyteorder('<')
+        self.shard_tokens = shard_tokens
+        self.bos_id = bos_id
+
+        self.shards = []
+        self.doc_offsets = [0]
+        self.num_tokens = 0
+        self._file = None
+        self._shard_fill = 0
+
+    def _open_shard(self):
+        name = f"shard_{len(self.shards):05d}.bin"
+        self._file = open(self.output_dir / f"{name}.tmp", 'wb')
+        self._shard_fill = 0
+        self.shards.append({'file': name, 'num_tokens': 0})
+
+    def _close_shard(self):
+        self._file.close()
+        self.shards[-1]['num_tokens'] = self._shard_fill
+        self._file = None
+
+    def add_document(self, ids):
+        """Append one document's token ids"""
+        ids = np.asarray(ids)
+        if self.bos_id is not None:
+            ids = np.concatenate(([self.bos_id], ids))
+        if ids.size and int(ids.max()) >= self.vocab_size:
+            raise ValueError(f"Token id {int(ids.max())} outside vocab of {self.vocab_size}")
+        ids = ids.astype(self.dtype, copy=False)
+
+        pos = 0
+        while pos < len(ids):
+            if self._file is None or self._shard_fill == self.shard_tokens:
+                if self._file is not None:
+                    self._close_shard()
+                self._open_shard()
+            take = min(len(ids) - pos, self.shard_tokens - self._shard_fill)
+            ids[pos:pos + take].tofile(self._file)
+            self._shard_fill += take
+            pos += take
+
+        self.num_tokens += len(ids)
+        self.doc_offsets.append(self.num_tokens)
+
+    def close(self):
+        """Finish the last shard, then publish the offsets and the index"""
+        if self._file is not None:
+            self._close_shard()
+        for shard in self.shards:
+            os.replace(self.output_dir / f"{shard['file']}.tmp", self.output_dir / shard['file'])
+
+        # np.save appends .npy, so give the temp file a name that already ends in it
+        tmp_offsets = self.output_dir / f"tmp_{OFFSETS_FILENAME}"
+        np.save(tmp_offsets, np.asarray(self.doc_offsets, dtype=np.int64))
+        os.replace(tmp_offsets, self.output_dir / OFFSETS_FILENAME)
+
+        index = {
+            'dtype': self.dtype.str,
+            'vocab_size': self.vocab_size,
+            'bos_id': self.bos_id,
+            'shard_tokens': self.shard_tokens,
+            'num_tokens': self.num_tokens,
+            'num_documents': len(self.doc_offsets) - 1,
+            'shards': self.shards
+        }
+        tmp_index = self.output_dir / f"{INDEX_FILENAME}.tmp"
+        with open(tmp_index, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_index, self.output_dir / INDEX_FILENAME)
+
+        # Shards left over from a larger previous export
+        for stale in self.output_dir.glob("shard_*.bin"):
+            if stale.name not in {s['file'] for s in self.shards}:
+                stale.unlink()
+
+    def discard(self):
+        """Abandon the export: drop the unpublished .tmp shards, keep any earlier export"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for shard in self.shards:
+            (self.output_dir / f"{shard['file']}.tmp").unlink(missing_ok=True)
+        self.shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+class TokenShards:
+    """Read-only view of an export: memory-mapped shards plus document lookup"""
+
+    def __init__(self, shard_dir):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / INDEX_FILENAME) as f:
+            self.index = json.load(f)
+        self.dtype = np.dtype(self.index['dtype'])
+        self.shards = [
+            np.memmap(self.shard_dir / s['file'], dtype=self.dtype, mode='r', shape=(s['num_tokens'],))
+            for s in self.index['shards']
+        ]
+        self.shard_starts = np.cumsum([0] + [s['num_tokens'] for s in self.index['shards']])
+        self.doc_offsets = np.load(self.shard_dir / OFFSETS_FILENAME, mmap_mode='r')
+
+    @property
+    def num_tokens(self):
+        return self.index['num_tokens']
+
+    @property
+    def num_documents(self):
+        return self.index['num_documents']
+
+    def tokens(self, start, end):
+        """Global token range [start, end) as an array (a view if it sits in one shard)"""
+        first = int(np.searchsorted(self.shard_starts, start, side='right')) - 1
+        pieces = []
+        while start < end:
+            shard_start = self.shard_starts[first]
+            take = min(end, self.shard_starts[first + 1]) - start
+            pieces.append(self.shards[first][start - shard_start:start - shard_start + take])
+            start += take
+            first += 1
+        if len(pieces) == 1:
+            return pieces[0]
+        return np.concatenate(pieces) if pieces else np.zeros(0, dtype=self.dtype)
+
+    def document(self, i):
+        """Token ids of document i"""
+        return self.tokens(int(self.doc_offsets[i]), int(self.doc_offsets[i + 1]))
+
+def bos_token_id(tokenizer):
+    """The <|bos|> id that nanochat puts in front of every document"""
+    return tokenizer.encode_special("<|bos|>")
@@ -0,0 +1,51 @@
+"""
+Vectorized token-frequency statistics
+Counts are computed once with np.bincount over a compact id array and
+shared by the frequent-token and pattern analyses
+"""
+import numpy as np
+
+def token_dtype(vocab_size):
+    """Smallest unsigned dtype that holds every id of a vocab"""
+    return np.uint16 if vocab_size <= 2**16 else np.uint32
+
+def compute_token_stats(tokens, vocab_size):
+    """
+    Count token ids in one pass.
+
+    Returns a dict with the counts array (indexed by token id), the total
+    number of tokens and the per-id percentages.
+    """
+    ids = np.asarray(tokens)
+    if ids.dtype != token_dtype(vocab_size):
+        ids = ids.astype(token_dtype(vocab_size))
+    counts = np.bincount(ids, minlength=vocab_size)
+    total = int(counts.sum())
+    percentages = counts * (100.0 / total) if total else np.zeros(len(counts))
+    return {
+        'counts': counts,
+        'total': total,
+        'percentages': percentages,
+        'vocab_size': vocab_size
+    }
+
+def top_tokens(stats, top_n):
+    """The top_n (token_id, count) pairs, most frequent first"""
+    counts = stats['counts']
+    top_n = min(top_n, int(np.count_nonzero(counts)))
+    if top_n == 0:
+        return []
+    # argpartition finds the top_n in O(V); only those are then sorted
+    candidates = np.argpartition(counts, -top_n)[-top_n:]
+    order = candidates[np.lexsort((candidates, -counts[candidates]))]
+    return [(int(token_id), int(counts[token_id])) for token_id in order]
+
+def coverage_curve(stats, points=(10, 50, 100, 500, 1000, 2000, 4096)):
+    """Fraction of all tokens covered by the k most frequent token types"""
+    sorted_counts = np.sort(stats['counts'])[::-1]
+    cumulative = np.cumsum(sorted_counts)
+    total = stats['total'] or 1
+    return {
+        str(k): float(cumulative[min(k, len(cumulative)) - 1] / total)
+        for k in points if len(cumulative)
+    }
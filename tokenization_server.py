@@ -0,0 +1,408 @@
+"""
+Persistent tokenization service for the trained domain tokenizers
+Loads outputs/*_tokenizer once and serves encode/decode/count_tokens/batch
+as JSON over localhost HTTP or a Unix socket, with per-endpoint latency metrics
+"""
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import http.client
+import socketserver
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from train_and_analyze_tokenizers import OUTPUT_DIR, HuggingFaceTokenizer
+from batch_eval import hf_batch_encoder
+from encode_cache import CachedEncoder
+from token_counter import TokenCounter
+
+def load_domain_tokenizers(output_dir=OUTPUT_DIR, domains=None):
+    """{domain: tokenizer} for every <domain>_tokenizer directory with a tokenizer.json"""
+    tokenizers = {}
+    for tokenizer_file in sorted(output_dir.glob("*_tokenizer/tokenizer.json")):
+        domain_name = tokenizer_file.parent.name[:-len("_tokenizer")]
+        if domains and domain_name not in domains:
+            continue
+        tokenizers[domain_name] = HuggingFaceTokenizer.from_directory(str(tokenizer_file.parent))
+    return tokenizers
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-text encode requests into batch calls.
+
+    Requests that queue up while a batch is being encoded are served together
+    by the next encode_batch call (up to max_batch), so batching grows with
+    load and a lone request is not delayed. max_wait > 0 additionally holds a
+    batch open that many seconds for more requests to join.
+    """
+
+    def __init__(self, encode_batch, max_batch=64, max_wait=0.0):
+        self.encode_batch = encode_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        """Queue one text; the Future resolves to its token ids"""
+        future = Future()
+        self.requests.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self.requests.get(timeout=remaining))
+                    else:
+                        batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                results = self.encode_batch([text for text, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self._encode_one_by_one(batch)
+                continue
+            for (_, future), ids in zip(batch, results):
+                future.set_result(ids)
+
+    def _encode_one_by_one(self, batch):
+        """Re-encode a failed batch per text, so one bad request fails only itself"""
+        for text, future in batch:
+            try:
+                future.set_result(self.encode_batch([text])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+class LatencyMetrics:
+    """Thread-safe per-endpoint request counts and latency percentiles"""
+
+    def __init__(self, window=10000):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok=True):
+        with self.lock:
+            self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        """Counts plus p50/p95/p99/mean latency (ms) over the last `window` requests"""
+        with self.lock:
+            report = {}
+            for endpoint, samples in self.samples.items():
+                ordered = sorted(samples)
+                def pick(q):
+                    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+                report[endpoint] = {
+                    'requests': self.counts[endpoint],
+                    'errors': self.errors.get(endpoint, 0),
+                    'p50_ms': pick(0.50),
+                    'p95_ms': pick(0.95),
+                    'p99_ms': pick(0.99),
+                    'mean_ms': sum(ordered) / len(ordered) * 1000
+                }
+            return report
+
+class TokenizationService:
+    """The endpoint logic, independent of the transport"""
+
+    def __init__(self, tokenizers, max_batch=64, max_wait=0.0, encode_cache_bytes=0):
+        self.tokenizers = tokenizers
+        # With encode_cache_bytes, every domain encodes through its own piece cache
+        self.encode_caches = {
+            domain: CachedEncoder(tokenizer, max_bytes=encode_cache_bytes)
+            for domain, tokenizer in tokenizers.items()
+        } if encode_cache_bytes else {}
+        self.encoders = {
+            domain: (self.encode_caches[domain].encode_batch if domain in self.encode_caches
+                     else hf_batch_encoder(tokenizer))
+            for domain, tokenizer in tokenizers.items()
+        }
+        self.batchers = {
+            domain: MicroBatcher(encode_batch, max_batch=max_batch, max_wait=max_wait)
+            for domain, encode_batch in self.encoders.items()
+        }
+        # Counting walks pre-tokens without building id lists; other layouts count encoded ids
+        self.counters = {}
+        for domain, tokenizer in tokenizers.items():
+            try:
+                self.counters[domain] = TokenCounter.from_tokenizer(tokenizer)
+            except ValueError:
+                pass
+        self.metrics = LatencyMetrics()
+
+    def _tokenizer(self, request):
+        domain = request.get('domain')
+        if domain not in self.tokenizers:
+            raise ValueError(f"Unknown domain {domain!r}; available: {', '.join(self.tokenizers)}")
+        return domain, self.tokenizers[domain]
+
+    @staticmethod
+    def _text(request):
+        text = request['text']
+        if not isinstance(text, str):
+            raise TypeError(f"Field 'text' must be a string, got {type(text).__name__}")
+        return text
+
+    def encode(self, request):
+        domain, _ = self._tokenizer(request)
+        # Checked before queuing, so a bad request never reaches a shared batch
+        return {'ids': self.batchers[domain].submit(self._text(request)).result()}
+
+    def decode(self, request):
+        _, tokenizer = self._tokenizer(request)
+        return {'text': tokenizer.decode(request['ids'])}
+
+    def _count(self, domain, texts, limit):
+        if domain in self.counters:
+            return self.counters[domain].count_batch(texts, limit)
+        return [len(ids) for ids in self.encoders[domain](texts)]
+
+    def count_tokens(self, request):
+        """Token count of "text"; with "limit", counting stops once the count exceeds it"""
+        domain, _ = self._tokenizer(request)
+        limit = request.get('limit')
+        count = self._count(domain, [self._text(request)], limit)[0]
+        if limit is None:
+            return {'count': count}
+        return {'count': count, 'exceeded': count > limit}
+
+    def batch(self, request):
+        """Encode (or count, with "op": "count_tokens") a list of texts in one call"""
+        domain, _ = self._tokenizer(request)
+        if request.get('op', 'encode') == 'count_tokens':
+            return {'counts': self._count(domain, request['texts'], request.get('limit'))}
+        return {'ids': self.encoders[domain](request['texts'])}
+
+    def tokenizer_info(self, request=None):
+        info = {}
+        for domain, tokenizer in self.tokenizers.items():
+            info[domain] = {'vocab_size': tokenizer.get_vocab_size()}
+            if domain in self.encode_caches:
+                info[domain]['encode_cache'] = self.encode_caches[domain].stats()
+        return info
+
+    def metrics_report(self, request=None):
+        return self.metrics.snapshot()
+
+    def handle(self, method, path, request):
+        """Dispatch one request; returns (status, response dict)"""
+        routes = {
+            ('POST', '/encode'): self.encode,
+            ('POST', '/decode'): self.decode,
+            ('POST', '/count_tokens'): self.count_tokens,
+            ('POST', '/batch'): self.batch,
+            ('GET', '/tokenizers'): self.tokenizer_info,
+            ('GET', '/metrics'): self.metrics_report,
+            ('GET', '/health'): lambda request: {'status': 'ok'},
+        }
+        endpoint = routes.get((method, path))
+        if endpoint is None:
+            return 404, {'error': f"No endpoint {method} {path}"}
+
+        t0 = time.perf_counter()
+        try:
+            status, response = 200, endpoint(request)
+        except KeyError as e:
+            status, response = 400, {'error': f"Missing field {e.args[0]!r}"}
+        except (TypeError, ValueError) as e:
+            status, response = 400, {'error': str(e)}
+        except Exception as e:
+            status, response = 500, {'error': str(e)}
+        if path != '/metrics':
+            self.metrics.record(path, time.perf_counter() - t0, ok=status == 200)
+        return status, response
+
+class TokenizationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Keep-alive connections idle for this many seconds are closed
+    timeout = 60
+    # Buffer headers and body into one send; flushed after every request
+    wbufsize = -1
+
+    def setup(self):
+        super().setup()
+        # Without TCP_NODELAY, keep-alive requests stall on delayed ACKs (~40 ms each)
+        if self.connection.family != socket.AF_UNIX:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+    def _respond(self, status, response):
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        request = {}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            try:
+                request = json.loads(self.rfile.read(length))
+            except json.JSONDecodeError as e:
+                self._respond(400, {'error': f"Invalid JSON: {e}"})
+                return
+        self._respond(*self.server.run_request(method, self.path, request))
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class _ThreadPoolMixIn(socketserver.ThreadingMixIn):
+    """
+    Serve each connection on its own thread, but run requests on a fixed-size pool.
+
+    Keep-alive clients then cannot starve each other of workers: an idle
+    connection only holds its (cheap) reader thread, which the handler
+    timeout closes, and tokenizer work stays capped at the pool size.
+    """
+    daemon_threads = True
+
+    def run_request(self, method, path, request):
+        """service.handle(method, path, request) on the worker pool"""
+        return self.executor.submit(self.service.handle, method, path, request).result()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+class PooledHTTPServer(_ThreadPoolMixIn, HTTPServer):
+    pass
+
+class PooledUnixHTTPServer(_ThreadPoolMixIn, socketserver.UnixStreamServer):
+    pass
+
+def make_server(service, host="127.0.0.1", port=8700, unix_socket=None, workers=8, verbose=False):
+    """HTTP server for a TokenizationService on localhost:port or a Unix socket path"""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = PooledUnixHTTPServer(unix_socket, TokenizationRequestHandler)
+    else:
+        server = PooledHTTPServer((host, port), TokenizationRequestHandler)
+    server.service = service
+    server.verbose = verbose
+    server.executor = ThreadPoolExecutor(max_workers=workers)
+    return server
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class TokenizerClient:
+    """Minimal client for the service; keeps one connection open"""
+
+    def __init__(self, host="127.0.0.1", port=8700, unix_socket=None, timeout=30):
+        if unix_socket:
+            self.connection = _UnixHTTPConnection(unix_socket, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _call(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The server closed the idle keep-alive connection; reconnect once
+            self.connection.close()
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path} failed ({response.status}): {result.get('error')}")
+        return result
+
+    def encode(self, domain, text):
+        return self._call('POST', '/encode', {'domain': domain, 'text': text})['ids']
+
+    def decode(self, domain, ids):
+        return self._call('POST', '/decode', {'domain': domain, 'ids': ids})['text']
+
+    def count_tokens(self, domain, text, limit=None):
+        return self._call('POST', '/count_tokens', {'domain': domain, 'text': text, 'limit': limit})['count']
+
+    def batch(self, domain, texts, op='encode', limit=None):
+        result = self._call('POST', '/batch', {'domain': domain, 'texts': texts, 'op': op, 'limit': limit})
+        return result['counts'] if op == 'count_tokens' else result['ids']
+
+    def metrics(self):
+        return self._call('GET', '/metrics')
+
+    def close(self):
+        self.connection.close()
+
+def main(host="127.0.0.1", port=8700, unix_socket=None, workers=8, domains=None, verbose=False,
+         encode_cache_mb=0):
+    tokenizers = load_domain_tokenizers(domains=domains)
+    if not tokenizers:
+        print(f"✗ No trained tokenizers found in {OUTPUT_DIR}")
+        return
+    for domain_name, tokenizer in tokenizers.items():
+        print(f"✓ Loaded {domain_name} ({tokenizer.get_vocab_size():,} tokens)")
+
+    service = TokenizationService(tokenizers, encode_cache_bytes=int(encode_cache_mb * 1024 * 1024))
+    server = make_server(service, host=host, port=port, unix_socket=unix_socket,
+                         workers=workers, verbose=verbose)
+    address = unix_socket or f"http://{host}:{port}"
+    print(f"Serving encode/decode/count_tokens/batch on {address} ({workers} worker threads)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the trained domain tokenizers over HTTP")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8700)
+    parser.add_argument('--unix-socket', help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, default=8, help="Request-handling threads")
+    parser.add_argument('--domains', nargs='+', help="Domains to load (default: all trained)")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    parser.add_argument('--encode-cache-mb', type=float, default=0,
+                        help="Per-domain LRU cache of encoded pieces, in MB (0 disables it)")
+    args = parser.parse_args()
+    main(host=args.host, port=args.port, unix_socket=args.unix_socket, workers=args.workers,
+         domains=args.domains, verbose=args.verbose, encode_cache_mb=args.encode_cache_mb)
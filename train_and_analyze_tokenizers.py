@@ -1,73 +1,207 @@
 """
-Complete tokenizer training and analysis for both domains
+Complete tokenizer training and analysis for every domain in domains.json
 """
 import sys
 import os
 from pathlib import Path
 import json
 import time
+import hashlib
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+OUTPUT_DIR = BASE_DIR / "outputs"
 
 # Add nanochat to path
-sys.path.insert(0, '/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/nanochat')
+sys.path.insert(0, str(BASE_DIR / "nanochat"))
+
+from nanochat.tokenizer import HuggingFaceTokenizer, SPLIT_PATTERN
+import tokenizers
+
+from corpus_reader import iter_corpus_chunks, count_corpus_chunks, iter_corpus_documents
+from chunkers import CHUNKERS, iter_chunks, count_chunks
+from corpus_dedup import select_training_chunks, iter_selected_chunks
+from batch_eval import evaluate_documents, hf_batch_encoder, tiktoken_batch_encoder
+from token_stats import compute_token_stats, top_tokens, coverage_curve
+from vocab_table import load_vocab_table, categorize_token, categorize_vocabulary
+from token_shards import TokenShardWriter, bos_token_id
+from stage_profiler import StageProfiler, print_stage_report
+from pretokenize import training_spans, count_words
+from bpe_trainer import train_bpe_from_counts, build_tokenizer
+from training_cache import TRAINER_VERSION, training_cache_key, is_cache_hit, save_cache_key, read_cache_key
+from domain_registry import load_domain_registry, select_domains, domain_jobs
+from reference_tokenizers import (
+    REFERENCE_ENCODINGS, get_reference_encoding, warm_load_reference_encodings,
+    configure_reference_tokenizers,
+)
+
+# Every domain (corpus, vocab size, training/analysis options) comes from the registry;
+# corpus paths in it are relative to the config file
+DOMAIN_CONFIG = BASE_DIR / "domains.json"
 
-from nanochat.tokenizer import HuggingFaceTokenizer
-import tiktoken
+# Bump whenever the analysis results change shape, so every domain counts as stale
+ANALYSIS_VERSION = 1
+ANALYSIS_KEY_FILENAME = "analysis_key.json"
 
-def train_domain_tokenizer(domain_name, data_file, vocab_size=4096):
-    """Train a tokenizer for a specific domain"""
+TRAINING_CHUNK_SIZE = 10000
+
+def load_domain_jobs(config_file=DOMAIN_CONFIG):
+    """(domain, corpus path, vocab size) for every corpus registered in config_file"""
+    return domain_jobs(load_domain_registry(config_file))
+
+def train_domain_tokenizer(domain_name, data_file, vocab_size=4096, split_documents=False, output_dir=None,
+                           use_cache=True, sampling=None, chunker="fixed", profiler=None, pretokenize_workers=0):
+    """
+    Train a tokenizer for a specific domain (or load it if nothing changed).
+    
+    chunker names a strategy from chunkers.CHUNKERS for cutting the corpus
+    into training chunks. sampling, if given, holds select_training_chunks
+    options: duplicate documents/chunks are dropped and the rest sampled to a
+    byte budget first (on document-aligned chunks). With pretokenize_workers,
+    pre-tokenization is sharded across that many processes and BPE trains on
+    the merged word counts. Stages are timed on profiler if one is given.
+    """
+    profiler = profiler or StageProfiler()
     print(f"\n{'='*60}")
     print(f"Training tokenizer for {domain_name}")
     print(f"{'='*60}")
     
-    # Read the data
-    with open(data_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-    
-    print(f"Data size: {len(text):,} characters ({len(text)/1024/1024:.2f} MB)")
-    
-    # Create text iterator
-    chunk_size = 10000
-    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    
-    print(f"Training on {len(chunks)} chunks...")
-    
-    def text_iterator():
-        for chunk in chunks:
-            yield chunk
-    
-    # Train the tokenizer using HuggingFace implementation
-    t0 = time.time()
-    tokenizer = HuggingFaceTokenizer.train_from_iterator(text_iterator(), vocab_size)
-    train_time = time.time() - t0
-    
-    print(f"Training completed in {train_time:.2f} seconds")
+    # Stream the data straight from a memory-mapped file
+    data_bytes = os.path.getsize(data_file)
+    print(f"Data size: {data_bytes:,} bytes ({data_bytes/1024/1024:.2f} MB)")
+    
+    if output_dir is None:
+        output_dir = OUTPUT_DIR / f"{domain_name}_tokenizer"
+    chunk_size = TRAINING_CHUNK_SIZE
+    
+    # Skip training when corpus, vocab size, split pattern and trainer are unchanged
+    with profiler.stage("cache_check"):
+        cache_key, key_components = _training_key(data_file, vocab_size, chunk_size, split_documents,
+                                                  sampling, chunker, pretokenize_workers)
+        cache_hit = use_cache and is_cache_hit(output_dir, cache_key)
+    if cache_hit:
+        print(f"✓ Cache hit ({cache_key[:12]}), loading {output_dir}")
+        with profiler.stage("load"):
+            return HuggingFaceTokenizer.from_directory(str(output_dir))
+    
+    if pretokenize_workers:
+        tokenizer, selection_report = _train_sharded(data_file, vocab_size, chunk_size, split_documents, sampling,
+                                                     chunker, pretokenize_workers, profiler)
+    else:
+        with profiler.stage("chunking"):
+            num_chunks, text_iterator, selection_report = _training_chunks(data_file, chunk_size, split_documents,
+                                                                           sampling, chunker)
+        print(f"Training on {num_chunks} chunks...")
+        
+        # Train the tokenizer using HuggingFace implementation (chunks are read lazily, during this stage)
+        t0 = time.time()
+        with profiler.stage("bpe_training"):
+            tokenizer = HuggingFaceTokenizer.train_from_iterator(text_iterator, vocab_size)
+        train_time = time.time() - t0
+        
+        print(f"Training completed in {train_time:.2f} seconds")
     
     # Save the tokenizer
-    output_dir = Path(f"/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/outputs/{domain_name}_tokenizer")
-    tokenizer.save(str(output_dir))
+    with profiler.stage("save"):
+        tokenizer.save(str(output_dir))
+        save_cache_key(output_dir, cache_key, key_components)
+        if selection_report is not None:
+            with open(output_dir / "selection_report.json", 'w') as f:
+                json.dump(selection_report, f, indent=2)
     print(f"Saved to: {output_dir}")
     
-    return tokenizer, text
+    return tokenizer
 
-def analyze_tokenization(tokenizer, text, name):
-    """Analyze tokenization performance"""
-    print(f"\nAnalyzing {name}...")
+def _training_key(data_file, vocab_size, chunk_size, split_documents, sampling, chunker, pretokenize_workers=0):
+    """(key, components) of one training run, see training_cache.training_cache_key"""
+    return training_cache_key(
+        data_file, vocab_size, SPLIT_PATTERN,
+        f"{TRAINER_VERSION}/tokenizers-{tokenizers.__version__}",
+        chunk_size=chunk_size, split_documents=split_documents,
+        **({'sampling': sampling} if sampling else {}),
+        **({'chunker': chunker} if chunker != "fixed" else {}),
+        **({'trainer': "sharded_counts"} if pretokenize_workers else {})
+    )
+
+def _select_chunks(data_file, chunk_size, sampling):
+    """Deduplicated, sampled chunk indices and the selection report"""
+    # Dedup and sampling work per document, so chunks never cross documents here
+    chunk_indices, selection_report = select_training_chunks(data_file, chunk_size, **sampling)
+    print(f"Selected {selection_report['selected_bytes']:,} of {selection_report['input_bytes']:,} bytes "
+          f"({selection_report['exact_duplicate_chunks'] + selection_report['near_duplicate_chunks']} duplicate chunks, "
+          f"{selection_report['exact_duplicate_documents'] + selection_report['near_duplicate_documents']} duplicate documents)")
+    return chunk_indices, selection_report
+
+def _training_chunks(data_file, chunk_size, split_documents, sampling, chunker):
+    """(number of chunks, chunk iterator, selection report or None) for one training run"""
+    selection_report = None
+    if sampling:
+        chunk_indices, selection_report = _select_chunks(data_file, chunk_size, sampling)
+        num_chunks = len(chunk_indices)
+        text_iterator = iter_selected_chunks(data_file, chunk_indices, chunk_size)
+    elif chunker == "fixed":
+        num_chunks = count_corpus_chunks(data_file, chunk_size, split_documents=split_documents)
+        text_iterator = iter_corpus_chunks(data_file, chunk_size, split_documents=split_documents)
+    else:
+        num_chunks = count_chunks(data_file, chunker, chunk_size)
+        text_iterator = iter_chunks(data_file, chunker, chunk_size)
+    return num_chunks, text_iterator, selection_report
+
+def train_tokenizer_from_counts(word_counts, vocab_size, trainer=train_bpe_from_counts):
+    """nanochat tokenizer trained by a bpe_trainer function on ByteLevel word counts"""
+    # An untrained tokenizer supplies the pre-tokenizer, decoder and special tokens
+    template = HuggingFaceTokenizer.train_from_iterator(iter([]), vocab_size).tokenizer.to_str()
+    special_tokens = [token['content'] for token in json.loads(template)['added_tokens']]
+    vocab, merges = trainer(word_counts, vocab_size, special_tokens, tokenizers.pre_tokenizers.ByteLevel.alphabet())
+    return HuggingFaceTokenizer(build_tokenizer(template, vocab, merges))
+
+def _train_sharded(data_file, vocab_size, chunk_size, split_documents, sampling, chunker, workers, profiler):
+    """
+    Train through the sharded front end: (tokenizer, selection report or None).
+    
+    Worker processes pre-tokenize contiguous shards of the training chunks
+    into word counts; BPE then runs once on the merged table, which gives
+    the same merges as train_from_iterator on the same chunks.
+    """
+    with profiler.stage("chunking"):
+        chunk_indices, selection_report = None, None
+        if sampling:
+            chunk_indices, selection_report = _select_chunks(data_file, chunk_size, sampling)
+        spans = training_spans(data_file, chunk_size, split_documents=split_documents, chunker=chunker,
+                               chunk_indices=chunk_indices)
+    
+    with profiler.stage("pretokenize"):
+        word_counts = count_words(data_file, spans, SPLIT_PATTERN, workers=workers)
+    print(f"Pre-tokenized {len(spans)} chunks into {len(word_counts):,} unique words ({workers} workers)")
     
-    # Encode the text (use subset for analysis)
-    test_text = text[:100000] if len(text) > 100000 else text
     t0 = time.time()
-    tokens = tokenizer.encode(test_text)
-    encode_time = time.time() - t0
+    with profiler.stage("bpe_training"):
+        tokenizer = train_tokenizer_from_counts(word_counts, vocab_size)
+    print(f"Training completed in {time.time() - t0:.2f} seconds")
     
-    # Calculate compression ratio
-    original_bytes = len(test_text.encode('utf-8'))
-    num_tokens = len(tokens)
-    compression_ratio = original_bytes / num_tokens
+    return tokenizer, selection_report
+
+def analyze_tokenization(tokenizer, documents, name, shard_writer=None):
+    """Analyze tokenization performance over every document of the corpus"""
+    print(f"\nAnalyzing {name}...")
     
-    print(f"  Original bytes: {original_bytes:,}")
-    print(f"  Number of tokens: {num_tokens:,}")
-    print(f"  Compression ratio: {compression_ratio:.2f} bytes/token")
-    print(f"  Encoding time: {encode_time:.4f} seconds")
+    # Encode the whole corpus in batches across threads; the ids also feed the shard export
+    stats, tokens = evaluate_documents(hf_batch_encoder(tokenizer), documents, keep_tokens=True,
+                                       sink=shard_writer)
+    
+    print(f"  Documents: {stats['num_documents']:,}")
+    print(f"  Original bytes: {stats['original_bytes']:,}")
+    print(f"  Number of tokens: {stats['num_tokens']:,}")
+    print(f"  Compression ratio: {stats['compression_ratio']:.2f} bytes/token")
+    doc_ratio = stats['doc_compression_ratio']
+    if doc_ratio:
+        print(f"  Per-document ratio: median {doc_ratio['median']:.2f}, p10 {doc_ratio['p10']:.2f}, p90 {doc_ratio['p90']:.2f}")
+    print(f"  Encoding time: {stats['encode_time']:.4f} seconds ({stats['throughput_mb_s']:.2f} MB/s, {stats['num_threads']} threads)")
+    if shard_writer is not None:
+        print(f"  Shard write time: {stats['sink_time']:.4f} seconds")
     
     # Get token statistics
     vocab_size = tokenizer.get_vocab_size()
@@ -75,104 +209,59 @@ def analyze_tokenization(tokenizer, text, name):
     
     return {
         'name': name,
-        'original_bytes': original_bytes,
-        'num_tokens': num_tokens,
-        'compression_ratio': compression_ratio,
-        'encode_time': encode_time,
+        **stats,
         'vocab_size': vocab_size
     }, tokens
 
-def get_frequent_tokens(tokenizer, tokens, top_n=30):
+def get_frequent_tokens(vocab_table, token_stats, top_n=30):
     """Get the most frequent tokens"""
-    from collections import Counter
-    
-    token_counts = Counter(tokens)
-    most_common = token_counts.most_common(top_n)
+    most_common = top_tokens(token_stats, top_n)
     
     frequent_tokens = []
     for token_id, count in most_common:
-        token_str = tokenizer.decode([token_id])
+        token_str = vocab_table['token_strs'][token_id]
         token_repr = repr(token_str)
         frequent_tokens.append({
             'token_id': token_id,
             'token': token_str,
             'token_repr': token_repr,
             'count': count,
-            'percentage': count / len(tokens) * 100
+            'percentage': float(token_stats['percentages'][token_id])
         })
     
     return frequent_tokens
 
-def compare_with_standard_tokenizers(text, domain_name):
-    """Compare with standard tokenizers"""
+def compare_with_standard_tokenizers(documents, domain_name):
+    """Compare with standard tokenizers over every document of the corpus"""
     print(f"\n{'='*60}")
     print(f"Comparing with standard tokenizers for {domain_name}")
     print(f"{'='*60}")
     
     results = []
     
-    # Test with first 100k characters
-    test_text = text[:100000] if len(text) > 100000 else text
-    original_bytes = len(test_text.encode('utf-8'))
-    
-    # 1. GPT-2 tokenizer
-    try:
-        enc_gpt2 = tiktoken.get_encoding("gpt2")
-        tokens_gpt2 = enc_gpt2.encode(test_text)
-        results.append({
-            'name': 'GPT-2 (tiktoken)',
-            'original_bytes': original_bytes,
-            'num_tokens': len(tokens_gpt2),
-            'compression_ratio': original_bytes / len(tokens_gpt2),
-            'vocab_size': enc_gpt2.n_vocab
-        })
-        print(f"✓ GPT-2: {len(tokens_gpt2):,} tokens, ratio: {original_bytes/len(tokens_gpt2):.2f}")
-    except Exception as e:
-        print(f"✗ GPT-2 failed: {e}")
-    
-    # 2. cl100k_base (GPT-3.5/4)
-    try:
-        enc_cl100k = tiktoken.get_encoding("cl100k_base")
-        tokens_cl100k = enc_cl100k.encode(test_text)
-        results.append({
-            'name': 'cl100k_base (GPT-3.5/4)',
-            'original_bytes': original_bytes,
-            'num_tokens': len(tokens_cl100k),
-            'compression_ratio': original_bytes / len(tokens_cl100k),
-            'vocab_size': enc_cl100k.n_vocab
-        })
-        print(f"✓ cl100k_base: {len(tokens_cl100k):,} tokens, ratio: {original_bytes/len(tokens_cl100k):.2f}")
-    except Exception as e:
-        print(f"✗ cl100k_base failed: {e}")
-    
-    # 3. o200k_base (GPT-4o)
-    try:
-        enc_o200k = tiktoken.get_encoding("o200k_base")
-        tokens_o200k = enc_o200k.encode(test_text)
-        results.append({
-            'name': 'o200k_base (GPT-4o)',
-            'original_bytes': original_bytes,
-            'num_tokens': len(tokens_o200k),
-            'compression_ratio': original_bytes / len(tokens_o200k),
-            'vocab_size': enc_o200k.n_vocab
-        })
-        print(f"✓ o200k_base: {len(tokens_o200k):,} tokens, ratio: {original_bytes/len(tokens_o200k):.2f}")
-    except Exception as e:
-        print(f"✗ o200k_base failed: {e}")
+    for encoding_name, spec in REFERENCE_ENCODINGS.items():
+        try:
+            enc = get_reference_encoding(encoding_name)
+            stats, _ = evaluate_documents(tiktoken_batch_encoder(enc), documents)
+            results.append({
+                'name': spec['display_name'],
+                **stats,
+                'vocab_size': enc.n_vocab
+            })
+            print(f"✓ {encoding_name}: {stats['num_tokens']:,} tokens, ratio: {stats['compression_ratio']:.2f}")
+        except Exception as e:
+            print(f"✗ {encoding_name} failed: {e}")
     
     return results
 
-def analyze_token_patterns(tokenizer, tokens, text, domain_name, top_n=50):
+def analyze_token_patterns(vocab_table, token_stats, domain_name, top_n=50):
     """Analyze and categorize token patterns"""
-    from collections import Counter
-    
     print(f"\n{'='*60}")
     print(f"Token Pattern Analysis for {domain_name}")
     print(f"{'='*60}")
     
     # Get token frequency
-    token_counts = Counter(tokens)
-    most_common = token_counts.most_common(top_n)
+    most_common = top_tokens(token_stats, top_n)
     
     # Decode tokens and categorize
     patterns = {
@@ -183,22 +272,16 @@ def analyze_token_patterns(tokenizer, tokens, text, domain_name, top_n=50):
     }
     
     for token_id, count in most_common:
-        token_str = tokenizer.decode([token_id])
-        token_len = len(token_str)
-        
-        if token_len == 1:
-            if token_str.isspace():
-                patterns['whitespace'].append((token_str, count))
-            else:
-                patterns['single_char'].append((token_str, count))
-        elif token_len > 1:
-            patterns['multi_char'].append((token_str, count))
+        token_str = vocab_table['token_strs'][token_id]
+        category = categorize_token(token_str, token_id in vocab_table['special_ids'])
+        if category is not None:
+            patterns[category].append((token_str, count))
     
     # Print analysis
     print(f"\nTop {min(20, len(most_common))} most frequent tokens:\n")
     for i, (token_id, count) in enumerate(most_common[:20], 1):
-        token_str = tokenizer.decode([token_id])
-        pct = count / len(tokens) * 100
+        token_str = vocab_table['token_strs'][token_id]
+        pct = token_stats['percentages'][token_id]
         display_token = repr(token_str) if len(token_str) <= 15 else repr(token_str[:15]) + "..."
         print(f"  {i:2d}. {display_token:40s} | Count: {count:8,} ({pct:5.2f}%) | ID: {token_id}")
     
@@ -215,82 +298,286 @@ def analyze_token_patterns(tokenizer, tokens, text, domain_name, top_n=50):
     
     return patterns
 
-def main():
-    # Movie Scripts domain
-    print("\n" + "="*80)
-    print("DOMAIN 1: MOVIE SCRIPTS")
-    print("="*80)
-    
-    scripts_file = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/movie_scripts/movie_scripts_corpus.txt")
-    scripts_tokenizer, scripts_text = train_domain_tokenizer("movie_scripts", scripts_file, vocab_size=4096)
-    
-    # Analyze movie scripts tokenization
-    scripts_result, scripts_tokens = analyze_tokenization(scripts_tokenizer, scripts_text, "Movie Scripts (nanochat)")
-    scripts_frequent = get_frequent_tokens(scripts_tokenizer, scripts_tokens, top_n=30)
-    scripts_patterns = analyze_token_patterns(scripts_tokenizer, scripts_tokens, scripts_text, "Movie Scripts", top_n=50)
-    
-    # Compare with standard tokenizers
-    scripts_standard_results = compare_with_standard_tokenizers(scripts_text, "Movie Scripts")
+def analysis_key(domain):
+    """(key, components) of a full pipeline run for one registry entry"""
+    training_key, _ = _training_key(domain['corpus'], domain['vocab_size'], TRAINING_CHUNK_SIZE,
+                                    domain['split_documents'], domain['sampling'], domain['chunker'],
+                                    domain['pretokenize_workers'])
+    components = {
+        'training_key': training_key,
+        'analysis_version': ANALYSIS_VERSION,
+        'references': sorted(REFERENCE_ENCODINGS),
+        **{option: domain[option] for option in ('display_name', 'export_shards', 'top_n_tokens', 'top_n_patterns')}
+    }
+    encoded = json.dumps(components, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest(), components
+
+def is_domain_stale(domain):
+    """True unless the domain's saved results were produced from the same corpus and options"""
+    output_dir = OUTPUT_DIR / f"{domain['name']}_tokenizer"
+    if not (output_dir / "analysis_results.json").exists():
+        return True
+    return read_cache_key(output_dir, ANALYSIS_KEY_FILENAME) != analysis_key(domain)[0]
+
+def run_domain_pipeline(domain_name, data_file, vocab_size=4096, use_cache=True, export_shards=True,
+                        sampling=None, chunker="fixed", profiling=None, split_documents=False,
+                        top_n_tokens=30, top_n_patterns=50, display_name=None, pretokenize_workers=0):
+    """
+    Train, analyze and compare one domain.
+    
+    Returns (domain name, results entry, stage timing summary); profiling
+    holds StageProfiler options (trace_memory, cprofile_stages, profile_dir).
+    """
+    display_name = display_name or domain_name.replace('_', ' ').title()
+    profiler = StageProfiler(prefix=f"{domain_name}.", **(profiling or {}))
     
-    # Python Code domain
     print("\n" + "="*80)
-    print("DOMAIN 2: PYTHON CODE")
+    print(f"DOMAIN: {display_name.upper()}")
     print("="*80)
     
-    python_file = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/data/python_code/python_code_corpus.txt")
-    python_tokenizer, python_text = train_domain_tokenizer("python_code", python_file, vocab_size=4096)
-    
-    # Analyze Python code tokenization
-    python_result, python_tokens = analyze_tokenization(python_tokenizer, python_text, "Python Code (nanochat)")
-    python_frequent = get_frequent_tokens(python_tokenizer, python_tokens, top_n=30)
-    python_patterns = analyze_token_patterns(python_tokenizer, python_tokens, python_text, "Python Code", top_n=50)
-    
-    # Compare with standard tokenizers
-    python_standard_results = compare_with_standard_tokenizers(python_text, "Python Code")
-    
-    # Save all results
-    results = {
-        'movie_scripts': {
-            'nanochat_result': scripts_result,
-            'standard_results': scripts_standard_results,
-            'frequent_tokens': scripts_frequent,
-            'patterns': {k: [(t, c) for t, c in v[:10]] for k, v in scripts_patterns.items()}
-        },
-        'python_code': {
-            'nanochat_result': python_result,
-            'standard_results': python_standard_results,
-            'frequent_tokens': python_frequent,
-            'patterns': {k: [(t, c) for t, c in v[:10]] for k, v in python_patterns.items()}
-        }
+    # Load the baseline encodings while the domain tokenizer trains
+    warm_load_reference_encodings()
+    
+    with profiler.stage("train"):
+        tokenizer = train_domain_tokenizer(domain_name, data_file, vocab_size=vocab_size,
+                                           split_documents=split_documents, use_cache=use_cache,
+                                           sampling=sampling, chunker=chunker, profiler=profiler,
+                                           pretokenize_workers=pretokenize_workers)
+    with profiler.stage("read_documents"):
+        documents = list(iter_corpus_documents(data_file))
+    
+    # Token ids of the analysis pass are also written as mmap-able training shards
+    shard_writer = None
+    if export_shards:
+        shard_writer = TokenShardWriter(OUTPUT_DIR / f"{domain_name}_tokenizer" / "shards",
+                                        tokenizer.get_vocab_size(), bos_id=bos_token_id(tokenizer))
+    
+    # Analyze tokenization
+    with profiler.stage("encode"):
+        try:
+            result, tokens = analyze_tokenization(tokenizer, documents, f"{display_name} (nanochat)",
+                                                  shard_writer=shard_writer)
+        except BaseException:
+            # No half-written .tmp shards are left behind
+            if shard_writer is not None:
+                shard_writer.discard()
+            raise
+        if shard_writer is not None:
+            shard_writer.close()
+            print(f"  Token shards: {shard_writer.num_tokens:,} tokens in {len(shard_writer.shards)} shard(s) "
+                  f"-> {shard_writer.output_dir}")
+    with profiler.stage("token_stats"):
+        token_stats = compute_token_stats(tokens, tokenizer.get_vocab_size())
+    with profiler.stage("vocab_table"):
+        vocab_table = load_vocab_table(tokenizer, OUTPUT_DIR / f"{domain_name}_tokenizer")
+    with profiler.stage("token_patterns"):
+        frequent = get_frequent_tokens(vocab_table, token_stats, top_n=top_n_tokens)
+        patterns = analyze_token_patterns(vocab_table, token_stats, display_name, top_n=top_n_patterns)
+    
+    # Compare with standard tokenizers (waits for the reference loads if still running)
+    with profiler.stage("reference_compare"):
+        standard_results = compare_with_standard_tokenizers(documents, display_name)
+    
+    domain_results = {
+        'nanochat_result': result,
+        'standard_results': standard_results,
+        'frequent_tokens': frequent,
+        'token_coverage': coverage_curve(token_stats),
+        'vocab_categories': categorize_vocabulary(vocab_table),
+        'patterns': {k: [(t, c) for t, c in v[:10]] for k, v in patterns.items()}
     }
     
-    # Save to JSON
-    output_file = Path("/Users/abeen/Documents/Fall_Quarter/DLS_LAB2_REAL/outputs/tokenizer_analysis_results.json")
+    # Each domain writes its own partial results next to its tokenizer
+    with profiler.stage("write_results"):
+        partial_file = OUTPUT_DIR / f"{domain_name}_tokenizer" / "analysis_results.json"
+        partial_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(partial_file, 'w') as f:
+            json.dump(domain_results, f, indent=2)
+    
+    return domain_name, domain_results, profiler.summary()
+
+def _domain_kwargs(domain):
+    """run_domain_pipeline keyword arguments for one registry entry"""
+    return {
+        'domain_name': domain['name'],
+        'data_file': domain['corpus'],
+        **{option: domain[option] for option in ('vocab_size', 'export_shards', 'sampling', 'chunker',
+                                                 'split_documents', 'top_n_tokens', 'top_n_patterns',
+                                                 'display_name', 'pretokenize_workers')}
+    }
+
+def _save_analysis_key(domain):
+    key, components = analysis_key(domain)
+    save_cache_key(OUTPUT_DIR / f"{domain['name']}_tokenizer", key, components, filename=ANALYSIS_KEY_FILENAME)
+
+def _load_domain_results(domain):
+    with open(OUTPUT_DIR / f"{domain['name']}_tokenizer" / "analysis_results.json") as f:
+        return json.load(f)
+
+def _report_domain_failure(domain_name):
+    """Print the traceback of a failed domain; the other domains carry on"""
+    # Pool errors chain the worker's own traceback as their cause
+    print(f"✗ {domain_name} failed:\n{traceback.format_exc()}")
+
+def run_pipeline(domains, workers=1, reference_config=None, offline_bpe_dir=None, use_cache=True,
+                 only_stale=False, profiling=None):
+    """
+    Run registry domains and merge their results.
+    
+    With workers > 1 the domains run in a process pool, so the total time is
+    bounded by the slowest domain rather than the sum of all of them. A
+    domain that fails is reported with its traceback and left out of the
+    results, in both modes, while the rest still run. With only_stale,
+    domains whose corpus and options are unchanged since their last run
+    reuse their saved results. Returns (results, per-domain stage profiles
+    of the domains that ran).
+    """
+    results = {}
+    profiles = {}
+    configure_reference_tokenizers(reference_config, offline_bpe_dir)
+    
+    pending = domains
+    if only_stale:
+        pending = [domain for domain in domains if not use_cache or is_domain_stale(domain)]
+        for domain in domains:
+            if domain not in pending:
+                results[domain['name']] = _load_domain_results(domain)
+                print(f"✓ {domain['name']} unchanged, reusing saved results")
+    by_name = {domain['name']: domain for domain in pending}
+    
+    if workers > 1 and len(pending) > 1:
+        # Workers may be spawned fresh, so they re-apply the reference settings
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                 initializer=configure_reference_tokenizers,
+                                 initargs=(reference_config, offline_bpe_dir)) as pool:
+            futures = {pool.submit(run_domain_pipeline, **_domain_kwargs(domain), use_cache=use_cache,
+                                   profiling=profiling): domain['name'] for domain in pending}
+            for future in as_completed(futures):
+                try:
+                    domain_name, domain_results, profile = future.result()
+                    results[domain_name] = domain_results
+                    profiles[domain_name] = profile
+                    _save_analysis_key(by_name[domain_name])
+                    print(f"✓ {domain_name} finished")
+                except Exception:
+                    _report_domain_failure(futures[future])
+    else:
+        for domain in pending:
+            try:
+                domain_name, domain_results, profile = run_domain_pipeline(**_domain_kwargs(domain),
+                                                                             use_cache=use_cache,
+                                                                             profiling=profiling)
+            except Exception:
+                _report_domain_failure(domain['name'])
+                continue
+            results[domain_name] = domain_results
+            profiles[domain_name] = profile
+            _save_analysis_key(domain)
+    
+    # Keep the merged file in registry order regardless of completion order
+    order = [domain['name'] for domain in domains]
+    return ({name: results[name] for name in order if name in results},
+            {name: profiles[name] for name in order if name in profiles})
+
+def main(workers=1, reference_config=None, offline_bpe_dir=None, use_cache=True, config_file=DOMAIN_CONFIG,
+         domain_names=None, only_stale=False, overrides=None, profiling=None):
+    registry = load_domain_registry(config_file)
+    domains = [{**domain, **(overrides or {})} for domain in select_domains(registry, domain_names)]
+    
+    t0 = time.perf_counter()
+    results, profiles = run_pipeline(domains, workers=workers, reference_config=reference_config,
+                                     offline_bpe_dir=offline_bpe_dir, use_cache=use_cache,
+                                     only_stale=only_stale, profiling=profiling)
+    pipeline_time = time.perf_counter() - t0
+    
+    # Save to JSON, keeping earlier results of registered domains that were not selected this time
+    output_file = OUTPUT_DIR / "tokenizer_analysis_results.json"
     output_file.parent.mkdir(parents=True, exist_ok=True)
+    merged = {}
+    if domain_names is not None and output_file.exists():
+        with open(output_file) as f:
+            merged = json.load(f)
+    merged.update(results)
+    registered = [domain['name'] for domain in registry if domain['name'] in merged]
     with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+        json.dump({name: merged[name] for name in registered}, f, indent=2)
     
     print(f"\n✓ Results saved to: {output_file}")
     
+    # Per-stage timings, so regressions can be traced to a stage rather than the whole run
+    profile_file = OUTPUT_DIR / "pipeline_profile.json"
+    with open(profile_file, 'w') as f:
+        json.dump({'pipeline_wall_s': pipeline_time, 'workers': workers, 'domains': profiles}, f, indent=2)
+    
+    print("\n" + "="*80)
+    print("STAGE PROFILE")
+    print("="*80)
+    for domain_name, profile in profiles.items():
+        print_stage_report(domain_name, profile)
+    print(f"\n  Pipeline wall time: {pipeline_time:.2f}s")
+    print(f"✓ Stage profile saved to: {profile_file}")
+    
     # Print summary comparison
     print("\n" + "="*80)
     print("COMPRESSION RATIO COMPARISON SUMMARY")
     print("="*80)
     
-    print("\nMovie Scripts:")
-    print(f"  nanochat:       {scripts_result['compression_ratio']:.3f} bytes/token")
-    for r in scripts_standard_results:
-        print(f"  {r['name']:15s}: {r['compression_ratio']:.3f} bytes/token")
-    
-    print("\nPython Code:")
-    print(f"  nanochat:       {python_result['compression_ratio']:.3f} bytes/token")
-    for r in python_standard_results:
-        print(f"  {r['name']:15s}: {r['compression_ratio']:.3f} bytes/token")
+    for domain_name, domain_results in results.items():
+        print(f"\n{domain_name.replace('_', ' ').title()}:")
+        print(f"  nanochat:       {domain_results['nanochat_result']['compression_ratio']:.3f} bytes/token")
+        for r in domain_results['standard_results']:
+            print(f"  {r['name']:15s}: {r['compression_ratio']:.3f} bytes/token")
     
     print("\n" + "="*80)
     print("Analysis complete!")
     print("="*80)
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description="Train and analyze domain tokenizers")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of domains to train and analyze in parallel")
+    parser.add_argument('--reference-config',
+                        help="JSON list of extra reference encodings to compare against")
+    parser.add_argument('--offline-bpe-dir',
+                        help="Directory of local BPE rank files (<name>.tiktoken) for offline runs")
+    parser.add_argument('--retrain', action='store_true',
+                        help="Ignore the training cache and retrain every tokenizer")
+    parser.add_argument('--no-shards', action='store_true',
+                        help="Skip writing binary token-id shards for each domain")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Drop exact and near-duplicate documents/chunks before training")
+    parser.add_argument('--sample-fraction', type=float,
+                        help="Train on a deduplicated, per-document sample of this fraction of the corpus bytes")
+    parser.add_argument('--chunker', choices=sorted(CHUNKERS),
+                        help="How the corpus is cut into training chunks (default: per domain config)")
+    parser.add_argument('--pretokenize-workers', type=int,
+                        help="Pre-tokenize in this many processes and train BPE on the merged word counts "
+                             "(0: train_from_iterator)")
+    parser.add_argument('--config', default=str(DOMAIN_CONFIG),
+                        help="Domain registry (JSON) listing each corpus and its options")
+    parser.add_argument('--domains', nargs='+', help="Domains to run (default: every registered domain)")
+    parser.add_argument('--stale', action='store_true',
+                        help="Only run domains whose corpus or options changed since their last run")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record the tracemalloc peak of every stage (slows the run down)")
+    parser.add_argument('--cprofile', nargs='+', default=[], metavar='STAGE',
+                        help="Run these stages (e.g. bpe_training encode) under cProfile; "
+                             "stats go to outputs/profiles/")
+    args = parser.parse_args()
+    
+    # Command-line options override the registry for every selected domain
+    overrides = {}
+    if args.no_shards:
+        overrides['export_shards'] = False
+    if args.dedup or args.sample_fraction is not None:
+        overrides['sampling'] = {'near_dup_threshold': 0.8, 'fraction': args.sample_fraction}
+    if args.chunker:
+        overrides['chunker'] = args.chunker
+    if args.pretokenize_workers is not None:
+        overrides['pretokenize_workers'] = args.pretokenize_workers
+    main(workers=args.workers, reference_config=args.reference_config,
+         offline_bpe_dir=args.offline_bpe_dir, use_cache=not args.retrain,
+         config_file=Path(args.config), domain_names=args.domains, only_stale=args.stale,
+         overrides=overrides,
+         profiling={'trace_memory': args.trace_memory, 'cprofile_stages': args.cprofile,
+                    'profile_dir': OUTPUT_DIR / "profiles"})
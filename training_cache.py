@@ -0,0 +1,59 @@
+"""
+Content-addressed cache for trained tokenizers
+The key hashes the corpus bytes together with every training setting, so a
+rerun with unchanged inputs loads tokenizer.json instead of retraining
+"""
+import os
+import mmap
+import json
+import hashlib
+from pathlib import Path
+
+# Bump whenever the way the corpus is chunked or trained changes
+TRAINER_VERSION = 1
+
+KEY_FILENAME = "training_key.json"
+
+def hash_corpus(data_file, block_size=8 * 1024 * 1024):
+    """Streaming BLAKE2b digest of a corpus file"""
+    digest = hashlib.blake2b(digest_size=32)
+    if os.path.getsize(data_file) == 0:
+        return digest.hexdigest()
+
+    with open(data_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, len(mm), block_size):
+                digest.update(mm[start:start + block_size])
+    return digest.hexdigest()
+
+def training_cache_key(data_file, vocab_size, split_pattern, trainer_version, **options):
+    """Return (key, components) identifying one training run"""
+    components = {
+        'corpus_blake2b': hash_corpus(data_file),
+        'vocab_size': vocab_size,
+        'split_pattern': split_pattern,
+        'trainer_version': trainer_version,
+        **options
+    }
+    encoded = json.dumps(components, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest(), components
+
+def read_cache_key(output_dir, filename=KEY_FILENAME):
+    """The key recorded in output_dir, or None"""
+    key_file = Path(output_dir) / filename
+    if not key_file.exists():
+        return None
+    with open(key_file) as f:
+        return json.load(f).get('key')
+
+def is_cache_hit(output_dir, key):
+    """True if output_dir holds a tokenizer trained under key"""
+    if not (Path(output_dir) / "tokenizer.json").exists():
+        return False
+    return read_cache_key(output_dir) == key
+
+def save_cache_key(output_dir, key, components, filename=KEY_FILENAME):
+    """Record the key of the outputs just saved to output_dir"""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(output_dir) / filename, 'w') as f:
+        json.dump({'key': key, 'components': components}, f, indent=2)
@@ -0,0 +1,105 @@
+"""
+Vocab-size sweep: train once at the largest vocab, derive the smaller ones
+BPE merges are learned in order, so the first N merges of a large run form
+a valid smaller vocabulary without retraining
+"""
+import json
+import time
+import argparse
+from itertools import islice
+
+from tokenizers import Tokenizer as HFTokenizer
+
+from train_and_analyze_tokenizers import (
+    load_domain_jobs, OUTPUT_DIR, HuggingFaceTokenizer, train_domain_tokenizer,
+)
+from corpus_reader import iter_corpus_documents
+from batch_eval import hf_batch_encoder
+
+DEFAULT_VOCAB_SIZES = [1024, 2048, 4096, 8192, 16384, 32768, 65536]
+
+def truncate_tokenizer_json(tokenizer_data, vocab_size):
+    """Return a copy of a tokenizer.json dict keeping only the first vocab_size ids"""
+    model = tokenizer_data['model']
+    # Special tokens and the byte alphabet come first; each merge then adds one id
+    num_base = len(model['vocab']) - len(model['merges'])
+    if vocab_size < num_base:
+        raise ValueError(f"vocab_size {vocab_size} is smaller than the {num_base} base tokens")
+    if vocab_size > len(model['vocab']):
+        raise ValueError(f"vocab_size {vocab_size} exceeds the trained vocab of {len(model['vocab'])}")
+
+    truncated = dict(tokenizer_data)
+    truncated['model'] = dict(model)
+    truncated['model']['merges'] = model['merges'][:vocab_size - num_base]
+    truncated['model']['vocab'] = {tok: i for tok, i in model['vocab'].items() if i < vocab_size}
+    return truncated
+
+def truncate_tokenizer(tokenizer, vocab_size):
+    """Build a smaller HuggingFaceTokenizer from a larger trained one"""
+    tokenizer_data = json.loads(tokenizer.tokenizer.to_str())
+    truncated = truncate_tokenizer_json(tokenizer_data, vocab_size)
+    return HuggingFaceTokenizer(HFTokenizer.from_str(json.dumps(truncated)))
+
+def count_corpus_tokens(tokenizer, data_file, batch_size=64):
+    """(bytes, tokens) of a corpus, batch-encoded a few documents at a time like the main pipeline"""
+    encode_batch = hf_batch_encoder(tokenizer)
+    documents = iter_corpus_documents(data_file)
+    num_bytes = num_tokens = 0
+    while True:
+        batch = list(islice(documents, batch_size))
+        if not batch:
+            return num_bytes, num_tokens
+        num_bytes += sum(len(doc.encode('utf-8')) for doc in batch)
+        num_tokens += sum(len(ids) for ids in encode_batch(batch))
+
+def run_vocab_sweep(domain_name, data_file, vocab_sizes):
+    """Train once at max(vocab_sizes) and report compression for every size"""
+    max_vocab = max(vocab_sizes)
+    sweep_dir = OUTPUT_DIR / f"{domain_name}_sweep"
+    tokenizer = train_domain_tokenizer(domain_name, data_file, vocab_size=max_vocab, output_dir=sweep_dir)
+    trained_vocab = tokenizer.get_vocab_size()
+
+    print(f"\nCompression vs vocab size for {domain_name}:")
+    results = []
+    for vocab_size in sorted(vocab_sizes):
+        if vocab_size > trained_vocab:
+            print(f"  {vocab_size:>6,}: ✗ corpus only supports {trained_vocab:,} tokens")
+            continue
+
+        sized = tokenizer if vocab_size == trained_vocab else truncate_tokenizer(tokenizer, vocab_size)
+        t0 = time.time()
+        original_bytes, num_tokens = count_corpus_tokens(sized, data_file)
+        encode_time = time.time() - t0
+
+        results.append({
+            'vocab_size': vocab_size,
+            'original_bytes': original_bytes,
+            'num_tokens': num_tokens,
+            'compression_ratio': original_bytes / num_tokens,
+            'encode_time': encode_time
+        })
+        print(f"  {vocab_size:>6,}: {original_bytes / num_tokens:.3f} bytes/token ({num_tokens:,} tokens)")
+
+    return results
+
+def main(domains=None, vocab_sizes=DEFAULT_VOCAB_SIZES):
+    jobs = [job for job in load_domain_jobs() if domains is None or job[0] in domains]
+
+    results = {}
+    for domain_name, data_file, _ in jobs:
+        results[domain_name] = run_vocab_sweep(domain_name, data_file, vocab_sizes)
+
+    output_file = OUTPUT_DIR / "vocab_sweep_results.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n✓ Sweep results saved to: {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compression ratio vs vocab size, one training run per domain")
+    parser.add_argument('--domains', nargs='+', help="Domains to sweep (default: all)")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_VOCAB_SIZES,
+                        help="Vocab sizes to evaluate")
+    args = parser.parse_args()
+    main(domains=args.domains, vocab_sizes=args.sizes)
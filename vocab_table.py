@@ -0,0 +1,128 @@
+"""
+Vocabulary introspection: dense token-id -> bytes/str lookup tables
+Built once per tokenizer from tokenizer.json (or the live object) and cached
+beside the saved tokenizer, so per-token decoding becomes an array index
+"""
+import re
+import json
+import hashlib
+from pathlib import Path
+
+TABLE_FILENAME = "vocab_table.json"
+
+_BYTE_FALLBACK = re.compile(r"^<0x([0-9A-Fa-f]{2})>$")
+
+def bytes_to_unicode():
+    """GPT-2 ByteLevel mapping from byte values to printable unicode characters"""
+    bs = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + list(range(ord("®"), ord("ÿ") + 1))
+    cs = bs[:]
+    n = 0
+    for b in range(256):
+        if b not in bs:
+            bs.append(b)
+            cs.append(256 + n)
+            n += 1
+    return dict(zip(bs, (chr(c) for c in cs)))
+
+_BYTE_DECODER = {c: b for b, c in bytes_to_unicode().items()}
+# latin-1 decoding turns bytes into code points 0-255, which this maps to ByteLevel characters
+_BYTE_LEVEL = str.maketrans(bytes_to_unicode())
+
+def to_byte_level(word):
+    """A pre-token as the ByteLevel string the BPE model sees"""
+    return word.encode('utf-8').decode('latin-1').translate(_BYTE_LEVEL)
+
+def split_pattern(tokenizer_data):
+    """The Split regex of a Split + ByteLevel pre-tokenizer without a normalizer, else None"""
+    pre = tokenizer_data.get('pre_tokenizer') or {}
+    steps = pre.get('pretokenizers', []) if pre.get('type') == 'Sequence' else [pre]
+    if tokenizer_data.get('normalizer') is not None or len(steps) != 2:
+        return None
+    split, byte_level = steps
+    if (split.get('type') != 'Split' or split.get('behavior') != 'Isolated' or split.get('invert')
+            or 'Regex' not in split.get('pattern', {})):
+        return None
+    if byte_level.get('type') != 'ByteLevel' or byte_level.get('add_prefix_space') or byte_level.get('use_regex'):
+        return None
+    return split['pattern']['Regex']
+
+def _token_to_bytes(token, is_special):
+    """Raw bytes of one vocab entry"""
+    if is_special:
+        return token.encode('utf-8')
+    match = _BYTE_FALLBACK.match(token)
+    if match:
+        return bytes([int(match.group(1), 16)])
+    return bytes(_BYTE_DECODER[c] for c in token)
+
+def build_vocab_table(tokenizer_data):
+    """Build the id -> bytes/str table from a parsed tokenizer.json dict"""
+    vocab = dict(tokenizer_data['model']['vocab'])
+    special = set()
+    for added in tokenizer_data.get('added_tokens', []):
+        vocab[added['content']] = added['id']
+        if added.get('special'):
+            special.add(added['content'])
+
+    token_bytes = [b""] * (max(vocab.values()) + 1)
+    for token, token_id in vocab.items():
+        token_bytes[token_id] = _token_to_bytes(token, token in special)
+
+    return _make_table(token_bytes, sorted(vocab[t] for t in special))
+
+def _make_table(token_bytes, special_ids):
+    """Assemble the table dict from raw token bytes"""
+    return {
+        'token_bytes': token_bytes,
+        'token_strs': [b.decode('utf-8', errors='replace') for b in token_bytes],
+        'special_ids': set(special_ids)
+    }
+
+def load_vocab_table(tokenizer, tokenizer_dir=None):
+    """
+    Return the vocab table for a tokenizer, using the cached copy if valid.
+
+    The cache lives next to tokenizer.json and is keyed by its hash, so a
+    retrained tokenizer rebuilds its table automatically.
+    """
+    tokenizer_json = tokenizer.tokenizer.to_str()
+    source_hash = hashlib.sha256(tokenizer_json.encode('utf-8')).hexdigest()
+
+    cache_file = Path(tokenizer_dir) / TABLE_FILENAME if tokenizer_dir else None
+    if cache_file is not None and cache_file.exists():
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if cached.get('source_sha256') == source_hash:
+            return _make_table([bytes.fromhex(h) for h in cached['tokens']], cached['special_ids'])
+
+    table = build_vocab_table(json.loads(tokenizer_json))
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w') as f:
+            json.dump({
+                'source_sha256': source_hash,
+                'special_ids': sorted(table['special_ids']),
+                'tokens': [b.hex() for b in table['token_bytes']]
+            }, f)
+
+    return table
+
+def categorize_token(token_str, is_special=False):
+    """Pattern category of a decoded token (None for empty tokens)"""
+    if is_special:
+        return 'special'
+    if len(token_str) == 1:
+        return 'whitespace' if token_str.isspace() else 'single_char'
+    if len(token_str) > 1:
+        return 'multi_char'
+    return None
+
+def categorize_vocabulary(vocab_table):
+    """Count every vocab entry per pattern category"""
+    categories = {'single_char': 0, 'whitespace': 0, 'multi_char': 0, 'special': 0}
+    for token_id, token_str in enumerate(vocab_table['token_strs']):
+        category = categorize_token(token_str, token_id in vocab_table['special_ids'])
+        if category is not None:
+            categories[category] += 1
+    return categories